@@ -0,0 +1,405 @@
+# api_server.py
+# Streamlit 밖에서 쓰는 JSON 스코어링 API (표준 라이브러리 http.server - 추가 의존성 없음)
+#  - 모델/explainer, 시트 스냅샷, 백분위 인덱스, 전체 기업 결과 테이블을 프로세스에 올려 두고 요청마다 재사용
+#    (app.py 처럼 요청마다 스크립트 전체를 다시 실행하지 않음)
+#  - 요청마다 스레드 하나 (ThreadingHTTPServer) - 공유 상태는 snapshot.memo / 모델 레지스트리가 잠금으로 보호
+#  - 응답 ETag = (경로, 파라미터, 스냅샷 ID, 모델 버전) 해시 -> If-None-Match 가 같으면 계산 없이 304
+#    본문은 같은 키로 메모리 LRU 에 보관 (시트나 모델이 바뀌면 키가 바뀌므로 따로 무효화할 필요 없음)
+#  - 지연 시간 목표: 스냅샷/모델이 올라간 뒤 단일 종목 요청 p95 < config.API_LATENCY_TARGET_MS (기본 50 ms)
+#    /metrics 에서 경로별 p50/p95 와 목표 충족 여부 확인
+#
+# 엔드포인트
+#   GET  /health                                   스냅샷 ID, 활성 모델 버전, 가동 시간
+#   GET  /v1/score/<종목>?model=&price=1             load_data_and_model 과 같은 결과 (49개 SHAP, 7대 분야 점수 포함)
+#                                                  price=1 이면 주가도 조회 (prices.py 캐시/타임아웃)
+#   GET  /v1/score?tickers=005930,000660&details=1   여러 종목 요약 (details=1 이면 SHAP / 백분위 점수 포함)
+#   POST /v1/score  {"tickers": [...], "model": null, "details": false}
+#   GET  /v1/report/<종목>?model=                   AI 리포트 (--reports 로 켰을 때만, 리포트 캐시 사용)
+#   GET  /metrics                                  경로별 요청 수 / 지연 시간 / 캐시 적중
+#
+# 사용 예) 로컬 CSV 로 실행
+#   python api_server.py --data-dir ./data --port 8600
+#   curl localhost:8600/v1/score/005930
+#   curl -X POST localhost:8600/v1/score -d '{"tickers": ["005930", "000660"]}'
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+import config
+import tracing
+from company_index import normalize_code
+from features import FEATURE_NAMES
+
+ROUTES = ("health", "metrics", "score", "batch", "report")
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    # numpy 값 (7대 분야 점수 배열 등)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"JSON 으로 바꿀 수 없는 값: {type(value).__name__}")
+
+
+def dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def make_etag(key):
+    return '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:16] + '"'
+
+
+def _flag(query, name):
+    return query.get(name, ["0"])[-1].lower() in ("1", "true", "yes")
+
+
+class ScoringService:
+    # 요청 간에 공유하는 상태 - 스냅샷/모델/결과 테이블은 sheets, model_registry, dashboard 가 프로세스에 보관
+    # 여기서는 응답 본문 캐시와 경로별 지연 시간 통계만 관리
+
+    def __init__(self, reports=False, cache_entries=config.API_CACHE_MAX_ENTRIES):
+        import dashboard as db
+
+        self.db = db
+        self.reports = reports
+        self.cache_entries = cache_entries
+        self.started_at = time.time()
+        self._cache = OrderedDict()
+        self._latency = defaultdict(lambda: deque(maxlen=1000))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inputs(self, model_name=None):
+        # 지금의 (스냅샷, 모델) - 스냅샷은 TTL 이 지나면 백그라운드에서 갱신 (sheets.load_snapshot)
+        import sheets
+
+        try:
+            snapshot = sheets.load_snapshot()
+        except Exception as e:
+            raise ApiError(503, f"시트 스냅샷을 불러오지 못했습니다: {e}")
+        try:
+            model = self.db.get_model(model_name)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return snapshot, model
+
+    def warm(self, model_name=None):
+        # 시작할 때 스냅샷, 모델/explainer, 결과 테이블, 비교 기준 테이블을 미리 올려 둠 (첫 요청이 기다리지 않도록)
+        snapshot, model = self.inputs(model_name)
+        model.explainer()
+        self.db.get_results(snapshot, model)
+        self.db.get_benchmark_table(snapshot)
+        return snapshot, model
+
+    # === 응답 캐시 ===
+    def cached(self, key, build):
+        # key -> 본문 bytes (같은 키는 처음 한 번만 계산, 개수 제한 LRU)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._counts["cache.hit"] += 1
+                return self._cache[key]
+        body = dumps(build())
+        with self._lock:
+            self._counts["cache.miss"] += 1
+            self._cache[key] = body
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return body
+
+    # === 엔드포인트 ===
+    def health(self):
+        snapshot, model = self.inputs()
+        return {
+            "status": "ok", "snapshot_id": snapshot.snapshot_id, "snapshot_age_s": round(snapshot.age, 1),
+            "model_version": model.version, "models": self.db.models.names(),
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+
+    def score(self, code, model_name=None, with_price=False):
+        # -> (캐시 키, 본문 생성 함수)
+        snapshot, model = self.inputs(model_name)
+        price_info = None
+        if with_price:
+            import prices
+            price_info = prices.get_price(code)
+        key = ("score", code, snapshot.snapshot_id, model.version,
+               (price_info["price"], price_info["as_of"]) if price_info else None)
+
+        def build():
+            data = self.db.build_company_result(snapshot, model, code, price_info)
+            if data is None:
+                raise ApiError(404, f"종목을 찾을 수 없습니다: {code}")
+            return {"snapshot_id": snapshot.snapshot_id, **data}
+        return key, build
+
+    def batch(self, codes, model_name=None, details=False):
+        if len(codes) > config.API_MAX_BATCH:
+            raise ApiError(400, f"한 번에 최대 {config.API_MAX_BATCH}개 종목까지 요청할 수 있습니다. ({len(codes)}개)")
+        snapshot, model = self.inputs(model_name)
+        key = ("batch", tuple(codes), details, snapshot.snapshot_id, model.version)
+
+        def build():
+            import batch_scoring
+
+            results = self.db.get_results(snapshot, model)
+            found = [code for code in codes if code in results]
+            positions = [results.company_index.first_position(code) for code in found]
+            table = results.results.iloc[positions]
+            shap_matrix = table[batch_scoring.SHAP_COLUMNS].to_numpy(dtype=float)
+            top = (-shap_matrix).argsort(axis=1)[:, :3]
+
+            items = []
+            for i, (code, (_, row)) in enumerate(zip(found, table.iterrows())):
+                item = {
+                    "ticker": code, "company_name": row['company_name'], "sector": row['sector'],
+                    "risk_score": int(row['risk_score']), "prob": float(row['prob']),
+                    "lights": results.lights(row),
+                    # 위험을 가장 많이 높인 요인 3개 (SHAP 양수 상위, score_cli.py 와 같은 기준)
+                    "top_risk_factors": [FEATURE_NAMES[j] for j in top[i] if shap_matrix[i, j] > 0],
+                }
+                if details:
+                    item["shap"] = dict(zip(FEATURE_NAMES, shap_matrix[i].tolist()))
+                    item["scores"] = dict(zip(FEATURE_NAMES, results.scores(row).tolist()))
+                items.append(item)
+            return {
+                "snapshot_id": snapshot.snapshot_id, "model_version": model.version, "count": len(items),
+                "results": items, "missing": [code for code in codes if code not in results],
+            }
+        return key, build
+
+    def report(self, code, model_name=None):
+        # 리포트는 실패 메시지도 문자열로 돌아오므로 본문 캐시/ETag 없이 리포트 캐시(report_cache.py)에만 맡김
+        if not self.reports:
+            raise ApiError(404, "리포트 엔드포인트가 꺼져 있습니다. (--reports 로 실행)")
+        key, build = self.score(code, model_name)
+        data = json.loads(self.cached(key, build))
+        return {
+            "ticker": code, "snapshot_id": data["snapshot_id"], "model_version": data["model_version"],
+            "report": self.db.get_gemini_rag_analysis(data, data["shap_data"]),
+        }
+
+    # === 지연 시간 통계 ===
+    def record(self, route, elapsed_ms, status):
+        with self._lock:
+            self._latency[route].append(elapsed_ms)
+            self._counts[f"{route}.{status}"] += 1
+
+    def metrics(self):
+        with self._lock:
+            latency = {route: np.array(values) for route, values in self._latency.items()}
+            counts = dict(self._counts)
+            cache_entries = len(self._cache)
+        routes = {}
+        for route, values in latency.items():
+            if not len(values):
+                continue
+            p95 = float(np.percentile(values, 95))
+            routes[route] = {
+                "count": len(values), "p50_ms": round(float(np.percentile(values, 50)), 2),
+                "p95_ms": round(p95, 2), "max_ms": round(float(values.max()), 2),
+                "within_target": p95 <= config.API_LATENCY_TARGET_MS,
+            }
+        return {
+            "latency_target_ms": config.API_LATENCY_TARGET_MS, "routes": routes,
+            "counts": counts, "cache_entries": cache_entries,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None  # make_server 에서 지정
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        # 요청별 기록은 tracing 의 api.request 구간으로 남김 (DASHBOARD_TRACE=1)
+        pass
+
+    def send_error(self, code, message=None, explain=None):
+        # http.server 가 직접 보내는 오류 (지원하지 않는 메서드, 잘못된 요청 줄 등)도 HTML 대신 같은 JSON 형식
+        body = dumps({"error": message or self.responses.get(code, ("",))[0]})
+        self.send_response(code, message)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if self.command != "HEAD" and code >= 200 and code not in (204, 304):
+            self.wfile.write(body)
+
+    def _route(self, method, parts):
+        if method == "GET" and parts == ["health"]:
+            return "health"
+        if method == "GET" and parts == ["metrics"]:
+            return "metrics"
+        if parts[:2] == ["v1", "score"]:
+            if method == "GET" and len(parts) == 3:
+                return "score"
+            if len(parts) == 2:
+                return "batch"
+        if method == "GET" and parts[:2] == ["v1", "report"] and len(parts) == 3:
+            return "report"
+        return None
+
+    def _handle(self, method):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        route = self._route(method, parts) or "unknown"
+        status = 500
+        try:
+            with tracing.span("api.request", method=method, route=route) as span:
+                if route == "unknown":
+                    raise ApiError(404, f"없는 경로입니다: {method} {url.path}")
+                status = self._dispatch(route, method, parts, query, started)
+                span.set(status=status)
+        except ApiError as e:
+            status = e.status
+            self._send(status, dumps({"error": str(e)}), started)
+        except Exception as e:
+            print(f"⚠️ API 요청 처리 실패 ({method} {url.path}): {e}")
+            self._send(500, dumps({"error": f"내부 오류: {e}"}), started)
+        finally:
+            self.service.record(route, (time.perf_counter() - started) * 1000, status)
+
+    def _dispatch(self, route, method, parts, query, started):
+        service = self.service
+        model_name = query.get("model", [None])[-1]
+        if route == "health":
+            return self._send(200, dumps(service.health()), started)
+        if route == "metrics":
+            return self._send(200, dumps(service.metrics()), started)
+        if route == "report":
+            return self._send(200, dumps(service.report(normalize_code(parts[2]), model_name)), started)
+        if route == "score":
+            key, build = service.score(normalize_code(parts[2]), model_name, _flag(query, "price"))
+            return self._send_cached(key, build, started)
+
+        # batch: GET ?tickers=a,b / POST {"tickers": [...]}
+        details = _flag(query, "details")
+        if method == "POST":
+            body = self._read_json()
+            tickers = body.get("tickers")
+            if not isinstance(tickers, list):
+                raise ApiError(400, "요청 본문에 tickers 목록이 필요합니다.")
+            model_name = body.get("model", model_name)
+            details = bool(body.get("details", details))
+        else:
+            tickers = ",".join(query.get("tickers", [])).split(",")
+        codes = list(dict.fromkeys(normalize_code(t) for t in tickers if str(t).strip()))
+        if not codes:
+            raise ApiError(400, "종목 코드를 지정하세요. (tickers)")
+        key, build = service.batch(codes, model_name, details)
+        return self._send_cached(key, build, started)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "요청 본문이 올바른 JSON 이 아닙니다.")
+        if not isinstance(body, dict):
+            raise ApiError(400, "요청 본문은 JSON 객체여야 합니다.")
+        return body
+
+    def _send_cached(self, key, build, started):
+        # ETag 는 키만으로 정해지므로 클라이언트가 같은 ETag 를 보내면 본문을 만들지 않고 304
+        etag = make_etag(key)
+        if etag in [tag.strip() for tag in (self.headers.get("If-None-Match") or "").split(",")]:
+            tracing.count("api.not_modified")
+            return self._send(304, b"", started, etag)
+        return self._send(200, self.service.cached(key, build), started, etag)
+
+    def _send(self, status, body, started, etag=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")  # 매번 ETag 로 확인 (스냅샷/모델이 바뀌면 ETag 도 바뀜)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Server-Timing", f"app;dur={(time.perf_counter() - started) * 1000:.1f}")
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        return status
+
+
+def make_server(service, host=config.API_HOST, port=config.API_PORT):
+    # port=0 이면 빈 포트 자동 선택 (server.server_address 로 확인)
+    handler = type("ScoringHandler", (Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _configure(data_dir, cache_dir, model_name):
+    if data_dir:
+        config.DATA_DIR = data_dir
+    if cache_dir:
+        # 캐시 경로는 쓸 때 계산되므로 이미 import 된 모듈에도 적용됨
+        config.set_cache_dir(cache_dir)
+    if model_name:
+        # 레지스트리가 이미 만들어졌어도 적용되도록 config.MODEL_NAME 이 아니라 활성 모델을 직접 지정
+        import model_registry
+
+        model_registry.get_registry().set_active(model_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="부도 위험 JSON 스코어링 API")
+    parser.add_argument("--data-dir", help="sheet1.csv / sheet2.csv / sheet3.csv 가 있는 폴더 (기본: DASHBOARD_DATA_DIR 또는 Google 시트)")
+    parser.add_argument("--cache-dir", help="캐시 폴더 (기본: DASHBOARD_CACHE_DIR 또는 .cache)")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    parser.add_argument("--model", default=None, help="활성 모델 이름 (기본: DASHBOARD_MODEL 또는 model_xgb_new_23)")
+    parser.add_argument("--reports", action="store_true", help="/v1/report 엔드포인트 켜기 (Gemini 또는 DASHBOARD_GEMINI_STUB=1)")
+    parser.add_argument("--no-warm", action="store_true", help="시작할 때 스냅샷/모델/결과 테이블을 미리 올리지 않음")
+    args = parser.parse_args(argv)
+
+    try:
+        _configure(args.data_dir, args.cache_dir, args.model)
+    except ValueError as e:
+        parser.error(str(e))
+    service = ScoringService(reports=args.reports)
+
+    if not args.no_warm:
+        started = time.time()
+        snapshot, model = service.warm()
+        print(f"✅ 준비 완료: 스냅샷 {snapshot.snapshot_id} / 모델 {model.version} ({time.time() - started:.1f}초)")
+
+    server = make_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"✅ JSON API 시작: http://{host}:{port} (지연 시간 목표 p95 < {config.API_LATENCY_TARGET_MS:.0f} ms, 중지: Ctrl+C)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import streamlit as st
 st.set_page_config(layout="wide", page_title="잡았다 요놈! Risk Dashboard")
 
+import config
 import dashboard as db
-import plotly.graph_objects as go
+import prices
+import tracing
+import watchlist
 import pandas as pd
 import numpy as np
+import time
+# plotly(차트)는 사이드바를 먼저 그린 뒤 차트를 그릴 때 불러옵니다. (첫 화면 표시 시간 단축)
 
 # -----------------------------------------------------------------------------
 # 1. CSS 스타일 (사용자님 원본 유지)
@@ -26,48 +31,405 @@ st.markdown("""
 # 2. 사이드바 및 데이터 로드
 # -----------------------------------------------------------------------------
 st.sidebar.title("🔎 기업 검색")
+view_mode = st.sidebar.radio("보기", ["단일 기업", "여러 기업 비교", "기간별 추이", "위험 스크리너", "관심 종목"], horizontal=True)
+
+# 모델 버전 선택 (재시작 없이 교체) - 활성 모델은 시작할 때 백그라운드로 미리 로드
+db.models.preload()
+model_names = db.models.names()
+model_name = st.sidebar.selectbox(
+    "모델 버전", model_names,
+    index=model_names.index(db.models.active) if db.models.active in model_names else 0,
+)
+
+
+# 관심 종목 백그라운드 감시 (프로세스당 1회, 시트/활성 모델이 바뀌었을 때만 다시 계산)
+@st.cache_resource(show_spinner=False)
+def start_watch_scheduler():
+    return watchlist.WatchScheduler(watchlist.get_watchlist()).start(delay=config.WATCH_INTERVAL_SECONDS)
+
+
+if config.WATCH_INTERVAL_SECONDS > 0:
+    start_watch_scheduler()
+
+LIGHT_EMOJI = {"red": "🔴", "yellow": "🟡", "green": "🟢"}
+LIGHT_TITLES = {"f1": "재무 건전성", "macro": "시장 환경", "model": "부도 예측", "fraud": "회계 부정 징후", "text": "텍스트 분석"}
+
+
+def render_comparison_page():
+    # 여러 종목을 한 번에 스코어링해서 위험 점수와 7대 분야 점수를 겹쳐 비교
+    sector = st.sidebar.selectbox("섹터 전체 비교", ["(직접 입력)"] + db.list_sectors())
+    if sector == "(직접 입력)":
+        raw = st.sidebar.text_area("종목 코드 (쉼표 또는 줄바꿈으로 구분)", value="005930, 000660")
+        tickers = raw.replace(",", " ").split()
+    else:
+        tickers = db.sector_tickers(sector)
+
+    if len(tickers) > config.COMPARE_MAX_TICKERS:
+        st.sidebar.caption(f"⚠️ 최대 {config.COMPARE_MAX_TICKERS}개까지 비교합니다. (앞에서부터 {config.COMPARE_MAX_TICKERS}개)")
+        tickers = tickers[:config.COMPARE_MAX_TICKERS]
+
+    if st.sidebar.button("비교 시작"):
+        st.session_state['compare_tickers'] = tickers
+
+    compare_tickers = st.session_state.get('compare_tickers')
+    if not compare_tickers:
+        st.info("왼쪽에서 비교할 종목을 고른 뒤 비교 시작을 눌러 주세요.")
+        return
+
+    with st.spinner("데이터 분석 중..."):
+        comp = db.load_comparison(compare_tickers, model_name)
+    if comp is None:
+        st.error("⚠️ 비교할 종목을 찾을 수 없습니다. 다시 확인해주세요.")
+        return
+    if comp['missing']:
+        st.warning(f"시트에 없는 종목은 제외했습니다: {', '.join(comp['missing'])}")
+
+    df_comp = comp['companies']
+    st.title(f"📊 {len(df_comp)}개 기업 부도 리스크 비교")
+
+    # (1) 위험 점수 + 5대 신호등 표
+    df_table = df_comp[['ticker', 'company_name', 'sector', 'risk_score']].copy()
+    for group, title in LIGHT_TITLES.items():
+        df_table[title] = df_comp[group].map(LIGHT_EMOJI)
+    st.dataframe(
+        df_table.sort_values('risk_score', ascending=False),
+        hide_index=True, use_container_width=True,
+        column_config={
+            "ticker": "종목 코드", "company_name": "기업명", "sector": "섹터",
+            "risk_score": st.column_config.ProgressColumn("부도 위험 스코어", format="%d%%", min_value=0, max_value=100),
+        },
+    )
+
+    # (2) 7대 분야 점수 겹쳐 그리기 (섹터가 하나면 산업 평균도 표시)
+    import charts
+    st.divider()
+    st.subheader("📊 7대 핵심 건전성 비교")
+    labels = [f"{name} ({ticker})" for ticker, name in zip(df_comp['ticker'], df_comp['company_name'])]
+    references = [('정상 평균', comp['normal_scores'], 'green')]
+    if len(comp['industry_scores']) == 1:
+        references.append(('산업 평균', next(iter(comp['industry_scores'].values())), 'orange'))
+
+    col_bar, col_radar = st.columns(2)
+    with col_bar:
+        st.plotly_chart(charts.comparison_bar(comp['categories'], labels, comp['company_scores'], references),
+                        use_container_width=True)
+    with col_radar:
+        st.plotly_chart(charts.comparison_radar(comp['categories'], labels, comp['company_scores'], references),
+                        use_container_width=True)
+
+
+class ViewLoadError(Exception):
+    # 시트/모델 로드 실패 - 에러 메시지는 dashboard 가 이미 표시 (없는 종목 LookupError 와 구분)
+    pass
+
+
+def build_history(ticker, model_name):
+    import charts
+
+    hist = db.load_history(ticker, model_name)
+    if hist is db.LOAD_FAILED:
+        raise ViewLoadError(ticker)
+    if hist is None:
+        raise LookupError(ticker)
+    periods = hist['periods']
+    return {
+        "history": hist,
+        "risk": charts.history_risk(periods),
+        "lights": charts.history_lights(periods, list(LIGHT_TITLES), LIGHT_TITLES),
+        "drivers": charts.history_drivers(hist['drivers']),
+    }
+
+
+# 기간별 결과는 전체 배치 결과 테이블에서 꺼내므로, 차트까지 (종목, 스냅샷, 모델 버전)마다 한 번만 생성
+@st.cache_resource(max_entries=config.VIEW_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_history_view(ticker, snapshot_id, model_version, _model_name):
+    return build_history(ticker, _model_name)
+
+
+def render_history_page():
+    # 한 종목의 여러 기간(Sheet1 에서 같은 종목 코드인 행들) 위험 점수 / 신호등 / 주요 요인 추이
+    ticker = st.sidebar.text_input("종목 코드", value="005930", key="history_ticker")
+    key = db.view_key(ticker, model_name)
+    with st.spinner("데이터 분석 중..."):
+        try:
+            view = load_history_view(*key, model_name) if key is not None else build_history(ticker, model_name)
+        except ViewLoadError:
+            return
+        except LookupError:
+            st.error("⚠️ 해당 종목 코드를 찾을 수 없습니다. 다시 확인해주세요.")
+            return
+
+    hist = view['history']
+    periods = hist['periods']
+    st.title(f"📈 {hist['company_name']} ({hist['ticker']}) 기간별 리스크 추이")
+    st.caption(f"섹터: {hist['sector']} · 기간 {len(periods)}개 · 모델: {hist['model_version']}")
+
+    latest = periods.iloc[-1]
+    delta = int(latest['risk_score'] - periods.iloc[-2]['risk_score']) if len(periods) > 1 else None
+    st.metric(f"최근 기간({latest['period']}) 부도 위험 스코어", f"{latest['risk_score']}%",
+              delta=None if delta is None else f"{delta:+d}%p", delta_color="inverse")
+
+    st.plotly_chart(view['risk'], use_container_width=True)
+    st.plotly_chart(view['lights'], use_container_width=True)
+    st.plotly_chart(view['drivers'], use_container_width=True)
+
+    # 기간별 표 (신호등 + 위험을 가장 많이 높인 요인 3개)
+    df_table = periods[['period', 'risk_score']].copy()
+    for group, title in LIGHT_TITLES.items():
+        df_table[title] = periods[group].map(LIGHT_EMOJI)
+    df_table['주요 위험 요인'] = periods['top_risk_factors']
+    st.dataframe(
+        df_table, hide_index=True, use_container_width=True,
+        column_config={
+            "period": "기간",
+            "risk_score": st.column_config.ProgressColumn("부도 위험 스코어", format="%d%%", min_value=0, max_value=100),
+        },
+    )
+
+
+SCREENER_LABELS = {
+    "risk_score": "부도 위험 스코어", "prob": "부도 확률", "stock_code": "종목 코드",
+    "company_name": "기업명", "sector": "섹터",
+    **{f"light_{group}": f"신호등: {title}" for group, title in LIGHT_TITLES.items()},
+}
+
+
+def render_screener_page():
+    # 전체 기업을 위험 점수 순으로 - 섹터 / 신호등 / 피처 백분위 조건으로 거르고 원하는 컬럼으로 정렬
+    with st.spinner("전체 기업 결과 테이블 준비 중..."):
+        scr = db.load_screener(model_name)
+    if scr is None:
+        return
+
+    sectors = st.sidebar.multiselect("섹터", scr.sectors())
+    lights = {}
+    with st.sidebar.expander("🚦 신호등 조건"):
+        for group, title in LIGHT_TITLES.items():
+            lights[group] = st.multiselect(title, ["red", "yellow", "green"], format_func=LIGHT_EMOJI.get, key=f"screen_{group}")
+    percentiles = {}
+    with st.sidebar.expander("📊 지표 백분위 조건 (0~100점, 높을수록 우량)"):
+        for name in st.multiselect("지표", db.FEATURE_NAMES, format_func=lambda n: f"{n} ({db.FEATURE_MAP.get(n, n)})"):
+            percentiles[name] = st.slider(name, 0.0, 100.0, (0.0, 100.0), key=f"screen_pct_{name}")
+
+    sort_options = list(SCREENER_LABELS) + [f"score_{name}" for name in db.FEATURE_NAMES]
+    sort_by = st.sidebar.selectbox("정렬", sort_options, format_func=lambda c: SCREENER_LABELS.get(c, f"백분위: {c[len('score_'):]}"))
+    ascending = st.sidebar.toggle("오름차순", value=False)
+    page_size = st.sidebar.selectbox("페이지당 종목 수", [50, 100, 200, 500], index=1)
+
+    # 조건이 바뀌면 첫 페이지부터
+    conditions = (tuple(sectors), tuple((g, tuple(c)) for g, c in lights.items()), tuple(percentiles.items()), sort_by, ascending, page_size)
+    if st.session_state.get('screen_conditions') != conditions:
+        st.session_state['screen_conditions'] = conditions
+        st.session_state['screen_page'] = 1
+
+    page = st.session_state.get('screen_page', 1)
+    df_page, total = scr.query(sectors, lights, percentiles, sort_by, ascending,
+                               offset=(page - 1) * page_size, limit=page_size)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        page = st.session_state['screen_page'] = pages
+        df_page, total = scr.query(sectors, lights, percentiles, sort_by, ascending,
+                                   offset=(page - 1) * page_size, limit=page_size)
+    st.sidebar.number_input("페이지", min_value=1, max_value=pages, key='screen_page')
+
+    st.title("🔎 전체 기업 위험 스크리너")
+    st.caption(f"전체 {len(scr):,}개 중 조건에 맞는 기업 {total:,}개 · {page}/{pages} 페이지")
+
+    for group, title in LIGHT_TITLES.items():
+        df_page[f"light_{group}"] = df_page[f"light_{group}"].map(LIGHT_EMOJI)
+    st.dataframe(
+        df_page.drop(columns=['prob']), hide_index=True, use_container_width=True, height=600,
+        column_config={
+            "rank": "순위",
+            "risk_score": st.column_config.ProgressColumn("부도 위험 스코어", format="%d%%", min_value=0, max_value=100),
+            **{col: label for col, label in SCREENER_LABELS.items() if col != "risk_score"},
+            **{f"score_{name}": st.column_config.NumberColumn(f"{name} 백분위", format="%.1f") for name in db.FEATURE_NAMES},
+        },
+    )
+
+
+def render_watchlist_page():
+    # 관심 종목의 지난 확인 결과와 최근 알림 (활성 모델 기준)
+    wl = watchlist.get_watchlist()
+    raw = st.sidebar.text_input("추가할 종목 코드 (쉼표로 구분)")
+    if st.sidebar.button("관심 종목 추가") and raw.strip():
+        wl.add(raw.replace(",", " ").split())
+    removing = st.sidebar.multiselect("삭제할 종목", wl.tickers())
+    if removing and st.sidebar.button("선택 종목 삭제"):
+        wl.remove(removing)
+
+    st.title("⭐ 관심 종목 감시")
+    if st.button("지금 확인"):
+        with st.spinner("관심 종목 확인 중..."):
+            try:
+                alerts = watchlist.WatchScheduler(wl).run_once()
+                st.success(f"확인 완료 - 새 알림 {len(alerts)}건")
+            except Exception as e:
+                st.error(f"확인 실패: {e}")
+
+    state = wl.state()
+    interval = f"{config.WATCH_INTERVAL_SECONDS}초마다 자동 확인" if config.WATCH_INTERVAL_SECONDS > 0 else "자동 확인 꺼짐"
+    st.caption(f"마지막 확인: {state['checked_at'] or '-'} · 모델 {state['model_version'] or '-'} · {interval}")
+
+    rows = []
+    for code in wl.tickers():
+        entry = state["tickers"].get(code)
+        if entry is None or entry.get("missing"):
+            rows.append({"stock_code": code, "company_name": (entry or {}).get("company_name", code),
+                         "risk_score": None, "status": "시트에 없음" if entry else "확인 전"})
+            continue
+        rows.append({
+            "stock_code": code, "company_name": entry["company_name"], "risk_score": entry["risk_score"], "status": "",
+            **{f"light_{group}": LIGHT_EMOJI.get(color) for group, color in entry["lights"].items()},
+            "drivers": ", ".join(entry["drivers"]),
+        })
+    if rows:
+        st.dataframe(
+            pd.DataFrame(rows), hide_index=True, use_container_width=True,
+            column_config={
+                "risk_score": st.column_config.ProgressColumn("부도 위험 스코어", format="%d%%", min_value=0, max_value=100),
+                **{col: label for col, label in SCREENER_LABELS.items() if col != "risk_score"},
+                "status": "상태", "drivers": "주요 위험 요인",
+            },
+        )
+    else:
+        st.info("왼쪽에서 관심 종목을 추가하세요.")
+
+    st.subheader("🔔 최근 알림")
+    alerts = wl.alerts.read(limit=100)
+    if alerts:
+        st.dataframe(
+            pd.DataFrame(alerts)[["time", "ticker", "company_name", "message"]], hide_index=True, use_container_width=True,
+            column_config={"time": "시각", "ticker": "종목 코드", "company_name": "기업명", "message": "내용"},
+        )
+    else:
+        st.caption("아직 알림이 없습니다.")
+
+
+if view_mode == "여러 기업 비교":
+    render_comparison_page()
+    st.stop()
+
+if view_mode == "위험 스크리너":
+    render_screener_page()
+    st.stop()
+
+if view_mode == "기간별 추이":
+    render_history_page()
+    st.stop()
+
+if view_mode == "관심 종목":
+    render_watchlist_page()
+    st.stop()
+
 ticker_input = st.sidebar.text_input("종목 코드", value="005930") # 입력값 유지 위해 value 추가
 
+# 입력한 앞글자(코드 또는 기업명)로 종목 추천
+suggestions = db.suggest_tickers(ticker_input)
+if suggestions and ticker_input.strip() not in [code for code, _ in suggestions]:
+    picked = st.sidebar.selectbox(
+        "추천 종목", suggestions, format_func=lambda s: f"{s[0]} {s[1]}",
+        help="진단 시작을 누르면 선택한 종목으로 진단합니다."
+    )
+    ticker_input = picked[0]
+stream_report = st.sidebar.toggle("AI 리포트 실시간 출력", value=True, help="생성되는 대로 리포트를 바로 보여줍니다.")
+show_diagnostics = st.sidebar.toggle("진단 정보 보기", value=False, help="단계별 소요 시간, 캐시 적중, 데이터 크기를 보여줍니다.")
+
+# 시장 전체 종가를 백그라운드로 미리 받아 두기 (프로세스당 1회)
+prices.warm_in_background()
+
 if st.sidebar.button("진단 시작"):
     st.session_state['run'] = True
     st.session_state['current_ticker'] = ticker_input
 
-if st.session_state.get('run'):
-    with st.spinner("데이터 분석 중..."):
-        # ticker_input 대신 세션의 ticker 사용 (새로고침 방지)
-        target_ticker = st.session_state.get('current_ticker', ticker_input)
-        data = db.load_data_and_model(target_ticker)
-        
-        if data is None:
-            st.error("⚠️ 해당 종목 코드를 찾을 수 없습니다. 다시 확인해주세요.")
-            st.stop()
 
-    # 변수 정의 (에러 방지용으로 최상단 배치)
-    shap_data = data['shap_data']     
-    df_all = pd.DataFrame(shap_data)  
-    risk = data['risk_score']         
-    
-    # -------------------------------------------------------------------------
-    # 3. 메인 UI 헤더 (원본 디자인 유지)
-    # -------------------------------------------------------------------------
+def render_diagnostics(trace):
+    # 이번 실행의 단계별 소요 시간 / 캐시 적중 / 데이터 크기 (사이드바)
+    summary = trace.summary()
+    with st.sidebar.expander("⏱️ 진단 정보 (이번 실행)", expanded=True):
+        st.metric("전체 소요 시간", f"{summary['total_ms']:,.0f} ms")
+        if summary['spans']:
+            df_spans = pd.DataFrame(summary['spans'])
+            st.dataframe(df_spans[['name', 'start_ms', 'ms', 'thread']], hide_index=True, use_container_width=True)
+        if summary['counters']:
+            st.caption("캐시 적중 / 횟수")
+            st.dataframe(pd.Series(summary['counters'], name="횟수"), use_container_width=True)
+        if summary['sizes']:
+            st.caption("데이터 크기")
+            st.dataframe(pd.Series(summary['sizes'], name="bytes"), use_container_width=True)
+        st.caption(f"trace_id: {summary['trace_id']}")
+
+
+# -----------------------------------------------------------------------------
+# 3. 화면 구성 - 결과/차트 캐시 + 구역별 fragment
+# -----------------------------------------------------------------------------
+# 결과와 Plotly 차트는 (종목, 스냅샷, 모델 버전)마다 한 번만 만들어 세션끼리 공유하고,
+# 각 구역은 st.fragment 로 나눠서 구역 안의 조작은 그 구역만 다시 실행합니다.
+# (헤더의 모델 A/B 비교 토글 등 - 전체 파이프라인/차트 생성을 다시 하지 않음)
+def build_view(ticker, model_name):
+    import charts
+
+    data = db.load_data_and_model(ticker, model_name)
+    if data is db.LOAD_FAILED:
+        raise ViewLoadError(ticker)
+    if data is None:
+        raise LookupError(ticker)
+    radar = data['category_scores']
+    scores = ([float(s) for s in radar['company']], [float(s) for s in radar['industry']],
+              [float(s) for s in radar['normal']])
+    return {
+        "data": data,
+        "category_bar": charts.category_bar(db.CATEGORIES, *scores),
+        "category_radar": charts.category_radar(db.CATEGORIES, *scores),
+        "shap_bar": charts.shap_bar(data['shap_data']),
+    }
+
+
+# 현재 주가도 결과에 들어 있으므로 주가 캐시와 같은 주기로 새로 만듦
+@st.cache_resource(max_entries=config.VIEW_CACHE_MAX_ENTRIES, ttl=config.PRICE_TTL_SECONDS, show_spinner=False)
+def load_view(ticker, snapshot_id, model_version, _model_name):
+    return build_view(ticker, _model_name)
+
+
+@st.fragment
+def render_header(data):
     st.title(f"📊 {data['ticker']} 통합 부도 리스크 분석")
     
     col_h1, col_h2 = st.columns([1, 2])
     with col_h1: 
-        st.metric("현재 주가", f"{data['price']:,.0f}원")
+        price_info = data['price_info']
+        st.metric("현재 주가", f"{data['price']:,.0f}원" if data['price'] is not None else "조회 실패")
+        if price_info['stale'] and price_info['as_of']:
+            st.caption(f"⚠️ 최신 시세 조회 실패 - {price_info['as_of']} 기준 가격입니다.")
     with col_h2:
+        risk = data['risk_score']
         st.subheader(f"🚨 부도 위험 스코어: {risk}%")
         st.progress(risk/100)
-    
-    st.divider()
-    
+        st.caption(f"모델: {data['model_version']}")
+
+    if st.toggle("모델 A/B 비교", value=False, help="같은 종목을 모든 모델 버전으로 스코어링해 나란히 보여줍니다."):
+        # 모델 버전별 위험 점수 / 신호등 (처음 보는 버전은 전체 배치 계산 후 캐시)
+        with st.spinner("모델 버전별 스코어링 중..."):
+            df_ab = db.compare_models(data['ticker'])
+        if df_ab is not None:
+            for group, title in LIGHT_TITLES.items():
+                df_ab[title] = df_ab.pop(group).map(LIGHT_EMOJI)
+            st.dataframe(
+                df_ab.drop(columns=['prob']), hide_index=True, use_container_width=True,
+                column_config={
+                    "model_name": "모델", "model_version": "버전 태그", "active": "활성 모델",
+                    "risk_score": st.column_config.ProgressColumn("부도 위험 스코어", format="%d%%", min_value=0, max_value=100),
+                },
+            )
+
+
+@st.fragment
+def render_traffic_lights(ind):
     st.subheader("🚦 5대 핵심 리스크 감지")
     
     # 5개 컬럼 생성
     c1, c2, c3, c4, c5 = st.columns(5)
     
-    ind = data['indicators']
-    
     # 신호등 그리는 함수 (디자인 유지)
     def draw_light(col, title, subtitle, status, icon):
         colors = {"red": "#FFEBEE", "yellow": "#FFFDE7", "green": "#E8F5E9"}
@@ -100,166 +462,157 @@ if st.session_state.get('run'):
     # 5. 텍스트 분석
     draw_light(c5, "텍스트 분석", "공시 보고서 내 텍스트 분석", ind.get('text'), "📝")
 
-    # --------------------------------------------------------------------------------
-    # 4. 7대 핵심 건전성 분석 (수정된 로직 적용)
-    # --------------------------------------------------------------------------------
-    st.divider()
+
+@st.fragment
+def render_category_charts(view):
+    # 7대 핵심 건전성 분석 - 분야 분류/결측치 제외 평균은 dashboard, 차트는 charts.py 에서 만들어 캐시
     st.subheader("📊 7대 핵심 건전성 분석")
     st.caption("※ 49개 세부 지표를 7가지 핵심 역량으로 그룹화하여 분석한 결과입니다. (점수가 높을수록 우량/안전)")
 
-    # (1) 매핑 로직 (요청하신 네이밍 적용)
-    def get_category(name):
-        name = name.lower()
-        if any(x in name for x in ['roa', 'roe', 'interest_coverage']): return '💰 수익성'
-        if any(x in name for x in ['debt', 'current_ratio', 'retained']): return '🛡️ 재무안정성'
-        if any(x in name for x in ['equity_growth']): return '📈 성장성'
-        if any(x in name for x in ['kmv', 'z_score', 'm_score']): return '🔎 탐지모델'
-        if name.startswith('m_'): return '🌍 거시환경'
-        if 'prob' in name: return '📝 NLP분석'
-        if 'lex' in name: return '❤️ 감성분석'
-        return '기타'
-
-    # (2) 데이터 그룹화
-    radar_data = {} 
-    target_categories = ['💰 수익성', '🛡️ 재무안정성', '📈 성장성', '🔎 탐지모델', '🌍 거시환경', '📝 NLP분석', '❤️ 감성분석']
-    
-    for cat in target_categories:
-        radar_data[cat] = {'company': [], 'industry': [], 'normal': []}
-
-    for item in shap_data:
-        cat = get_category(item['name'])
-        if cat in radar_data:
-            radar_data[cat]['company'].append(item['score'])
-            radar_data[cat]['industry'].append(item['industry_avg'])
-            radar_data[cat]['normal'].append(item['normal_avg'])
-
-    # (3) 평균 계산 함수 (결측치 제외 로직)
-    def get_valid_mean(scores):
-        # 유효한 숫자만 필터링
-        valid_scores = [s for s in scores if pd.notna(s) and isinstance(s, (int, float))]
-        
-        # 유효한 데이터가 하나라도 있으면 평균 계산
-        if len(valid_scores) > 0:
-            return sum(valid_scores) / len(valid_scores)
-        
-        # 유효한 데이터가 아예 없으면 50점(중립) 반환
-        return 50.0
-
-    # 최종 점수 계산
-    final_cats = []
-    c_scores, i_scores, n_scores = [], [], []
-
-    for cat in target_categories:
-        final_cats.append(cat)
-        # 있는 데이터끼리만 평균 내기
-        c_scores.append(get_valid_mean(radar_data[cat]['company']))
-        i_scores.append(get_valid_mean(radar_data[cat]['industry']))
-        n_scores.append(get_valid_mean(radar_data[cat]['normal']))
-
-    # (4) 차트 그리기
     col_bar, col_radar = st.columns(2)
-
     # [왼쪽] 바 차트
     with col_bar:
-        fig_bar = go.Figure()
-        
-        # 내 기업
-        fig_bar.add_trace(go.Bar(
-            x=final_cats, y=c_scores, 
-            name='대상 기업', marker_color='#2962ff',
-            text=[f"{s:.0f}" for s in c_scores], textposition='auto',
-            hovertemplate="<b>%{x}</b><br>건전성: %{y:.1f}점<extra></extra>"
-        ))
-        # 정상 평균
-        fig_bar.add_trace(go.Bar(x=final_cats, y=n_scores, name='정상 평균', marker_color='green', opacity=0.5))
-        # 산업 평균
-        fig_bar.add_trace(go.Bar(x=final_cats, y=i_scores, name='산업 평균', marker_color='orange', opacity=0.5))
-        
-        fig_bar.update_layout(
-            title="분야별 건전성 점수 비교", barmode='group',
-            yaxis=dict(title="점수 (100점 만점)", range=[0, 100]),
-            height=400, legend=dict(orientation="h", y=-0.2)
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
-
+        st.plotly_chart(view['category_bar'], use_container_width=True)
     # [오른쪽] 레이더 차트
     with col_radar:
-        def wrap(l): return l + [l[0]] 
-        
-        fig_radar = go.Figure()
-        
-        # 1. 정상/산업 (배경)
-        # [수정 3] showlegend=True로 변경 (기본값이 True이므로 False 옵션 삭제)
-        fig_radar.add_trace(go.Scatterpolar(
-            r=wrap(n_scores), theta=wrap(final_cats), 
-            name='정상 평균', 
-            line=dict(color='green', dash='solid'),       # 진한 녹색 선 (두께 2)
-        ))
-        
-        fig_radar.add_trace(go.Scatterpolar(
-            r=wrap(i_scores), theta=wrap(final_cats), 
-            name='산업 평균', 
-            line=dict(color='orange', dash='dash')
-        ))
-        
-        # 2. 내 기업 (메인)
-        fig_radar.add_trace(go.Scatterpolar(
-            r=wrap(c_scores), theta=wrap(final_cats), 
-            name='분석 대상', 
-            fill='toself', 
-            line=dict(color='#2962ff', width=3), 
-            opacity=0.4,
-            hovertemplate="<b>%{theta}</b><br>건전성: %{r:.1f}점<extra></extra>"
-        ))
-        
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(visible=True, range=[0, 100], ticksuffix="점", gridcolor='#eee'),
-                angularaxis=dict(gridcolor='#eee', tickfont=dict(size=12, color='black')),
-                bgcolor='white'
-            ),
-            title="다차원 건전성 균형도",
-            height=400,
-            margin=dict(t=40, b=40, l=40, r=40),
-            legend=dict(orientation="h", y=-0.15) # 범례 표시
-        )
-        st.plotly_chart(fig_radar, use_container_width=True)
+        st.plotly_chart(view['category_radar'], use_container_width=True)
 
-    # --------------------------------------------------------------------------------
-    # 5. SHAP 전체 출력 (토글 적용 + 잘림 방지)
-    # --------------------------------------------------------------------------------
-    st.divider()
+
+@st.fragment
+def render_shap_detail(view):
+    # SHAP 전체 출력 (토글 적용 + 잘림 방지)
     st.subheader("📉 전체 요인별 상세 분석")
     st.caption("※ 클릭하면 모든 49개 지표의 기여도를 볼 수 있습니다.")
 
     with st.expander("🔍 전체 지표 기여도 보기 (Click to Open)", expanded=False):
-        # 데이터 개수에 따라 높이 자동 조절 (항목당 30px)
-        dynamic_height = max(500, len(df_all) * 30)
-        
-        fig_shap_all = go.Figure(go.Bar(
-            y=df_all['name'], 
-            x=df_all['shap'], 
-            orientation='h',
-            marker_color=['#ff5252' if x > 0 else '#2962ff' for x in df_all['shap']], 
-            customdata=[db.FEATURE_MAP.get(n, n) for n in df_all['name']],
-            hovertemplate="<b>%{customdata}</b> (%{y})<br>기여도: %{x:+.4f}<extra></extra>"
+        st.plotly_chart(view['shap_bar'], use_container_width=True)
+
+
+# What-if 시뮬레이터도 (종목, 스냅샷, 모델 버전)마다 한 번 만들어 공유 (원래 값 / 조정 전 결과 포함)
+@st.cache_resource(max_entries=config.VIEW_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_simulator(ticker, snapshot_id, model_version, _model_name):
+    return db.load_simulator(ticker, _model_name)
+
+
+@st.fragment
+def render_whatif(ticker, model_name):
+    # 지표 값을 바꾸면 이 구역만 다시 실행 (한 줄 predict/SHAP + 백분위 조회, 민감도 곡선은 predict 한 번)
+    import charts
+
+    st.subheader("🧪 What-if 시뮬레이션")
+    st.caption("※ 지표 값을 바꿨을 때 부도 위험 / 신호등 / 기여도가 어떻게 달라지는지 봅니다. (시트 데이터는 바뀌지 않음)")
+    if not st.toggle("시뮬레이션 열기", value=False, key="whatif_open"):
+        return
+    key = db.view_key(ticker, model_name)
+    sim = load_simulator(*key, model_name) if key is not None else db.load_simulator(ticker, model_name)
+    if sim is None:
+        return
+
+    names = st.multiselect("조정할 지표", db.FEATURE_NAMES, format_func=lambda n: f"{n} ({db.FEATURE_MAP.get(n, n)})",
+                           key="whatif_features")
+    overrides = {}
+    cols = st.columns(3)
+    for i, name in enumerate(names):
+        base_value = sim.value(name)
+        with cols[i % 3]:
+            if np.isfinite(base_value) and base_value != 0:
+                # 원래 값 대비 변화율 (예: 부채비율 -20%)
+                pct = st.slider(f"{name} 변화율 (%)", -100, 200, 0, step=5, key=f"whatif_pct_{name}")
+                overrides[name] = base_value * (1 + pct / 100)
+                st.caption(f"{base_value:,.4g} → {overrides[name]:,.4g}")
+            else:
+                # 원래 값이 0 이거나 없으면 값을 직접 입력
+                overrides[name] = st.number_input(
+                    f"{name} 값 (원래: {'없음' if np.isnan(base_value) else 0})", value=0.0, format="%.4f",
+                    key=f"whatif_val_{name}",
+                )
+
+    sweep_options = names + [n for n in db.FEATURE_NAMES if n not in names]
+    sweep_name = st.selectbox("민감도 곡선 지표", sweep_options, key="whatif_sweep",
+                              format_func=lambda n: f"{n} ({db.FEATURE_MAP.get(n, n)})")
+
+    started = time.perf_counter()
+    base, result = sim.baseline, sim.evaluate(overrides)
+    sweep = sim.sweep(sweep_name, overrides=overrides)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    col_score, col_lights = st.columns([1, 2])
+    with col_score:
+        st.metric("부도 위험 스코어", f"{result['risk_score']}%",
+                  delta=f"{result['risk_score'] - base['risk_score']:+d}%p", delta_color="inverse")
+    with col_lights:
+        st.markdown("  \n".join(
+            f"**{title}** {LIGHT_EMOJI[base['lights'][group]]} → {LIGHT_EMOJI[result['lights'][group]]}"
+            for group, title in LIGHT_TITLES.items()
         ))
-        
-        fig_shap_all.update_layout(
-            height=dynamic_height,  
-            yaxis=dict(
-                dtick=1, 
-                categoryorder='total ascending', 
-                automargin=True 
-            ),
-            xaxis_title="부도 위험 기여도 (SHAP Value)",
-            margin=dict(l=10, r=10, t=30, b=50)
+
+    changes = sim.compare(result)
+    if len(changes):
+        st.dataframe(
+            changes.head(15), hide_index=True, use_container_width=True,
+            column_config={
+                "name": "지표", "value_before": "원래 값", "value_after": "조정 값",
+                "shap_before": st.column_config.NumberColumn("기여도(전)", format="%+.4f"),
+                "shap_after": st.column_config.NumberColumn("기여도(후)", format="%+.4f"),
+                "score_before": st.column_config.NumberColumn("백분위(전)", format="%.1f"),
+                "score_after": st.column_config.NumberColumn("백분위(후)", format="%.1f"),
+                "shap_delta": st.column_config.NumberColumn("기여도 변화", format="%+.4f"),
+            },
         )
-        st.plotly_chart(fig_shap_all, use_container_width=True)
+    st.plotly_chart(charts.whatif_sweep(sweep, sweep_name, sim.value(sweep_name), overrides.get(sweep_name)),
+                    use_container_width=True)
+    st.caption(f"계산 시간 {elapsed_ms:.0f} ms (조정 결과 + 민감도 곡선 {len(sweep)}개 지점)")
 
-    # --------------------------------------------------------------------------------
-    # 6. Gemini 리포트
-    # --------------------------------------------------------------------------------
-    st.divider()
+
+@st.fragment
+def render_report(data, report_future, diagnostics):
     st.subheader("✨ Generative AI 리포트")
-    st.info(db.get_gemini_rag_analysis(data, shap_data))
\ No newline at end of file
+    with tracing.activate(diagnostics):
+        if report_future is None:
+            # 생성되는 대로 한 줄씩 출력 (캐시된 리포트는 기록된 그대로 재생)
+            with st.container(border=True):
+                st.write_stream(db.stream_gemini_rag_analysis(data, data['shap_data']))
+        else:
+            report_box = st.empty()
+            if not report_future.done():
+                report_box.info("✍️ AI 리포트를 작성하고 있습니다...")
+            report_box.info(db.wait_gemini_rag_analysis(report_future))
+
+
+if st.session_state.get('run'):
+    # 진단 정보 보기를 켜면 이번 실행의 기록을 모아 사이드바에 표시
+    diagnostics = tracing.Trace("diagnosis") if show_diagnostics else None
+
+    with st.spinner("데이터 분석 중..."), tracing.activate(diagnostics):
+        # ticker_input 대신 세션의 ticker 사용 (새로고침 방지)
+        target_ticker = st.session_state.get('current_ticker', ticker_input)
+        key = db.view_key(target_ticker, model_name)
+        try:
+            with tracing.span("view.load", cached=key is not None):
+                view = load_view(*key, model_name) if key is not None else build_view(target_ticker, model_name)
+        except ViewLoadError:
+            st.stop()
+        except LookupError:
+            st.error("⚠️ 해당 종목 코드를 찾을 수 없습니다. 다시 확인해주세요.")
+            st.stop()
+    data = view['data']
+
+    # AI 리포트는 백그라운드에서 미리 생성 시작 (차트를 먼저 그리고 맨 아래에서 결과 표시)
+    # 실시간 출력 모드에서는 맨 아래에서 스트리밍으로 생성
+    with tracing.activate(diagnostics):
+        report_future = None if stream_report else db.request_gemini_rag_analysis(data, data['shap_data'])
+
+    render_header(data)
+    st.divider()
+    render_traffic_lights(data['indicators'])
+    st.divider()
+    render_category_charts(view)
+    st.divider()
+    render_shap_detail(view)
+    st.divider()
+    render_whatif(data['ticker'], model_name)
+    st.divider()
+    render_report(data, report_future, diagnostics)
+
+    if diagnostics is not None:
+        render_diagnostics(diagnostics)
@@ -0,0 +1,237 @@
+# batch_scoring.py
+# Sheet1 전체 기업을 한 번에 스코어링해서 결과 테이블로 만들어 두는 배치 엔진
+#  - predict_proba 1회 + SHAP 1회 (전체 행)
+#  - 백분위 점수 / 5대 신호등도 행렬 단위로 계산
+# 대시보드 요청은 이 테이블에서 종목 코드로 한 줄만 꺼내 쓰면 됩니다.
+import os
+
+import numpy as np
+import pandas as pd
+
+import config
+import feature_store
+import scoring
+import tracing
+from company_index import normalize_code
+from features import FEATURE_NAMES
+
+RESULTS_FORMAT = 2  # 결과 테이블 계산 규칙이 바뀌면 올림 (예전 파일은 다시 계산)
+
+SHAP_COLUMNS = [f"shap_{name}" for name in FEATURE_NAMES]
+SCORE_COLUMNS = [f"score_{name}" for name in FEATURE_NAMES]
+LIGHT_COLUMNS = [f"light_{group}" for group in scoring.LIGHT_GROUPS]
+
+
+def company_sector(company_row):
+    # 컬럼명이 '섹터'일 수도 있고 '산업군'일 수도 있어서 둘 다 확인
+    if '섹터' in company_row:
+        return str(company_row['섹터']).strip()
+    if '산업군' in company_row:
+        return str(company_row['산업군']).strip()
+    return "Unknown"
+
+
+def sector_column(df):
+    # company_sector 의 프레임 버전 (행 단위 루프 없이 한 번에)
+    for col in ('섹터', '산업군'):
+        if col in df.columns:
+            return df[col].astype(str).str.strip()
+    return pd.Series("Unknown", index=df.index)
+
+
+def model_inputs(df):
+    # 모델 입력 행렬 (49개 컬럼 순서 강제 정렬, 숫자 변환 실패/누락은 0)
+    X = df.reindex(columns=FEATURE_NAMES).apply(pd.to_numeric, errors='coerce').fillna(0)
+    return X.astype(float)
+
+
+def model_frame(features):
+    # (행 수, 피처 수) 피처 행렬(결측치 NaN) -> 모델 입력 (결측치만 0으로 채운 같은 행렬, model_inputs 와 같은 값)
+    return pd.DataFrame(np.where(np.isnan(features), 0.0, features), columns=FEATURE_NAMES)
+
+
+def score_matrix(features, model, explainer, percentile_index):
+    # (행 수, 피처 수) 피처 행렬(결측치 NaN)을 한 번에 스코어링 -> (확률, SHAP 행렬, 백분위 점수 행렬, 신호등)
+    X = model_frame(features)
+    with tracing.span("batch.predict_proba", rows=len(X)):
+        probs = model.predict_proba(X)[:, 1]
+    with tracing.span("batch.shap", rows=len(X)):
+        shap_matrix = np.asarray(explainer.shap_values(X), dtype=float).reshape(len(X), len(FEATURE_NAMES))
+    # 백분위 점수는 결측치를 0으로 채우지 않은 원래 값 기준 (결측치는 50점)
+    with tracing.span("batch.scores", rows=len(X)):
+        scores = percentile_index.scores(features)
+    with tracing.span("batch.traffic_lights", rows=len(X)):
+        lights = scoring.traffic_lights(shap_matrix)
+    return probs, shap_matrix, scores, lights
+
+
+def score_frame(df, model, explainer, percentile_index):
+    # 시트 프레임 버전 (누락 피처 0 채우기 + 숫자 변환 후 score_matrix)
+    with tracing.span("batch.coerce", rows=len(df)):
+        features = scoring.to_feature_matrix(scoring.fill_missing_features(df))
+    return score_matrix(features, model, explainer, percentile_index)
+
+
+def get_percentile_index(snapshot):
+    # 스냅샷당 한 번, 피처 저장소의 float32 컬럼으로 백분위 인덱스 생성
+    return snapshot.memo("percentile_index", lambda snap: scoring.PercentileIndex.from_store(
+        feature_store.get_feature_store(snap)
+    ))
+
+
+def build_results_table(snapshot, model, explainer, percentile_index):
+    # Sheet1 행과 같은 인덱스를 갖는 결과 테이블
+    # 피처 값은 스냅샷의 float32 피처 저장소에서 바로 읽음 (숫자 변환 반복 없음)
+    store = feature_store.get_feature_store(snapshot)
+    probs, shap_matrix, scores, lights = score_matrix(store.matrix(), model, explainer, percentile_index)
+    return _results_frame(snapshot.company, probs, shap_matrix, scores, lights)
+
+
+def update_results_table(base_results, snapshot, model, explainer, percentile_index):
+    # 이전 스냅샷 결과 테이블(base_results)에서 바뀌지 않은 행은 그대로 가져오고
+    #  - 바뀐/새 행: predict / SHAP / 백분위 / 신호등을 다시 계산
+    #  - 그대로인 행: 분포가 바뀐 피처의 백분위 점수만 다시 계산
+    # (행 매칭과 바뀐 피처는 피처 저장소가 만들 때 계산해 둠 - feature_store.py)
+    # 시트에 없는 피처는 저장소에 0으로 채워져 있어서 전체 재계산(build_results_table)과 같은 입력
+    store = feature_store.get_feature_store(snapshot)
+    X = store.matrix()
+    base_positions = np.asarray(store.base_positions)
+    reused = base_positions >= 0
+    changed_rows = np.flatnonzero(~reused)
+    changed_features = [FEATURE_NAMES.index(name) for name in store.changed_features]
+
+    base = base_results.iloc[base_positions[reused]]
+    # 확률은 모델 출력과 같은 dtype 으로 (risk_score 정수 변환 결과가 전체 재계산과 같도록)
+    probs = np.empty(len(X), dtype=base_results['prob'].dtype)
+    shap_matrix = np.empty((len(X), len(FEATURE_NAMES)))
+    scores = np.empty((len(X), len(FEATURE_NAMES)))
+    lights = {group: np.empty(len(X), dtype=object) for group in scoring.LIGHT_GROUPS}
+
+    probs[reused] = base['prob'].to_numpy()
+    shap_matrix[reused] = base[SHAP_COLUMNS].to_numpy(dtype=float)
+    scores[reused] = base[SCORE_COLUMNS].to_numpy(dtype=float)
+    for group in scoring.LIGHT_GROUPS:
+        lights[group][reused] = base[f"light_{group}"].to_numpy()
+
+    if changed_features and reused.any():
+        with tracing.span("batch.rescore_features", features=len(changed_features)):
+            scores[np.ix_(reused, changed_features)] = percentile_index.scores(
+                X[reused][:, changed_features], columns=changed_features
+            )
+
+    if len(changed_rows):
+        row_probs, row_shap, row_scores, row_lights = score_matrix(
+            X[changed_rows], model, explainer, percentile_index
+        )
+        probs[changed_rows] = row_probs
+        shap_matrix[changed_rows] = row_shap
+        scores[changed_rows] = row_scores
+        for group, colors in row_lights.items():
+            lights[group][changed_rows] = colors
+
+    tracing.count("results_table.rows_reused", int(reused.sum()))
+    tracing.count("results_table.rows_rescored", len(changed_rows))
+    return _results_frame(snapshot.company, probs, shap_matrix, scores, lights)
+
+
+def _results_frame(df_company, probs, shap_matrix, scores, lights):
+    if 'Company_Name' in df_company.columns:
+        names = df_company['Company_Name']
+    else:
+        names = df_company['stock_code']
+
+    results = pd.DataFrame({
+        "stock_code": df_company['stock_code'].map(normalize_code),
+        "company_name": names,
+        "sector": sector_column(df_company),
+        "prob": probs,
+        "risk_score": (probs * 100).astype(int),
+    }, index=df_company.index)
+
+    results = pd.concat([
+        results,
+        pd.DataFrame({f"light_{group}": colors for group, colors in lights.items()}, index=df_company.index),
+        pd.DataFrame(shap_matrix, columns=SHAP_COLUMNS, index=df_company.index),
+        pd.DataFrame(scores, columns=SCORE_COLUMNS, index=df_company.index),
+    ], axis=1)
+    return results
+
+
+def results_dir():
+    return config.cache_path("results")
+
+
+def _results_path(snapshot_id, model_version):
+    return os.path.join(results_dir(), f"{snapshot_id}_{model_version}_v{RESULTS_FORMAT}.pkl")
+
+
+def _load_base_results(snapshot, model_version):
+    # 피처 저장소가 비교 기준으로 삼은 이전 스냅샷의 결과 테이블 (같은 모델 버전만)
+    base_id = feature_store.get_feature_store(snapshot).base_snapshot_id
+    if base_id is None:
+        return None
+    path = _results_path(base_id, model_version)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"⚠️ 이전 결과 테이블 읽기 실패: {e}")
+        return None
+
+
+def load_results_table(snapshot, model, explainer, percentile_index, model_version):
+    # 디스크에 같은 (스냅샷, 모델) 결과가 있으면 재사용, 없으면 계산 후 저장
+    path = _results_path(snapshot.snapshot_id, model_version)
+    if os.path.exists(path):
+        try:
+            with tracing.span("results_table.read"):
+                results = pd.read_pickle(path)
+            tracing.count("results_table.disk_hit")
+            return results
+        except Exception as e:
+            print(f"⚠️ 결과 테이블 읽기 실패: {e}")
+
+    tracing.count("results_table.miss")
+    base_results = _load_base_results(snapshot, model_version)
+    if base_results is not None:
+        # 이전 스냅샷 결과가 있으면 바뀐 행/피처만 다시 계산
+        with tracing.span("results_table.update", rows=len(snapshot.company)):
+            results = update_results_table(base_results, snapshot, model, explainer, percentile_index)
+    else:
+        with tracing.span("results_table.build", rows=len(snapshot.company)):
+            results = build_results_table(snapshot, model, explainer, percentile_index)
+    os.makedirs(results_dir(), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    results.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    tracing.size("results_table.bytes", os.path.getsize(path))
+    return results
+
+
+class ResultsLookup:
+    # 결과 테이블 + CompanyIndex (종목 코드 -> 행 위치, O(1) 조회)
+
+    def __init__(self, results, company_index):
+        self.results = results
+        self.company_index = company_index
+
+    def __contains__(self, code):
+        return code in self.company_index
+
+    def get(self, code):
+        # code 는 6자리 문자열 (예: '005930')
+        # 같은 종목 코드가 여러 줄이면 첫 줄 사용 (기존 동작과 동일)
+        pos = self.company_index.first_position(code)
+        if pos is None:
+            return None
+        return self.results.iloc[pos]
+
+    def shap_values(self, row):
+        return row[SHAP_COLUMNS].to_numpy(dtype=float)
+
+    def scores(self, row):
+        return row[SCORE_COLUMNS].to_numpy(dtype=float)
+
+    def lights(self, row):
+        return {group: row[f"light_{group}"] for group in scoring.LIGHT_GROUPS}
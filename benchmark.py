@@ -0,0 +1,371 @@
+# benchmark.py
+# load_data_and_model 파이프라인 단계별 성능 측정
+#  - pykrx / 구글 시트 / Gemini 대신 로컬 대체물 사용 (네트워크 없이 실행)
+#  - 1k / 10k / 100k 개 기업의 합성 데이터로 규모별 시간 측정
+#    (전체 SHAP 배치가 기업 수에 비례해 가장 오래 걸림 - 100k 는 수십 분 걸릴 수 있음)
+#  - 결과는 JSON 으로 저장하고, 저장해 둔 기준(baseline)과 비교
+#
+# 사용 예)
+#   python benchmark.py                                  # 1k, 10k, 100k 측정 -> bench_results.json
+#   python benchmark.py --sizes 1000 10000 --save-baseline
+#   python benchmark.py --baseline bench_baseline.json --fail-on-regression
+#   python benchmark.py --imports-only                   # 시작(import) 시간 예산만 확인 (넘으면 종료 코드 1)
+# 시작 시간 예산은 테스트로도 확인합니다 (tests/test_import_budget.py - pytest 에서 예산을 넘으면 실패)
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# 시작 시간 측정 대상 모듈과, import 만으로는 불러오면 안 되는 무거운 라이브러리
+# (각 단계가 실제로 실행될 때 불러와야 함 - dashboard.py / app.py 참고)
+IMPORT_TARGETS = ["dashboard", "charts"]
+LAZY_MODULES = ["streamlit", "google.generativeai", "streamlit_gsheets", "joblib", "xgboost", "shap", "pykrx", "plotly.express"]
+DEFAULT_IMPORT_BUDGET_MS = 1500.0
+SECTORS = ['전기전자', '화학', '운송', '건설', '유통', '금융', '서비스업', '의약품']
+
+
+# === 합성 데이터 (로컬 대체물) ===
+def write_synthetic_sheets(directory, n_companies, seed=0):
+    # sheet1.csv(기업별) / sheet2.csv(산업 평균) / sheet3.csv(정상·부도 평균)
+    from features import FEATURE_NAMES
+
+    rng = np.random.default_rng(seed)
+    features = rng.normal(size=(n_companies, len(FEATURE_NAMES)))
+    # 실제 시트처럼 결측치를 조금 섞음
+    features[rng.random(features.shape) < 0.02] = np.nan
+
+    df_company = pd.DataFrame(features, columns=FEATURE_NAMES)
+    df_company.insert(0, 'stock_code', np.arange(n_companies) + 100)
+    df_company.insert(1, 'Company_Name', [f"기업{i:06d}" for i in range(n_companies)])
+    # 섹터 하나는 Sheet2 에 없도록 해서 Fallback 경로도 포함
+    df_company.insert(2, '섹터', [SECTORS[i % len(SECTORS)] for i in range(n_companies)])
+
+    df_ind_avg = df_company.groupby('섹터')[FEATURE_NAMES].mean().reset_index()
+    df_ind_avg = df_ind_avg[df_ind_avg['섹터'] != SECTORS[-1]]
+
+    df_stat_avg = pd.DataFrame([
+        {**df_company[FEATURE_NAMES].mean().to_dict(), 'Target': 0},
+        {**(df_company[FEATURE_NAMES].mean() + 1).to_dict(), 'Target': 1},
+    ])
+
+    os.makedirs(directory, exist_ok=True)
+    df_company.to_csv(os.path.join(directory, "sheet1.csv"), index=False)
+    df_ind_avg.to_csv(os.path.join(directory, "sheet2.csv"), index=False)
+    df_stat_avg.to_csv(os.path.join(directory, "sheet3.csv"), index=False)
+    return df_company
+
+
+def install_stand_ins():
+    # pykrx / Gemini 대신 로컬 함수 사용
+    import prices
+
+    def fake_latest_close(code):
+        return 70000.0, pd.Timestamp.now().strftime("%Y%m%d")
+
+    prices._fetch_latest_close = fake_latest_close
+    config.GEMINI_STUB = True
+
+
+# === 기존(백분위 재계산) 방식 - 비교용 ===
+def legacy_calculate_score(df_company, val, col_name):
+    from features import LOWER_IS_BETTER
+    try:
+        val = float(val)
+        if pd.isna(val): return 50
+        all_values = pd.to_numeric(df_company[col_name], errors='coerce').dropna()
+        if all_values.empty: return 50
+        score = (all_values < val).mean() * 100
+        if col_name in LOWER_IS_BETTER:
+            score = 100 - score
+        return np.clip(score, 0, 100)
+    except Exception:
+        return 50
+
+
+# === 측정 도구 ===
+def measure(fn, repeat=5):
+    # fn 을 repeat 번 실행한 시간의 중앙값 (ms)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+# === 시작(import) 시간 ===
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": ms, "eager": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    # 매번 새 프로세스에서 import 시간 측정 -> (중앙값 ms, 함께 불러와진 무거운 라이브러리 목록)
+    times, eager = [], set()
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "DASHBOARD_CACHE_DIR": config.CACHE_DIR}
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=repo_dir, env=env, capture_output=True, text=True, check=True,
+        )
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(probe["ms"])
+        eager.update(probe["eager"])
+    return statistics.median(times), sorted(eager)
+
+
+def bench_imports(repeat, budget_ms):
+    # 모듈별 import 시간 + 예산 초과/무거운 라이브러리 즉시 로드 목록
+    phases, failures = {}, []
+    for module in IMPORT_TARGETS:
+        ms, eager = measure_import(module, repeat)
+        phases[f"import_{module}"] = round(ms, 4)
+        if ms > budget_ms:
+            failures.append(f"{module}: {ms:.0f} ms > 예산 {budget_ms:.0f} ms")
+        if eager:
+            failures.append(f"{module}: import 시점에 불러옴 - {', '.join(eager)}")
+    return phases, failures
+
+
+def bench_size(n_companies, data_root, repeat):
+    import batch_scoring
+    import benchmark_table
+    import company_index
+    import dashboard as db
+    import feature_store
+    import joblib
+    import model_registry
+    import scoring
+    import screener
+    import sheets
+    import whatif
+    from features import FEATURE_NAMES
+
+    data_dir = os.path.join(data_root, f"universe_{n_companies}")
+    write_synthetic_sheets(data_dir, n_companies)
+    config.DATA_DIR = data_dir
+
+    phases = {}
+    snapshot = None
+
+    # 1. 데이터 로드 (CSV 파싱 + 스냅샷 저장)
+    def fetch():
+        nonlocal snapshot
+        snapshot = sheets.refresh_snapshot()
+    phases["fetch"] = measure(fetch, repeat=min(repeat, 3))
+
+    # 2. 피처 저장소 / 인덱스 생성 (스냅샷당 1회)
+    phases["feature_store_build"] = measure(lambda: feature_store.build_feature_store(snapshot), repeat=1)
+    store = feature_store.get_feature_store(snapshot)
+    phases["feature_store_matrix"] = measure(store.matrix, repeat)
+    phases["company_index_build"] = measure(lambda: company_index.CompanyIndex(snapshot), repeat=min(repeat, 3))
+    phases["percentile_index_build"] = measure(lambda: scoring.PercentileIndex.from_store(store), repeat=min(repeat, 3))
+
+    companies = db.get_company_index(snapshot)
+    percentile_index = batch_scoring.get_percentile_index(snapshot)
+    df_company = snapshot.company
+    sample_codes = companies.codes[:: max(1, len(companies) // 50)][:50]
+    code = sample_codes[len(sample_codes) // 2]
+    row = df_company.iloc[companies.first_position(code)]
+
+    # 3. 종목 행 찾기 (인덱스 vs 기존 전체 스캔)
+    phases["row_match"] = measure(lambda: [companies.first_position(c) for c in sample_codes], repeat) / len(sample_codes)
+    phases["row_match_scan"] = measure(
+        lambda: df_company[df_company['stock_code'].astype(str).str.zfill(6) == code], repeat
+    )
+
+    # 4. 한 종목 단위 모델 단계
+    # 모델 로드: 기존 pickle(joblib) vs 레지스트리가 변환해 둔 XGBoost 바이너리
+    active = db.get_model()
+    phases["model_load_pickle"] = measure(lambda: joblib.load(db.models.paths[active.name]), repeat=min(repeat, 3))
+    native_path = os.path.join(model_registry.native_dir(), f"{active.version}.ubj")
+    if os.path.exists(native_path):
+        phases["model_load_native"] = measure(lambda: model_registry.load_native(native_path), repeat=min(repeat, 3))
+
+    model = db.load_model()
+    explainer = db.load_explainer()
+    X_one = batch_scoring.model_inputs(df_company.iloc[[companies.first_position(code)]])
+    phases["feature_coercion"] = measure(lambda: batch_scoring.model_inputs(df_company.iloc[[0]]), repeat)
+    phases["predict_proba"] = measure(lambda: model.predict_proba(X_one), repeat)
+    phases["shap"] = measure(lambda: explainer.shap_values(X_one), repeat)
+
+    # 5. 백분위 점수 147회 (회사/산업/정상 x 49개)
+    rows = [row, df_company.iloc[1], df_company.iloc[2]]
+    phases["calculate_score_147"] = measure(
+        lambda: percentile_index.scores(scoring.to_feature_matrix(rows)), repeat
+    )
+    phases["calculate_score_147_legacy"] = measure(
+        lambda: [legacy_calculate_score(df_company, r[name], name) for r in rows for name in FEATURE_NAMES],
+        repeat=min(repeat, 3),
+    )
+    # 산업/정상 평균 비교 기준 테이블 (스냅샷당 1회) vs 요청마다 섹터로 조회
+    phases["benchmark_table_build"] = measure(
+        lambda: benchmark_table.BenchmarkTable(snapshot, companies, percentile_index), repeat=min(repeat, 3)
+    )
+    benchmarks = db.get_benchmark_table(snapshot)
+    sector = companies.sector(code)
+    phases["benchmark_lookup"] = measure(
+        lambda: (benchmarks.industry_scores(sector), benchmarks.normal_scores), repeat
+    )
+
+    # 6. 신호등
+    shap_data = [{"name": name, "shap": float(v)} for name, v in zip(FEATURE_NAMES, explainer.shap_values(X_one)[0])]
+    phases["traffic_lights"] = measure(lambda: db.determine_traffic_lights_by_group(shap_data), repeat)
+
+    # 7. 전체 유니버스 배치 (predict + SHAP + 점수 + 신호등) - 스냅샷당 1회, 디스크에 저장됨
+    phases["batch_results_table"] = measure(
+        lambda: batch_scoring.load_results_table(snapshot, model, explainer, percentile_index, db.model_version()),
+        repeat=1,
+    )
+    X_all = batch_scoring.model_inputs(df_company)
+    phases["batch_traffic_lights"] = measure(
+        lambda: scoring.traffic_lights(np.zeros((len(X_all), len(FEATURE_NAMES)))), repeat=min(repeat, 3)
+    )
+
+    # 전체 유니버스 스크리너 (결과 테이블 -> 컬럼 배열 1회, 이후 조건/정렬/페이지 조회)
+    results_table = db.get_results(snapshot).results
+    phases["screener_build"] = measure(lambda: screener.Screener(results_table, companies), repeat=min(repeat, 3))
+    scr = db.load_screener()
+    phases["screener_query"] = measure(lambda: scr.query(
+        sectors=SECTORS[:3], lights={"f1": ["red", "yellow"]}, percentiles={FEATURE_NAMES[0]: (10, 90)},
+        sort_by=f"score_{FEATURE_NAMES[1]}", offset=100, limit=100,
+    ), repeat)
+
+    # What-if 시뮬레이터 (조정 한 번 = 한 줄 SHAP + 백분위, 민감도 곡선 = predict 한 번)
+    sim = whatif.Simulator(snapshot, db.get_model(), code)
+    overrides = {FEATURE_NAMES[3]: 0.5}
+    phases["whatif_evaluate"] = measure(lambda: sim.evaluate(overrides), repeat)
+    phases["whatif_sweep"] = measure(lambda: sim.sweep(FEATURE_NAMES[3], overrides=overrides), repeat)
+
+    # 8. load_data_and_model 전체 (첫 요청 = 디스크 결과 테이블 로드 포함 / 이후 요청)
+    phases["load_data_and_model_cold"] = measure(lambda: db.load_data_and_model(code), repeat=1)
+    phases["load_data_and_model_warm"] = measure(lambda: db.load_data_and_model(code), repeat)
+
+    # 9. 리포트 (Gemini 대신 로컬 스텁, 캐시 적중 포함)
+    data = db.load_data_and_model(code)
+    phases["report_prompt"] = measure(lambda: db.build_report_prompt(data, data["shap_data"]), repeat)
+    phases["report_stub"] = measure(lambda: db.get_gemini_rag_analysis(data, data["shap_data"]), repeat)
+
+    return {phase: round(ms, 4) for phase, ms in phases.items()}
+
+
+# === 기준 비교 ===
+def compare(results, baseline, tolerance, min_delta_ms):
+    # 기준보다 (1 + tolerance) 배 넘게, 그리고 min_delta_ms 이상 느려진 단계 목록
+    regressions = []
+    for size, phases in results["results"].items():
+        base_phases = baseline.get("results", {}).get(size, {})
+        for phase, ms in phases.items():
+            base = base_phases.get(phase)
+            if base is None:
+                continue
+            ratio = ms / base if base > 0 else float("inf")
+            mark = ""
+            if ms > base * (1 + tolerance) and ms - base > min_delta_ms:
+                regressions.append((size, phase, base, ms))
+                mark = "  ❌ 느려짐"
+            print(f"  [{size:>7}] {phase:<28} {base:>10.4f} -> {ms:>10.4f} ms  (x{ratio:.2f}){mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="load_data_and_model 단계별 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="합성 기업 수 목록")
+    parser.add_argument("--repeat", type=int, default=5, help="단계별 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--output", default="bench_results.json", help="결과 JSON 경로")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="비교할 기준 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="허용 느려짐 비율 (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="이보다 작은 차이는 무시 (ms)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="느려진 단계가 있으면 종료 코드 1")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help="모듈별 import 시간 예산 (ms) - 넘으면 종료 코드 1")
+    parser.add_argument("--imports-only", action="store_true", help="import 시간만 측정 (합성 데이터 측정 생략)")
+    args = parser.parse_args(argv)
+
+    # 캐시/데이터는 임시 폴더에서 (기존 캐시 재사용 방지)
+    work_dir = tempfile.mkdtemp(prefix="dashboard-bench-")
+    config.set_cache_dir(os.path.join(work_dir, "cache"))
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    install_stand_ins()
+
+    import xgboost
+
+    results = {
+        "meta": {
+            "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "xgboost": xgboost.__version__,
+            "explain_backend": config.EXPLAIN_BACKEND,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    print("▶ 시작(import) 시간 측정 중...")
+    import_phases, import_failures = bench_imports(args.repeat, args.import_budget_ms)
+    results["results"]["import"] = import_phases
+    for phase, ms in import_phases.items():
+        print(f"  {phase:<28} {ms:>10.4f} ms")
+
+    for n_companies in [] if args.imports_only else args.sizes:
+        print(f"▶ {n_companies:,}개 기업 측정 중...")
+        phases = bench_size(n_companies, os.path.join(work_dir, "data"), args.repeat)
+        results["results"][str(n_companies)] = phases
+        for phase, ms in phases.items():
+            print(f"  {phase:<28} {ms:>10.4f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
+
+    exit_code = 0
+    if import_failures:
+        for failure in import_failures:
+            print(f"❌ 시작 시간 예산 초과 - {failure}")
+        exit_code = 1
+    else:
+        print(f"✅ 시작 시간 예산 이내 ({args.import_budget_ms:.0f} ms)")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"기준 저장: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"기준 비교: {args.baseline}")
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ 느려진 단계 {len(regressions)}개")
+            if args.fail_on_regression:
+                exit_code = 1
+        else:
+            print("✅ 기준 대비 느려진 단계 없음")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# benchmark_table.py
+# 스냅샷마다 한 번 만드는 비교 기준 점수 테이블 (산업 평균 / 정상기업 평균)
+#  - Sheet2 섹터별 평균 행 + Sheet3 정상기업(Target 0) 행을 한 번에 백분위 점수화
+#  - 행마다 49개 피처 점수와 7대 분야 평균을 함께 보관
+#  - Sheet2 에 없는 섹터는 만들 때 정상기업 평균으로 연결해 둠 (요청마다 매칭/대체 판단 안 함)
+# 같은 섹터 기업들은 비교 기준이 모두 같으므로, 요청은 섹터 이름으로 한 줄만 꺼냅니다.
+import scoring
+import tracing
+from company_index import normalize_sector
+
+
+def normal_row(df_stat_avg):
+    # 정상기업 평균 (Target 0) - Target 0 인 데이터가 하나도 없으면 첫 번째 줄
+    normal = df_stat_avg[df_stat_avg['Target'] == 0]
+    return normal.iloc[0] if len(normal) else df_stat_avg.iloc[0]
+
+
+class BenchmarkTable:
+
+    def __init__(self, snapshot, companies, percentile_index):
+        df_ind_avg = snapshot.industry
+        industry_sectors = companies.industry_sectors()
+        rows = [df_ind_avg.iloc[companies.industry_position(sector)] for sector in industry_sectors]
+        rows.append(normal_row(snapshot.stat))
+
+        with tracing.span("benchmark_table.build", rows=len(rows)):
+            # (섹터 수 + 1, 49) - 마지막 줄이 정상기업 평균
+            self.scores = percentile_index.scores(scoring.to_feature_matrix(rows))
+            self.categories = scoring.category_scores(self.scores)
+        self.normal_position = len(rows) - 1
+
+        # 섹터 -> 테이블 행 위치 (Sheet1 섹터 중 Sheet2 에 없는 것은 정상기업 평균 행)
+        self._positions = {sector: pos for pos, sector in enumerate(industry_sectors)}
+        self.fallback_sectors = [sector for sector in companies.sectors() if sector not in self._positions]
+        for sector in self.fallback_sectors:
+            self._positions[sector] = self.normal_position
+
+    def __len__(self):
+        return len(self.scores)
+
+    def matched(self, sector):
+        # Sheet2 에 해당 섹터 평균이 있는지 (없으면 정상기업 평균으로 대체됨)
+        return self._positions.get(normalize_sector(sector), self.normal_position) != self.normal_position
+
+    def industry_scores(self, sector):
+        return self.scores[self._positions.get(normalize_sector(sector), self.normal_position)]
+
+    def industry_categories(self, sector):
+        return self.categories[self._positions.get(normalize_sector(sector), self.normal_position)]
+
+    @property
+    def normal_scores(self):
+        return self.scores[self.normal_position]
+
+    @property
+    def normal_categories(self):
+        return self.categories[self.normal_position]
@@ -0,0 +1,243 @@
+# charts.py
+# 대시보드 Plotly 차트
+#  - 단일 기업 화면: 7대 분야 막대/레이더 차트, 49개 지표 SHAP 기여도
+#    (app.py 가 (종목, 스냅샷, 모델 버전)마다 한 번 만들어 캐시해 두고 재사용)
+#  - 기간별 추이 화면: 위험 점수 / 5대 신호등 / 주요 SHAP 요인의 기간별 변화
+#  - What-if 시뮬레이션: 피처 하나를 바꿔 가며 본 부도 위험 민감도 곡선
+#  - 여러 기업 비교 화면: 7대 분야 점수를 기업별로 겹쳐 그리기
+#    scores: (기업 수, 분야 수) 점수 배열 / labels: 기업별 범례 이름
+#    references: [(이름, 분야별 점수, 색), ...] 산업/정상 평균 같은 기준선 (점선)
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+from features import FEATURE_MAP
+
+PALETTE = qualitative.Dark24
+
+
+def _close(values):
+    # 레이더 차트 선을 닫기 위해 첫 값을 끝에 한 번 더
+    values = list(values)
+    return values + values[:1]
+
+
+# === 단일 기업 화면 ===
+def category_bar(categories, company, industry, normal):
+    fig = go.Figure()
+
+    # 내 기업
+    fig.add_trace(go.Bar(
+        x=categories, y=list(company),
+        name='대상 기업', marker_color='#2962ff',
+        text=[f"{s:.0f}" for s in company], textposition='auto',
+        hovertemplate="<b>%{x}</b><br>건전성: %{y:.1f}점<extra></extra>"
+    ))
+    # 정상 평균
+    fig.add_trace(go.Bar(x=categories, y=list(normal), name='정상 평균', marker_color='green', opacity=0.5))
+    # 산업 평균
+    fig.add_trace(go.Bar(x=categories, y=list(industry), name='산업 평균', marker_color='orange', opacity=0.5))
+
+    fig.update_layout(
+        title="분야별 건전성 점수 비교", barmode='group',
+        yaxis=dict(title="점수 (100점 만점)", range=[0, 100]),
+        height=400, legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+def category_radar(categories, company, industry, normal):
+    fig = go.Figure()
+
+    # 1. 정상/산업 (배경)
+    fig.add_trace(go.Scatterpolar(
+        r=_close(normal), theta=_close(categories),
+        name='정상 평균',
+        line=dict(color='green', dash='solid'),       # 진한 녹색 선 (두께 2)
+    ))
+
+    fig.add_trace(go.Scatterpolar(
+        r=_close(industry), theta=_close(categories),
+        name='산업 평균',
+        line=dict(color='orange', dash='dash')
+    ))
+
+    # 2. 내 기업 (메인)
+    fig.add_trace(go.Scatterpolar(
+        r=_close(company), theta=_close(categories),
+        name='분석 대상',
+        fill='toself',
+        line=dict(color='#2962ff', width=3),
+        opacity=0.4,
+        hovertemplate="<b>%{theta}</b><br>건전성: %{r:.1f}점<extra></extra>"
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, 100], ticksuffix="점", gridcolor='#eee'),
+            angularaxis=dict(gridcolor='#eee', tickfont=dict(size=12, color='black')),
+            bgcolor='white'
+        ),
+        title="다차원 건전성 균형도",
+        height=400,
+        margin=dict(t=40, b=40, l=40, r=40),
+        legend=dict(orientation="h", y=-0.15) # 범례 표시
+    )
+    return fig
+
+
+def shap_bar(shap_data):
+    # 49개 지표 전체 SHAP 기여도 (데이터 개수에 따라 높이 자동 조절 - 항목당 30px)
+    names = [item['name'] for item in shap_data]
+    values = [item['shap'] for item in shap_data]
+    fig = go.Figure(go.Bar(
+        y=names,
+        x=values,
+        orientation='h',
+        marker_color=['#ff5252' if x > 0 else '#2962ff' for x in values],
+        customdata=[FEATURE_MAP.get(n, n) for n in names],
+        hovertemplate="<b>%{customdata}</b> (%{y})<br>기여도: %{x:+.4f}<extra></extra>"
+    ))
+
+    fig.update_layout(
+        height=max(500, len(shap_data) * 30),
+        yaxis=dict(
+            dtick=1,
+            categoryorder='total ascending',
+            automargin=True
+        ),
+        xaxis_title="부도 위험 기여도 (SHAP Value)",
+        margin=dict(l=10, r=10, t=30, b=50)
+    )
+    return fig
+
+
+# === 기간별 추이 화면 ===
+LIGHT_LEVELS = {"green": 0, "yellow": 1, "red": 2}
+
+
+def history_risk(periods):
+    # periods: dashboard.load_history 의 기간별 표 (period, risk_score, ...)
+    fig = go.Figure(go.Scatter(
+        x=periods['period'], y=periods['risk_score'], mode="lines+markers+text",
+        text=[f"{s}%" for s in periods['risk_score']], textposition="top center",
+        line=dict(color='#ff5252', width=3), name='부도 위험 스코어',
+        hovertemplate="<b>%{x}</b><br>부도 위험: %{y}%<extra></extra>"
+    ))
+    fig.update_layout(
+        title="부도 위험 스코어 추이",
+        xaxis=dict(type="category"),
+        yaxis=dict(title="점수 (%)", range=[0, 105]),
+        height=350, margin=dict(t=40, b=40, l=40, r=40)
+    )
+    return fig
+
+
+def history_lights(periods, groups, titles):
+    # 신호등 그룹 x 기간 색상 격자 (초록/노랑/빨강)
+    z = [[LIGHT_LEVELS.get(color, 0) for color in periods[group]] for group in groups]
+    fig = go.Figure(go.Heatmap(
+        z=z, x=list(periods['period']), y=[titles[group] for group in groups],
+        zmin=0, zmax=2, showscale=False, xgap=3, ygap=3,
+        colorscale=[[0, '#A5D6A7'], [0.5, '#FFF59D'], [1, '#EF9A9A']],
+        customdata=[list(periods[group]) for group in groups],
+        hovertemplate="<b>%{y}</b> (%{x})<br>%{customdata}<extra></extra>"
+    ))
+    fig.update_layout(
+        title="5대 리스크 신호등 추이",
+        xaxis=dict(type="category"), yaxis=dict(autorange="reversed"),
+        height=300, margin=dict(t=40, b=40, l=10, r=10)
+    )
+    return fig
+
+
+def history_drivers(driver_shap):
+    # driver_shap: (기간 x 요인) SHAP 값 표 - 양수면 위험을 높인 요인
+    fig = go.Figure()
+    for i, name in enumerate(driver_shap.columns):
+        fig.add_trace(go.Scatter(
+            x=list(driver_shap.index), y=driver_shap[name], mode="lines+markers",
+            name=name, line=dict(color=PALETTE[i % len(PALETTE)], width=2),
+            customdata=[FEATURE_MAP.get(name, name)] * len(driver_shap),
+            hovertemplate="<b>%{customdata}</b> (%{x})<br>기여도: %{y:+.4f}<extra></extra>"
+        ))
+    fig.add_hline(y=0, line=dict(color='#999', width=1))
+    fig.update_layout(
+        title="주요 요인별 기여도(SHAP) 추이",
+        xaxis=dict(type="category"),
+        yaxis=dict(title="부도 위험 기여도 (SHAP Value)"),
+        height=400, legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+# === What-if 시뮬레이션 ===
+def whatif_sweep(sweep, name, base_value, current_value=None):
+    # sweep: whatif.Simulator.sweep 결과 (value, risk_score, ...) / 원래 값과 조정한 값은 세로선으로 표시
+    fig = go.Figure(go.Scatter(
+        x=sweep['value'], y=sweep['prob'] * 100, mode="lines",
+        line=dict(color='#ff5252', width=3), name='부도 위험 스코어',
+        hovertemplate=f"{name} = %{{x:.4g}}<br>부도 위험: %{{y:.1f}}%<extra></extra>"
+    ))
+    if base_value is not None and base_value == base_value:
+        fig.add_vline(x=base_value, line=dict(color='#2962ff', dash='dash'), annotation_text="원래 값")
+    if current_value is not None and current_value == current_value and current_value != base_value:
+        fig.add_vline(x=current_value, line=dict(color='#ff9100', dash='dot'), annotation_text="조정 값")
+    fig.update_layout(
+        title=f"{FEATURE_MAP.get(name, name)} 민감도",
+        xaxis=dict(title=name), yaxis=dict(title="점수 (%)", range=[0, 105]),
+        height=350, margin=dict(t=40, b=40, l=40, r=40)
+    )
+    return fig
+
+
+# === 여러 기업 비교 화면 ===
+def comparison_bar(categories, labels, scores, references=()):
+    fig = go.Figure()
+    for i, (label, row) in enumerate(zip(labels, scores)):
+        fig.add_trace(go.Bar(
+            x=categories, y=list(row), name=label, marker_color=PALETTE[i % len(PALETTE)],
+            hovertemplate="<b>%{x}</b><br>%{fullData.name}: %{y:.1f}점<extra></extra>"
+        ))
+    for name, row, color in references:
+        fig.add_trace(go.Scatter(
+            x=categories, y=list(row), name=name, mode="lines+markers",
+            line=dict(color=color, dash="dash"),
+            hovertemplate="<b>%{x}</b><br>%{fullData.name}: %{y:.1f}점<extra></extra>"
+        ))
+
+    fig.update_layout(
+        title="분야별 건전성 점수 비교", barmode='group',
+        yaxis=dict(title="점수 (100점 만점)", range=[0, 100]),
+        height=450, legend=dict(orientation="h", y=-0.2)
+    )
+    return fig
+
+
+def comparison_radar(categories, labels, scores, references=()):
+    fig = go.Figure()
+    # 기준선(산업/정상 평균)을 먼저 그려서 기업 선 아래에 깔리도록
+    for name, row, color in references:
+        fig.add_trace(go.Scatterpolar(
+            r=_close(row), theta=_close(categories), name=name,
+            line=dict(color=color, dash="dash"),
+            hovertemplate="<b>%{theta}</b><br>%{fullData.name}: %{r:.1f}점<extra></extra>"
+        ))
+    for i, (label, row) in enumerate(zip(labels, scores)):
+        fig.add_trace(go.Scatterpolar(
+            r=_close(row), theta=_close(categories), name=label,
+            line=dict(color=PALETTE[i % len(PALETTE)], width=2), opacity=0.8,
+            hovertemplate="<b>%{theta}</b><br>%{fullData.name}: %{r:.1f}점<extra></extra>"
+        ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, 100], ticksuffix="점", gridcolor='#eee'),
+            angularaxis=dict(gridcolor='#eee', tickfont=dict(size=12, color='black')),
+            bgcolor='white'
+        ),
+        title="다차원 건전성 균형도 비교",
+        height=450,
+        margin=dict(t=40, b=40, l=40, r=40),
+        legend=dict(orientation="h", y=-0.15)
+    )
+    return fig
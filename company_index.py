@@ -0,0 +1,139 @@
+# company_index.py
+# 스냅샷마다 한 번 만드는 조회용 인덱스
+#  - 6자리 종목 코드 -> Sheet1 행 위치 (같은 코드가 여러 기간이면 모두)
+#  - 정규화된 섹터 이름 -> Sheet2 행 위치 / 섹터에 속한 종목 코드 목록
+#  - 종목 코드·기업명 앞글자 검색 (사이드바 추천용)
+from bisect import bisect_left
+
+SECTOR_COLUMNS = ('섹터', '산업군')
+# 기간(결산 연도/분기) 컬럼 후보 - 없으면 시트 순서대로 1기, 2기, ...
+PERIOD_COLUMNS = ('기간', '연도', '결산연도', 'period', 'year', 'Year')
+
+
+def normalize_code(code):
+    # 종목 코드를 6자리 문자열로 (예: 5930 -> 005930)
+    return str(code).strip().zfill(6)
+
+
+def normalize_sector(sector):
+    return str(sector).strip()
+
+
+def _sector_column(df):
+    for col in SECTOR_COLUMNS:
+        if col in df.columns:
+            return col
+    return None
+
+
+def period_labels(rows):
+    # 같은 종목의 행들(시트 순서) -> 기간 이름 목록
+    for col in PERIOD_COLUMNS:
+        if col in rows.columns:
+            return rows[col].astype(str).str.strip().tolist()
+    return [f"{i + 1}기" for i in range(len(rows))]
+
+
+def _prefix_range(sorted_keys, prefix):
+    # 정렬된 키 목록에서 prefix 로 시작하는 구간 [lo, hi)
+    lo = bisect_left(sorted_keys, prefix)
+    hi = bisect_left(sorted_keys, prefix + "\uffff")
+    return lo, hi
+
+
+class CompanyIndex:
+
+    def __init__(self, snapshot):
+        df_company = snapshot.company
+        df_ind_avg = snapshot.industry
+
+        codes = df_company['stock_code'].map(normalize_code).tolist()
+        if 'Company_Name' in df_company.columns:
+            names = df_company['Company_Name'].astype(str).tolist()
+        else:
+            names = codes
+        sector_col = _sector_column(df_company)
+        sectors = df_company[sector_col].map(normalize_sector).tolist() if sector_col else ["Unknown"] * len(codes)
+
+        # 1. 종목 코드 -> 행 위치 목록 (시트 순서 유지)
+        self._positions = {}
+        self._names = {}
+        self._sectors = {}
+        for pos, (code, name, sector) in enumerate(zip(codes, names, sectors)):
+            self._positions.setdefault(code, []).append(pos)
+            self._names.setdefault(code, name)
+            self._sectors.setdefault(code, sector)
+
+        # 2. 섹터 -> 종목 코드 목록
+        self._codes_by_sector = {}
+        for code, sector in self._sectors.items():
+            self._codes_by_sector.setdefault(sector, []).append(code)
+
+        # 3. 섹터 -> Sheet2(산업평균) 행 위치 (같은 섹터가 여러 줄이면 첫 줄)
+        self._industry_positions = {}
+        ind_col = _sector_column(df_ind_avg)
+        if ind_col:
+            for pos, sector in enumerate(df_ind_avg[ind_col].map(normalize_sector)):
+                self._industry_positions.setdefault(sector, pos)
+
+        # 4. 앞글자 검색용 정렬 목록
+        self._sorted_codes = sorted(self._positions)
+        self._sorted_names = sorted((name, code) for code, name in self._names.items())
+        self._sorted_name_keys = [name for name, _ in self._sorted_names]
+
+    def __contains__(self, code):
+        return code in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def codes(self):
+        return list(self._positions)
+
+    def positions(self, code):
+        # 해당 종목의 모든 행 위치 (없으면 빈 리스트)
+        return self._positions.get(code, [])
+
+    def first_position(self, code):
+        positions = self._positions.get(code)
+        return positions[0] if positions else None
+
+    def company_name(self, code):
+        return self._names.get(code, code)
+
+    def sector(self, code):
+        return self._sectors.get(code)
+
+    def sectors(self):
+        return sorted(self._codes_by_sector)
+
+    def tickers_in_sector(self, sector):
+        return list(self._codes_by_sector.get(normalize_sector(sector), []))
+
+    def industry_position(self, sector):
+        # Sheet2 에서 해당 섹터 평균 행 위치 (없으면 None)
+        return self._industry_positions.get(normalize_sector(sector))
+
+    def industry_sectors(self):
+        # Sheet2(산업평균)에 있는 섹터 목록 (시트 순서)
+        return list(self._industry_positions)
+
+    def suggest(self, prefix, limit=10):
+        # 종목 코드 또는 기업명이 prefix 로 시작하는 종목 -> [(코드, 기업명), ...]
+        prefix = str(prefix).strip()
+        if not prefix:
+            return []
+
+        found = []
+        lo, hi = _prefix_range(self._sorted_codes, prefix)
+        found += self._sorted_codes[lo:min(hi, lo + limit)]
+
+        lo, hi = _prefix_range(self._sorted_name_keys, prefix)
+        for _, code in self._sorted_names[lo:hi]:
+            if len(found) >= limit:
+                break
+            if code not in found:
+                found.append(code)
+
+        return [(code, self._names[code]) for code in found[:limit]]
@@ -0,0 +1,99 @@
+# config.py
+# 여러 모듈이 함께 쓰는 경로/환경 설정 (환경변수로 덮어쓰기 가능)
+import os
+
+# === 캐시 경로 ===
+# 시트 스냅샷, 리포트 캐시 등 로컬에 저장하는 파일은 모두 이 폴더 아래에 둡니다.
+CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR", ".cache")
+
+
+def cache_path(*parts):
+    # 캐시 폴더 아래 경로 - 모듈을 import 할 때가 아니라 쓸 때의 CACHE_DIR 기준
+    # (CLI 의 --cache-dir 가 다른 모듈을 먼저 import 했는지와 상관없이 적용되도록)
+    return os.path.join(CACHE_DIR, *parts)
+
+
+def set_cache_dir(path):
+    # 캐시 폴더 변경 - 환경변수도 같이 바꿔서 하위 프로세스(배치 워커 등)도 같은 폴더를 사용
+    global CACHE_DIR
+    CACHE_DIR = path
+    os.environ["DASHBOARD_CACHE_DIR"] = path
+
+# === 구글 시트 ===
+# 본인의 구글 시트 ID (주소 중간에 있는 긴 문자열)
+SHEET_ID = "16OBBXMXJpw8DYFVdzyM5f1AIYyYlHIyMxn1-ZB2TXNk"
+
+# 각 시트의 GID (브라우저 주소창 확인 필수)
+GID_SHEET1 = "1720662044"  # Sheet1의 gid (기업별 데이터)
+GID_SHEET2 = "1526907458"  # Sheet2의 gid (산업군 평균)
+GID_SHEET3 = "1075256900"  # Sheet3의 gid (정상/부도 기업 평균)
+
+# 로컬 CSV 폴더 (sheet1.csv / sheet2.csv / sheet3.csv) - 지정하면 구글 시트 대신 이 파일을 읽음
+# 배치 서버처럼 네트워크/secrets 없이 돌릴 때 사용
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR") or None
+
+# === 시트 스냅샷 ===
+# TTL 안쪽이면 네트워크 없이 로컬 스냅샷을 그대로 사용합니다.
+SHEET_TTL_SECONDS = int(os.environ.get("DASHBOARD_SHEET_TTL", "600"))
+# TTL이 지났어도 이 시간 안쪽이면 이전 스냅샷을 먼저 보여주고 백그라운드에서 갱신합니다.
+SHEET_MAX_STALE_SECONDS = int(os.environ.get("DASHBOARD_SHEET_MAX_STALE", "86400"))
+# 오프라인 모드: 네트워크를 아예 쓰지 않고 마지막 정상 스냅샷만 사용
+OFFLINE = os.environ.get("DASHBOARD_OFFLINE", "0") == "1"
+
+# === 모델 설명(SHAP) ===
+# native: XGBoost 내장 pred_contribs (shap 라이브러리 불필요, 빠름)
+# shap:   shap.TreeExplainer
+EXPLAIN_BACKEND = os.environ.get("DASHBOARD_EXPLAIN_BACKEND", "native")
+
+# === 모델 ===
+# 기본 활성 모델 (저장소의 model_*.pkl 파일 이름, model_registry.py)
+MODEL_NAME = os.environ.get("DASHBOARD_MODEL", "model_xgb_new_23")
+
+# === Gemini 리포트 ===
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_REPORT_CACHE_ENTRIES", "128"))  # 메모리 캐시 개수
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("DASHBOARD_REPORT_CACHE_BYTES", str(20 * 1024 * 1024)))  # 디스크 캐시 용량
+REPORT_WORKERS = int(os.environ.get("DASHBOARD_REPORT_WORKERS", "2"))  # 백그라운드 생성 스레드 수
+# 1이면 Gemini 대신 로컬 스텁으로 리포트 생성 (테스트/오프라인용)
+GEMINI_STUB = os.environ.get("DASHBOARD_GEMINI_STUB", "0") == "1"
+# 스트리밍 리포트 생성 제한 시간 (초) - 넘으면 요약 템플릿으로 대체
+REPORT_STREAM_TIMEOUT = float(os.environ.get("DASHBOARD_REPORT_STREAM_TIMEOUT", "60"))
+# 여러 종목 리포트 일괄 생성 (report_queue.py)
+BULK_REPORT_CONCURRENCY = int(os.environ.get("DASHBOARD_BULK_REPORT_CONCURRENCY", "4"))  # 동시 생성 요청 수
+BULK_REPORT_RATE = float(os.environ.get("DASHBOARD_BULK_REPORT_RATE", "1.0"))  # 초당 생성 요청 수 (토큰 버킷)
+BULK_REPORT_BURST = int(os.environ.get("DASHBOARD_BULK_REPORT_BURST", "4"))  # 한 번에 몰아서 보낼 수 있는 요청 수
+BULK_REPORT_RETRIES = int(os.environ.get("DASHBOARD_BULK_REPORT_RETRIES", "3"))  # 실패 시 재시도 횟수
+BULK_REPORT_BACKOFF = float(os.environ.get("DASHBOARD_BULK_REPORT_BACKOFF", "1.0"))  # 첫 재시도 대기 (초, 회차마다 2배)
+
+# === 화면 캐시 ===
+# (종목, 스냅샷, 모델 버전)별 결과 + 차트를 보관할 개수 (app.py)
+VIEW_CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_VIEW_CACHE_ENTRIES", "64"))
+
+# === 주가 조회 ===
+PRICE_TIMEOUT = float(os.environ.get("DASHBOARD_PRICE_TIMEOUT", "3"))  # KRX 호출 제한 시간 (초)
+PRICE_TTL_SECONDS = int(os.environ.get("DASHBOARD_PRICE_TTL", "300"))  # 같은 날 같은 종목 재조회 간격
+
+# === 요청 단계 동시 실행 ===
+STAGE_WORKERS = int(os.environ.get("DASHBOARD_STAGE_WORKERS", "8"))
+SHEET_TIMEOUT = float(os.environ.get("DASHBOARD_SHEET_TIMEOUT", "30"))  # 시트 스냅샷 로드 제한 시간 (초)
+MODEL_TIMEOUT = float(os.environ.get("DASHBOARD_MODEL_TIMEOUT", "60"))  # 모델/explainer 로드 제한 시간 (초)
+
+# === 진단/트레이싱 ===
+# 1이면 단계별 소요 시간/캐시 적중/데이터 크기를 JSON 한 줄 로그로 출력 (tracing.py)
+TRACE = os.environ.get("DASHBOARD_TRACE", "0") == "1"
+
+# === 비교 화면 ===
+COMPARE_MAX_TICKERS = int(os.environ.get("DASHBOARD_COMPARE_MAX_TICKERS", "30"))  # 한 번에 비교할 최대 종목 수
+
+# === 관심 종목 감시 ===
+# 시트 스냅샷 / 모델 버전이 바뀌었는지 확인하는 간격 (초, 0이면 앱에서 자동 감시 안 함) (watchlist.py)
+WATCH_INTERVAL_SECONDS = int(os.environ.get("DASHBOARD_WATCH_INTERVAL", "600"))
+WATCH_RISK_DELTA = int(os.environ.get("DASHBOARD_WATCH_RISK_DELTA", "5"))  # 이만큼 이상 바뀌면 위험 점수 알림
+WATCH_TOP_DRIVERS = int(os.environ.get("DASHBOARD_WATCH_TOP_DRIVERS", "3"))  # 비교할 위험 요인(SHAP 양수 상위) 개수
+
+# === JSON 스코어링 API (api_server.py) ===
+API_HOST = os.environ.get("DASHBOARD_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("DASHBOARD_API_PORT", "8600"))
+API_CACHE_MAX_ENTRIES = int(os.environ.get("DASHBOARD_API_CACHE_ENTRIES", "1024"))  # 응답 본문 캐시 개수
+API_MAX_BATCH = int(os.environ.get("DASHBOARD_API_MAX_BATCH", "1000"))  # 여러 종목 요청 한 번의 최대 종목 수
+# 지연 시간 목표 (ms) - 스냅샷/모델이 올라간 뒤 단일 종목 요청 p95 (/metrics 에서 경로별로 확인)
+API_LATENCY_TARGET_MS = float(os.environ.get("DASHBOARD_API_LATENCY_TARGET_MS", "50"))
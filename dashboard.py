@@ -1,252 +1,209 @@
 # dashboard.py
-from pykrx import stock
+import os
+import threading
+from concurrent.futures import Future
+
 import pandas as pd
 import numpy as np
-import google.generativeai as genai
-import streamlit as st
-import joblib
-import shap
-from streamlit_gsheets import GSheetsConnection
+
+import batch_scoring
+import benchmark_table
+import company_index
+import config
+import model_registry
+import prices
+import report_cache
+import scoring
+import screener
+import sheets
+import stages
+import tracing
+import whatif
+from features import FEATURE_NAMES, FEATURE_MAP
 
 # === 설정 ===
-GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-
-FEATURE_NAMES = [
-'F1_Equity_Growth', 'F1_Retained_Earnings_Ratio', 'F1_ROA', 'F1_Debt_Ratio', 'F1_Current_Ratio', 'F1_ROE', 'F1_Interest_Coverage',
-'F2_KMV_DD', 'F3_Z_Score','F4_M_Score', 'M_Short_Term_Rate', 'M_Long_Term_Rate', 'M_Rate_Spread', 'M_Nominal_GDP_Growth',
-'M_Real_GDP_Growth', 'M_Inflation', 'M_Exchange_Rate', 'F1_Equity_Growth_change', 'F1_Equity_Growth_pct_change',
-'F1_Equity_Growth_improving', 'F1_Retained_Earnings_Ratio_change', 'F1_Retained_Earnings_Ratio_pct_change', 'F1_Retained_Earnings_Ratio_improving',
-'F1_ROA_change', 'F1_ROA_pct_change', 'F1_ROA_improving', 'F1_Debt_Ratio_change', 'F1_Debt_Ratio_pct_change', 'F1_Debt_Ratio_improving',
-'F1_Current_Ratio_change', 'F1_Current_Ratio_pct_change', 'F1_Current_Ratio_improving', 'F1_ROE_change', 'F1_ROE_pct_change', 'F1_ROE_improving',
-'F1_Interest_Coverage_change', 'F1_Interest_Coverage_pct_change', 'F1_Interest_Coverage_improving',
-'audit_prob', 'etc_prob', 'mda_prob', 'lex_sent_mean', 'lex_sent_sum', 'lex_pos_tf', 'lex_neg_tf', 'lex_pos_cnt', 'lex_neg_cnt', 'lex_abs_mean', 'lex_covered_tf' ]
-
-FEATURE_MAP = {
-'F1_Equity_Growth':'자기자본 증가율 / 자기자본 대비 순이익의 비율로 높을수록 주주 자본을 효율적으로 활용하는 것',
-'F1_Retained_Earnings_Ratio':'이익잉여금 비율 / 자본 중 이익잉여금이 차지하는 비중',
-'F1_ROA':'총자산이익률 / 기업이 보유한 자산으로 얼마나 효율적으로 이익을 창출하는지',
-'F1_Debt_Ratio':'부채비율 / 자기자본 대비 부채 수준으로 직관적인 파산 위험의 지표',
-'F1_Current_Ratio':'유동비율 / 단기적인 채무 상환의 능력을 의미',
-'F1_ROE':'자기자본이익률 / 자기자본 대비 순이익의 비율로 높을수록 주주 자본을 효율적으로 활용하는 것',
-'F1_Interest_Coverage':'이자보상배율 / 영업이익이 이자비용의 몇 배인지를 나타내면 1 미만이면 이자조차 감당할 수 없음을 의미',
-'F2_KMV_DD':'Distance to Default / 자산가치가 부채 임계치로부터 얼마나 떨어져 있는지를 나타내며 거리가 낮을수록 부도 가능성이 증가',
-'F3_Z_Score':'Altman Z-score / 여러 재무 비율을 종합한 파산 예측 점수로 낮을수록 파산 가능성이 증가',
-'F4_M_Score':'Beneish M-score / 회계 조작 가능성을 나타내는 점수로 높을 수록 이익을 조정했을 가능성이 증가',
-'M_Short_Term_Rate':'단기금리 / 단기적인 차입 비용으로 단기금리가 상승하면 재무적으로 취약한 기업에 부담으로 가중',
-'M_Long_Term_Rate':'장기금리 / 장기적인 자본 조달을 위한 비용으로 상승하면 투자가 위축되고, 재무구조가 약한 기업에 불리',
-'M_Rate_Spread':'금리 스프레드 / 장기, 단기 금리의 차이로 경기가 침체되는 신호를 나타냄',
-'M_Nominal_GDP_Growth':'명목 GDP 성장률 / 경기 규모의 성장을 나타내며 낮을수록 매출 성장이 둔화',
-'M_Real_GDP_Growth':'실질 GDP 성장률 / 물가 효과를 제거한 실질적인 경기 성장을 반영',
-'M_Inflation':'물가상승률 / 전반적인 물가 수준의 변화를 의미하며 급등하면 비용으로 압박이 작용',
-'M_Exchange_Rate':'환율 / 원화 대비 외화의 가치를 의미하며 수입 및 외화부채가 많은 기업에 위험 신호로 작용',
-'F1_Equity_Growth_change':'자기자본 증가율 변동폭',
-'F1_Equity_Growth_pct_change':'자기자본 증가율 증감률(%)',
-'F1_Equity_Growth_improving':'자기자본 증가율 개선 여부',
-'F1_Retained_Earnings_Ratio_change':'이익잉여금 비율 변동폭',
-'F1_Retained_Earnings_Ratio_pct_change':'이익잉여금 비율 증감률(%)',
-'F1_Retained_Earnings_Ratio_improving':'이익잉여금 비율 개선 여부',
-'F1_ROA_change':'ROA 변동폭',
-'F1_ROA_pct_change':'ROA 증감률(%)',
-'F1_ROA_improving':'ROA 개선 여부',
-'F1_Debt_Ratio_change':'부채비율 변동폭',
-'F1_Debt_Ratio_pct_change':'부채비율 증감률(%)',
-'F1_Debt_Ratio_improving':'부채비율 개선 여부',
-'F1_Current_Ratio_change':'유동비율 변동폭',
-'F1_Current_Ratio_pct_change':'유동비율 증감률(%)',
-'F1_Current_Ratio_improving':'유동비율 개선 여부',
-'F1_ROE_change':'ROE 변동폭',
-'F1_ROE_pct_change':'ROE 증감률(%)',
-'F1_ROE_improving':'ROE 개선 여부',
-'F1_Interest_Coverage_change':'이자보상배율 변동폭',
-'F1_Interest_Coverage_pct_change':'이자보상배율 증감률(%)',
-'F1_Interest_Coverage_improving':'이자보상배율 개선 여부',
-'audit_prob':'감사의견 텍스트 기반 부도 위험도',
-'etc_prob':'기타 공시 텍스트 기반 부도 위험도',
-'mda_prob':'MD&A 텍스트 기반 부도 위험도',
-'lex_sent_mean':'문서 전반의 평균적인 감성 점수로 낮을수록 부정적인 톤이 증가',
-'lex_sent_sum':'전체 문성의 감성 누적 정도로 부정 감성의 누적은 리스크가 커지는 것을 의미',
-'lex_pos_tf':'긍정 단어의 빈도를 의미',
-'lex_neg_tf':'부정 단어의 빈도를 의미',
-'lex_pos_cnt':'긍정 단어가 등장하는 문장의 수를 의미',
-'lex_neg_cnt':'부정 단어가 등장하는 문장의 수를 의미',
-'lex_abs_mean':'감성 강도의 절댓값의 평균으로 높을수록 표현의 강도가 크며 불확실성이 증가한다는 것을 의미',
-'lex_covered_tf':'감성 사전이 커버한 단어의 수를 의미하며 텍스트 분석 신뢰도 지표'
-}
-
-@st.cache_resource
-def load_model():
-    return joblib.load("model_xgb_new_23.pkl")
-
-def load_data_and_model(ticker):
-    code = ticker.strip() 
-    
-    # 1. 주가 데이터 (기존 유지)
+# 무거운 라이브러리(streamlit, google.generativeai, joblib/xgboost, pykrx, shap)는
+# 실제로 그 단계를 실행할 때 불러옵니다. (import 만으로 시작 시간이 늘지 않도록 - benchmark.py --imports-only)
+def _read_secret(name):
+    # secrets.toml 이 없으면 (CLI/배치 서버 등) 환경변수에서 읽기
     try:
-        today = pd.Timestamp.now().strftime("%Y%m%d")
-        start_date = (pd.Timestamp.now() - pd.DateOffset(years=1)).strftime("%Y%m%d")
-        hist = stock.get_market_ohlcv(start_date, today, code)
-        current_price = hist['종가'].iloc[-1] if not hist.empty else 0
-    except:
-        current_price = 0
-
-    # ==========================================================
-    # [수정] secrets.toml 없이 '직접 링크'로 불러오기 (가장 확실함)
-    # ==========================================================
-    
-    # 본인의 구글 시트 ID (주소 중간에 있는 긴 문자열)
-    SHEET_ID = "16OBBXMXJpw8DYFVdzyM5f1AIYyYlHIyMxn1-ZB2TXNk"
-    
-    # 각 시트의 GID를 정확히 적어주세요! (브라우저 주소창 확인 필수)
-    GID_SHEET1 = "1720662044"  # Sheet1의 gid
-    GID_SHEET2 = "1526907458"  # Sheet2의 gid
-    GID_SHEET3 = "1075256900"  # Sheet3의 gid
-    
-    # CSV 변환 URL 생성 함수
-    def get_csv_url(sheet_id, gid):
-        return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-
+        import streamlit as st
+        return st.secrets[name]
+    except Exception:
+        return os.environ.get(name, "")
+
+_gemini_api_key = None
+
+def gemini_api_key():
+    # 처음 리포트를 만들 때 한 번만 읽음
+    global _gemini_api_key
+    if _gemini_api_key is None:
+        _gemini_api_key = _read_secret("GEMINI_API_KEY")
+    return _gemini_api_key
+
+GEMINI_MODEL_NAME = 'gemini-flash-latest'
+
+def _show_error(message):
+    import streamlit as st
+    st.error(message)
+
+# 시트/모델 로드 실패 (에러는 _show_error 로 이미 표시) - 없는 종목(None)과 구분하기 위한 반환값
+LOAD_FAILED = object()
+
+# 모델은 레지스트리에서 관리 (XGBoost 바이너리로 변환해 로드, 재시작 없이 교체/A-B 비교 - model_registry.py)
+# model_name 이 None 이면 활성 모델
+models = model_registry.get_registry()
+
+def get_model(model_name=None):
+    return models.get(model_name)
+
+def load_model(model_name=None):
+    return models.get(model_name).model
+
+# SHAP explainer 도 모델과 함께 캐싱 (요청마다 새로 만들지 않음)
+def load_explainer(backend=config.EXPLAIN_BACKEND, model_name=None):
+    return models.get(model_name).explainer(backend)
+
+def model_version(model_name=None):
+    # 결과 테이블 등 캐시 키에 들어가는 버전 태그 (파일 이름 + 내용 해시, 모델을 올리지 않음)
+    return models.version(model_name)
+
+def _load_model_stage(model_name=None):
+    # 요청 단계용: 모델 + explainer 를 올려 두고 LoadedModel 을 돌려줌
+    # (요청 중간에 활성 모델이 바뀌어도 이 요청은 처음 받은 모델로 끝까지 계산)
+    model = models.get(model_name)
+    model.explainer()
+    return model
+
+def get_company_index(snapshot):
+    # 종목 코드/섹터 인덱스 (스냅샷마다 한 번 생성)
+    return snapshot.memo("company_index", company_index.CompanyIndex)
+
+def get_results(snapshot, model=None):
+    # 전체 기업 배치 스코어링 결과 (스냅샷 + 모델 버전 조합마다 한 번만 predict/SHAP)
+    # model: model_registry.LoadedModel (없으면 활성 모델)
+    model = model or get_model()
+    return snapshot.memo(f"results_{model.version}", lambda snap: batch_scoring.ResultsLookup(
+        batch_scoring.load_results_table(
+            snap, model.model, model.explainer(), batch_scoring.get_percentile_index(snap), model.version
+        ),
+        get_company_index(snap),
+    ))
+
+def get_benchmark_table(snapshot):
+    # 산업/정상기업 평균 점수 테이블 (스냅샷마다 한 번 생성, 모델과 무관)
+    return snapshot.memo("benchmark_table", lambda snap: benchmark_table.BenchmarkTable(
+        snap, get_company_index(snap), batch_scoring.get_percentile_index(snap)
+    ))
+
+def suggest_tickers(prefix, limit=8):
+    # 사이드바 종목 코드 추천: 코드 또는 기업명 앞글자 검색 -> [(코드, 기업명), ...]
     try:
-        df_company = pd.read_csv(get_csv_url(SHEET_ID, GID_SHEET1))
-        df_ind_avg = pd.read_csv(get_csv_url(SHEET_ID, GID_SHEET2))
-        df_stat_avg = pd.read_csv(get_csv_url(SHEET_ID, GID_SHEET3))
-    except Exception as e:
-        st.error(f"구글 시트 로드 중 에러 발생: {e}")
-        return None
+        return get_company_index(sheets.load_snapshot()).suggest(prefix, limit)
+    except Exception:
+        return []
 
-    # 3. 49개 피처 누락 방지 (0으로 채우기)
-    for col in FEATURE_NAMES:
-        if col not in df_company.columns: df_company[col] = 0.0
+def list_sectors():
+    # 비교 모드 섹터 선택용 (Sheet1 에 있는 섹터 목록)
+    try:
+        return get_company_index(sheets.load_snapshot()).sectors()
+    except Exception:
+        return []
 
-    # 4. 데이터 필터링 (6자리 코드로 변환하여 비교)
-    # 문자열로 변환하고, 6자리를 맞춥니다 (예: 5930 -> 005930)
-    company_row = df_company[df_company['stock_code'].astype(str).str.zfill(6) == code]
-    
-    if company_row.empty:
+def sector_tickers(sector):
+    try:
+        return get_company_index(sheets.load_snapshot()).tickers_in_sector(sector)
+    except Exception:
+        return []
+
+def view_key(ticker, model_name=None):
+    # 화면 캐시 키 (종목, 스냅샷 ID, 모델 버전) - 시트나 모델이 바뀌면 키도 바뀜
+    # 시트/모델을 올리지 않고 알 수 있는 값으로만 만듦 (메모리에 있는 스냅샷 ID, 모델 파일 해시)
+    # 아직 모르면 None -> 캐시 없이 load_data_and_model 로 바로 계산 (시트/모델/주가 단계를 동시에 실행)
+    snapshot_id = sheets.current_snapshot_id()
+    if snapshot_id is None:
         return None
+    try:
+        return ticker.strip(), snapshot_id, models.version(model_name)
+    except Exception:
+        return None
+
+def load_data_and_model(ticker, model_name=None):
+    # 없는 종목이면 None, 시트/모델 로드 실패면 LOAD_FAILED
+    code = ticker.strip() 
     
-    company_row = company_row.iloc[0]
-    
-    # 1. 내 기업의 산업군(섹터) 이름 가져오기
-    # 컬럼명이 '섹터'일 수도 있고 '산업군'일 수도 있어서 둘 다 확인
-    if '섹터' in company_row:
-        my_sector = str(company_row['섹터']).strip()
-    elif '산업군' in company_row:
-        my_sector = str(company_row['산업군']).strip()
-    else:
-        my_sector = "Unknown"
+    # 1~2. 서로 독립적인 단계는 동시에 실행 (stages.py 참고)
+    #  - 주가: 최근 거래일 종가만 조회, 캐시/타임아웃 적용 (prices.py)
+    #  - 구글 시트: 로컬 스냅샷 캐시 사용 (sheets.py)
+    #  - 모델/explainer 로드 (최초 1회만 실제 로드)
+    run = stages.StageRun({
+        "price": (prices.get_price, code),
+        "snapshot": (sheets.load_snapshot,),
+        "model": (_load_model_stage, model_name),
+    })
 
-    # 2. 산업군 평균 (ind_row) 찾기
     try:
-        # Sheet2(산업평균)의 '섹터' 컬럼도 공백 제거하여 비교 준비
-        # (만약 Sheet2의 컬럼명이 '산업군'이라면 아래 '섹터'를 '산업군'으로 바꿔주세요)
-        if '섹터' in df_ind_avg.columns:
-            target_col = '섹터'
-        elif '산업군' in df_ind_avg.columns:
-            target_col = '산업군'
-        else:
-            raise ValueError("Sheet2에 '섹터' 또는 '산업군' 컬럼이 없습니다.")
-
-        # 비교를 위해 문자열 변환 및 공백 제거
-        df_ind_avg[target_col] = df_ind_avg[target_col].astype(str).str.strip()
-        
-        # 매칭 시도
-        matched_rows = df_ind_avg[df_ind_avg[target_col] == my_sector]
-        
-        if not matched_rows.empty:
-            # 매칭 성공! 해당 산업군 평균 사용
-            ind_row = matched_rows.iloc[0]
-            # (디버깅용: 필요시 주석 해제)
-            print(f"✅ 산업군 매칭 성공: {my_sector}")
-        else:
-            # 매칭 실패 -> 전체 정상기업 평균 사용 (Fallback)
-            print(f"⚠️ 산업군 매칭 실패: '{my_sector}' (Sheet2 목록에 없음)")
-            ind_row = df_stat_avg[df_stat_avg['Target'] == 0].iloc[0]
+        snapshot = run.result("snapshot", config.SHEET_TIMEOUT)
+    except Exception as e:
+        run.cancel()
+        _show_error(f"구글 시트 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return LOAD_FAILED
 
+    try:
+        model = run.result("model", config.MODEL_TIMEOUT)
     except Exception as e:
-        # 에러 발생 시 -> 전체 정상기업 평균 사용
-        # print(f"❌ 산업군 로직 에러: {e}")
-        ind_row = df_stat_avg[df_stat_avg['Target'] == 0].iloc[0]
+        run.cancel()
+        _show_error(f"모델 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return LOAD_FAILED
 
-    # 2. 정상기업 평균 (norm_row) 가져오기
-    # 비교 그래프를 그리기 위해 'Target 0(정상)' 데이터를 가져옵니다.
     try:
-        norm_row = df_stat_avg[df_stat_avg['Target'] == 0].iloc[0]
-    except IndexError:
-        # 혹시 Target 0인 데이터가 하나도 없다면, 그냥 첫 번째 줄을 가져옵니다.
-        norm_row = df_stat_avg.iloc[0]
+        price_info = run.result("price", config.PRICE_TIMEOUT + 1)
+    except Exception:
+        price_info = prices.unknown_quote()
+    tracing.count(f"price.{price_info['source']}")
 
-    # 5. XGBoost 모델 예측 (순서 강제 정렬)
-    model = load_model()
-    
-    # 49개 컬럼 순서대로 데이터프레임 생성
-    X_input = pd.DataFrame([company_row[FEATURE_NAMES].values], columns=FEATURE_NAMES)
-    
-    # 숫자로 변환 (에러 방지)
-    X_input = X_input.apply(pd.to_numeric, errors='coerce').fillna(0)
-    
-    prob = model.predict_proba(X_input)[0][1]
-    
-    explainer = shap.TreeExplainer(model)
-    shap_vals = explainer.shap_values(X_input)[0]
-
-    LOWER_IS_BETTER = [
-        # 1. 재무 비율 (부채는 적을수록 좋음)
-        "F1_Debt_Ratio", 
-        
-        # 2. 재무 변화량 (부채비율이 늘어나는 건 나쁨)
-        "F1_Debt_Ratio_change", 
-        "F1_Debt_Ratio_pct_change",
-
-        # 3. 리스크 모델 (M-Score는 높으면 회계부정 의심 -> 낮아야 좋음)
-        "F4_M_Score", 
-        
-        # 4. 거시경제 (금리/물가/환율은 오르면 기업 부담 -> 낮아야 좋음)
-        "M_Short_Term_Rate", 
-        "M_Long_Term_Rate",   # [추가됨] 설명: "상승하면... 불리"
-        "M_Inflation",        # 설명: "급등하면 비용 압박"
-        "M_Exchange_Rate",    # 설명: "위험 신호로 작용"
-
-        # 5. AI 부도 확률 예측 (당연히 확률이 낮아야 안전)
-        "audit_prob", 
-        "etc_prob", 
-        "mda_prob",
-        
-        # 6. 텍스트 감성 분석 (부정적 단어/불확실성은 적을수록 좋음)
-        "lex_neg_cnt",       # 부정 문장 수
-        "lex_neg_tf",        # 부정 단어 빈도
-        "lex_abs_mean"       # [추가됨] 설명: "높을수록... 불확실성 증가"
-    ]
+    return build_company_result(snapshot, model, code, price_info)
+
+
+def build_company_result(snapshot, model, code, price_info=None):
+    # 스냅샷 + 모델(LoadedModel)로 한 종목 결과 (load_data_and_model 과 같은 dict, 없는 종목이면 None)
+    # 주가를 조회하지 않는 호출(JSON API 등)은 price_info 없이 호출 -> 주가 None
+    price_info = price_info or prices.unknown_quote()
+    df_company = snapshot.company
+
+    # 3. 49개 피처 누락 방지 (0으로 채우기)
+    # 스냅샷 프레임은 요청 간에 공유되므로 누락 컬럼이 있을 때만 복사본에 추가
+    # (피처 저장소/결과 테이블도 같은 규칙으로 채운 값으로 계산됨)
+    df_company = scoring.fill_missing_features(df_company)
+
+    # 4. 전체 기업 배치 스코어링 결과에서 종목 조회 (batch_scoring.py 참고)
+    # 스냅샷 + 모델 조합마다 한 번만 predict/SHAP 을 돌리고, 요청은 코드로 한 줄만 꺼냅니다.
+    results = get_results(snapshot, model)
+
+    with tracing.span("row_match"):
+        result_row = results.get(code)
+    if result_row is None:
+        return None
 
-    # [수정] 이상치(Outlier)에 강한 '백분위(Rank) 기반' 스코어링 함수
-    def calculate_score(val, col_name):
-        try:
-            # 1. 결측치 방어
-            val = float(val)
-            if pd.isna(val): return 50
-
-            # 2. 해당 컬럼의 유효한 데이터 전체 가져오기 (NaN 제외)
-            all_values = pd.to_numeric(df_company[col_name], errors='coerce').dropna()
-            
-            if all_values.empty: return 50
-            
-            # 3. 내 값이 전체에서 상위 몇 %인지 계산 (0.0 ~ 1.0)
-            # (scipy 없이 순수 pandas/numpy로 구현)
-            # 내 값보다 작은 데이터의 비율을 구함
-            percentile = (all_values < val).mean()
-            
-            # 4. 점수 변환 (0~100점)
-            score = percentile * 100
-            
-            # 5. 낮을수록 좋은 지표(LOWER_IS_BETTER)는 점수 뒤집기
-            # (예: 부채비율은 상위 90%(=값이 큼)일수록 나쁜 거니까 100 - 90 = 10점)
-            if col_name in LOWER_IS_BETTER:
-                score = 100 - score
-                
-            return np.clip(score, 0, 100)
-            
-        except Exception as e:
-            # print(f"Score Error {col_name}: {e}") # 디버깅용
-            return 50
+    company_row = df_company.loc[result_row.name]
+    
+    # 1. 내 기업의 산업군(섹터) 이름 가져오기 ('섹터' 또는 '산업군' 컬럼)
+    my_sector = batch_scoring.company_sector(company_row)
+
+    # 2. 산업군 평균 / 정상기업 평균 점수 - 스냅샷마다 한 번 만든 비교 기준 테이블에서 섹터로 조회
+    # (Sheet2 에 없는 섹터는 테이블을 만들 때 이미 정상기업 평균으로 연결됨, benchmark_table.py)
+    benchmarks = get_benchmark_table(snapshot)
+    # 매칭 성공/실패는 진단 카운터로 (섹터 이름은 span 속성 - 요청마다 print 하지 않음)
+    with tracing.span("benchmark_scores", sector=my_sector) as span:
+        matched = benchmarks.matched(my_sector)
+        span.set(industry_matched=matched)
+        tracing.count("industry.match" if matched else "industry.fallback")
+        industry_scores = benchmarks.industry_scores(my_sector)
+        normal_scores = benchmarks.normal_scores
+
+    # 5. 모델 예측 / SHAP / 백분위 점수 (회사 값은 결과 테이블에 이미 계산되어 있음)
+    shap_vals = results.shap_values(result_row)
+    company_scores = results.scores(result_row)
 
     shap_data = []
     
@@ -261,9 +218,9 @@ def load_data_and_model(ticker):
             "name": name,
             "category": category,
             "shap": float(shap_vals[i]),
-            "score": calculate_score(company_row[name], name),
-            "industry_avg": calculate_score(ind_row[name], name),
-            "normal_avg": calculate_score(norm_row[name], name),
+            "score": float(company_scores[i]),
+            "industry_avg": float(industry_scores[i]),
+            "normal_avg": float(normal_scores[i]),
             "val": str(company_row[name]),
             "desc": FEATURE_MAP.get(name, name)
         })
@@ -271,96 +228,214 @@ def load_data_and_model(ticker):
     # SHAP 절대값 기준 내림차순 정렬
     shap_data = sorted(shap_data, key=lambda x: abs(x['shap']), reverse=True)
     
-    # 신호등 로직 (함수 존재 시 실행)
-    try:
-        indicators = determine_traffic_lights_by_group(shap_data)
-    except:
-        indicators = {}
+    # 신호등 (결과 테이블에 determine_traffic_lights_by_group 과 같은 로직으로 계산되어 있음)
+    with tracing.span("traffic_lights"):
+        indicators = results.lights(result_row)
 
     return {
         "ticker": code,
         "company_name": company_row.get('Company_Name', code),
-        "price": current_price,
-        "risk_score": int(prob * 100),
+        "price": price_info["price"],
+        "price_info": price_info,
+        "risk_score": int(result_row['risk_score']),
+        "model_version": model.version,
         "indicators": indicators,
-        "shap_data": shap_data
+        "shap_data": shap_data,
+        # 7대 분야 평균 (레이더/막대 차트용) - 산업/정상 평균은 비교 기준 테이블 값 그대로
+        "category_scores": {
+            "company": category_scores(company_scores)[0],
+            "industry": benchmarks.industry_categories(my_sector),
+            "normal": benchmarks.normal_categories,
+        },
     }
     
 
 def determine_traffic_lights_by_group(shap_data):
-    # 1. 5개 그룹별 SHAP 값 수집
-    vals_f1 = []      # 재무비율
-    vals_macro = []   # 시장지표
-    vals_model = []   # 부도모델
-    vals_fraud = []   # 부정징후
-    vals_text = []    # 텍스트
-
-    for item in shap_data:
-        name = item['name']
-        val = item['shap']
-        
-        if name.startswith('F1'): vals_f1.append(val)
-        elif name.startswith('M_'): vals_macro.append(val)
-        elif name.startswith('F2') or name.startswith('F3'): vals_model.append(val)
-        elif name.startswith('F4'): vals_fraud.append(val)
-        elif 'prob' in name or 'lex' in name: vals_text.append(val)
-        else: vals_text.append(val) # 기타
-
-    # 2. 위험도 합계 계산
-    def calculate_risk_impact(values):
-        if not values: return 0.0
-        return np.nansum(values)
-
-    score_f1 = calculate_risk_impact(vals_f1)
-    score_macro = calculate_risk_impact(vals_macro)
-    score_model = calculate_risk_impact(vals_model)
-    score_fraud = calculate_risk_impact(vals_fraud)
-    score_text = calculate_risk_impact(vals_text)
-
-    # =========================================================================
-    # [핵심 수정] 섹터별 임계값(Threshold) 차별화 설정
-    # =========================================================================
-    # red: 이 점수를 넘으면 '위험(빨강)'
-    # yellow: 이 점수를 넘으면 '주의(노랑)'
-    THRESHOLDS = {
-        # 1. 재무비율 (현대차 등 대기업 부채 고려하여 0.3으로 넉넉하게)
-        "f1":    {"red": 0.40, "yellow": 0.10},
-        
-        # 2. 거시경제 (점수 변동폭이 작으므로)
-        "macro": {"red": 0.08, "yellow": 0.03},
-        
-        # 3. 부도모델 (가장 결정적이나 수치가 크게 튀므로 높게 설정)
-        "model": {"red": 3.00, "yellow": 2.00},
-        
-        # 4. 부정징후 (M-score는 0.2 정도면 꽤 높은 편)
-        "fraud": {"red": 0.20, "yellow": 0.10},
-        
-        # 5. 텍스트 (노이즈가 많으므로 재무 수준인 0.3 적용)
-        "text":  {"red": 0.30, "yellow": 0.10}
+    # 5개 그룹(재무비율/시장지표/부도모델/부정징후/텍스트)별 SHAP 합계로 신호등 결정
+    # (그룹 분류와 임계값은 scoring.py 에 있으며 배치 스코어링과 같은 로직을 사용)
+    names = [item['name'] for item in shap_data]
+    shap_row = [[item['shap'] for item in shap_data]]
+    lights = scoring.traffic_lights(shap_row, names)
+    return {group: colors[0] for group, colors in lights.items()}
+
+
+# === 7대 건전성 분야 (scoring.py 로 이동, 기존 이름 유지) ===
+CATEGORIES = scoring.CATEGORIES
+get_category = scoring.get_category
+category_scores = scoring.category_scores
+
+def load_comparison(tickers, model_name=None):
+    # 여러 종목을 한 번에 비교 -> 종목별 위험 점수/신호등 + 7대 분야 점수
+    # 전체 기업 배치 결과 테이블에서 N개 행을 한꺼번에 꺼내고, 분야 점수도 행렬로 계산하므로
+    # N개를 비교해도 단일 종목 조회와 비슷한 시간이 걸립니다.
+    run = stages.StageRun({
+        "snapshot": (sheets.load_snapshot,),
+        "model": (_load_model_stage, model_name),
+    })
+
+    try:
+        snapshot = run.result("snapshot", config.SHEET_TIMEOUT)
+    except Exception as e:
+        run.cancel()
+        _show_error(f"구글 시트 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return None
+
+    try:
+        model = run.result("model", config.MODEL_TIMEOUT)
+    except Exception as e:
+        _show_error(f"모델 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return None
+
+    companies = get_company_index(snapshot)
+    results = get_results(snapshot, model)
+
+    codes = list(dict.fromkeys(company_index.normalize_code(t) for t in tickers if str(t).strip()))
+    found = [code for code in codes if code in companies]
+    missing = [code for code in codes if code not in companies]
+    if not found:
+        return None
+
+    with tracing.span("compare.rows", n=len(found)):
+        table = results.results.iloc[[companies.first_position(code) for code in found]]
+        company_cats = category_scores(table[batch_scoring.SCORE_COLUMNS].to_numpy(dtype=float))
+
+    # 섹터별 산업 평균(Sheet2 에 없으면 정상기업 평균) + 정상기업 평균 - 비교 기준 테이블에서 조회
+    benchmarks = get_benchmark_table(snapshot)
+    sectors = list(dict.fromkeys(table['sector']))
+
+    summary = pd.DataFrame({
+        "ticker": found,
+        "company_name": table['company_name'].astype(str).to_numpy(),
+        "sector": table['sector'].to_numpy(),
+        "risk_score": table['risk_score'].astype(int).to_numpy(),
+    })
+    for group in scoring.LIGHT_GROUPS:
+        summary[group] = table[f"light_{group}"].to_numpy()
+
+    return {
+        "companies": summary,
+        "categories": CATEGORIES,
+        "company_scores": company_cats,
+        "industry_scores": {sector: benchmarks.industry_categories(sector) for sector in sectors},
+        "normal_scores": benchmarks.normal_categories,
+        "missing": missing,
+        "model_version": model.version,
     }
 
-    def get_color(score, category):
-        # 해당 카테고리의 기준 가져오기 (없으면 기본값 f1 기준 사용)
-        t = THRESHOLDS.get(category, THRESHOLDS["f1"])
-        
-        if score > t["red"]: return "red"
-        elif score > t["yellow"]: return "yellow"
-        else: return "green"
+def compare_models(ticker, model_names=None):
+    # 같은 종목을 여러 모델 버전으로 스코어링한 결과 (A/B 비교용)
+    # 모델 버전마다 결과 테이블이 따로 있으므로 처음 한 번만 배치 계산하고 이후에는 한 줄 조회
+    code = company_index.normalize_code(ticker)
+    snapshot = sheets.load_snapshot()
+    rows = []
+    for name in model_names or models.names():
+        model = models.get(name)
+        result_row = get_results(snapshot, model).get(code)
+        if result_row is None:
+            return None
+        row = {
+            "model_name": name,
+            "model_version": model.version,
+            "active": name == models.active,
+            "prob": float(result_row['prob']),
+            "risk_score": int(result_row['risk_score']),
+        }
+        for group in scoring.LIGHT_GROUPS:
+            row[group] = result_row[f"light_{group}"]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def load_history(ticker, model_name=None, top_n=5):
+    # 한 종목의 모든 기간(Sheet1 에서 같은 종목 코드인 행들, 시트 순서) 위험 점수 / 신호등 / SHAP 추이
+    # 전체 기업 배치 결과 테이블이 모든 행을 이미 한 번에 스코어링해 두므로
+    # 기간이 여러 개여도 행 위치로 한꺼번에 꺼내기만 합니다. (predict/SHAP 추가 호출 없음)
+    # 없는 종목이면 None, 시트/모델 로드 실패면 LOAD_FAILED
+    run = stages.StageRun({
+        "snapshot": (sheets.load_snapshot,),
+        "model": (_load_model_stage, model_name),
+    })
+
+    try:
+        snapshot = run.result("snapshot", config.SHEET_TIMEOUT)
+    except Exception as e:
+        run.cancel()
+        _show_error(f"구글 시트 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return LOAD_FAILED
+
+    try:
+        model = run.result("model", config.MODEL_TIMEOUT)
+    except Exception as e:
+        _show_error(f"모델 로드 중 에러 발생: {str(e) or '시간 초과'}")
+        return LOAD_FAILED
+
+    code = company_index.normalize_code(ticker)
+    companies = get_company_index(snapshot)
+    positions = companies.positions(code)
+    if not positions:
+        return None
+
+    with tracing.span("history.rows", n=len(positions)):
+        table = get_results(snapshot, model).results.iloc[positions]
+        shap_matrix = table[batch_scoring.SHAP_COLUMNS].to_numpy(dtype=float)
+
+    periods = pd.DataFrame({
+        "period": company_index.period_labels(snapshot.company.iloc[positions]),
+        "risk_score": table['risk_score'].astype(int).to_numpy(),
+        "prob": table['prob'].to_numpy(dtype=float),
+    })
+    for group in scoring.LIGHT_GROUPS:
+        periods[group] = table[f"light_{group}"].to_numpy()
+
+    # 기간별로 위험을 가장 많이 높인 요인 3개 (SHAP 양수 상위)
+    top = (-shap_matrix).argsort(axis=1)[:, :3]
+    periods["top_risk_factors"] = [
+        ", ".join(FEATURE_NAMES[j] for j in row if shap_matrix[i, j] > 0) for i, row in enumerate(top)
+    ]
+
+    # 전 기간에 걸쳐 영향이 컸던 요인 top_n 개의 SHAP 추이 (|SHAP| 평균 기준)
+    drivers = np.argsort(-np.abs(shap_matrix).mean(axis=0))[:top_n]
+    driver_shap = pd.DataFrame(
+        shap_matrix[:, drivers], columns=[FEATURE_NAMES[j] for j in drivers], index=periods['period']
+    )
 
     return {
-        "f1": get_color(score_f1, "f1"),
-        "macro": get_color(score_macro, "macro"),
-        "model": get_color(score_model, "model"),
-        "fraud": get_color(score_fraud, "fraud"),
-        "text": get_color(score_text, "text")
+        "ticker": code,
+        "company_name": companies.company_name(code),
+        "sector": companies.sector(code),
+        "model_version": model.version,
+        "periods": periods,
+        "drivers": driver_shap,
     }
 
-def get_gemini_rag_analysis(data_summary, shap_data):
-    # 1. API 키 확인
-    if not GEMINI_API_KEY: 
-        return "⚠️ API 키가 설정되지 않았습니다."
+def load_screener(model_name=None):
+    # 전체 기업 위험 스크리너 (스냅샷 + 모델 버전마다 한 번 생성, 이후 조회는 마스크/정렬만)
+    try:
+        snapshot = sheets.load_snapshot()
+    except Exception as e:
+        _show_error(f"구글 시트 로드 중 에러 발생: {str(e)}")
+        return None
+    model = _load_model_stage(model_name)
+    return snapshot.memo(f"screener_{model.version}", lambda snap: screener.Screener(
+        get_results(snap, model).results, get_company_index(snap)
+    ))
+
+def load_simulator(ticker, model_name=None):
+    # What-if 시뮬레이터 (없는 종목이면 None) - 모델/explainer/백분위 인덱스는 이미 올라간 것을 공유
+    try:
+        snapshot = sheets.load_snapshot()
+    except Exception as e:
+        _show_error(f"구글 시트 로드 중 에러 발생: {str(e)}")
+        return None
+    try:
+        return whatif.Simulator(snapshot, _load_model_stage(model_name), ticker.strip())
+    except LookupError:
+        return None
 
-    # 2. 기본 정보 추출
+_report_cache = report_cache.ReportCache()
+
+
+def build_report_prompt(data_summary, shap_data):
+    # 1. 기본 정보 추출
     ticker = data_summary.get('ticker', 'Unknown')
     risk_score = data_summary.get('risk_score', 0)
     company_name = data_summary.get('company_name', ticker)
@@ -395,37 +470,176 @@ def get_gemini_rag_analysis(data_summary, shap_data):
         safe_text = "(뚜렷한 방어 기제가 부족함)"
 
     # 4. Gemini 프롬프트 구성
+    prompt = f"""
+    당신은 기업 구조조정 및 부도 예측 전문가 AI입니다. 
+    사용자가 제공한 데이터를 바탕으로 투자자를 위한 정밀 분석 보고서를 작성하세요.
+
+    [분석 대상 기업]
+    - 기업명: {company_name} ({ticker})
+    - AI 종합 부도 위험 점수: {risk_score}점 (0점: 매우 안전 ~ 100점: 부도 위험 심각)
+
+    [데이터 분석 결과]
+
+    1. 🚨 주요 위험 요인 (Risk Factors) - 부도 가능성을 높이는 요인들:
+    {risk_text}
+
+    2. ✅ 주요 안전 요인 (Strength Factors) - 부도 가능성을 낮추는 방어 기제:
+    {safe_text}
+
+    [작성 가이드]
+    1. **종합 의견**: 위험 점수와 위 요인들을 종합하여 이 기업의 현재 상황을 2~3문장으로 요약하세요.
+    2. **위험 요인 분석**: 위 '주요 위험 요인' 목록에 있는 항목들이 왜 위험한지, 이것이 기업에 어떤 악영향을 줄 수 있는지 구체적으로 설명하세요. (목록이 없다면 안전하다고 칭찬하세요.)
+    3. **긍정 요인 분석**: 위 '주요 안전 요인' 목록을 바탕으로 이 기업의 재무적 강점이 무엇인지 설명하세요.
+    4. **제언**: 투자 관점에서 유의해야 할 점이나 모니터링해야 할 지표를 제시하세요.
+
+    (주의: SHAP 값이 양수(+)면 위험, 음수(-)면 안전입니다. 이 규칙을 절대 혼동하지 마세요.)
+    """
+    return prompt
+
+
+_gemini_model = None
+_gemini_lock = threading.Lock()
+
+def _get_gemini_model():
+    # genai.configure / GenerativeModel 은 프로세스당 한 번만 (요청마다 다시 설정하지 않음)
+    global _gemini_model
+    with _gemini_lock:
+        if _gemini_model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=gemini_api_key())
+            _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        return _gemini_model
+
+def _gemini_generate(prompt):
+    response = _get_gemini_model().generate_content(prompt)
+    return response.text
+
+
+def stub_generate(prompt):
+    # Gemini 없이 쓰는 로컬 스텁 (테스트/오프라인용): 프롬프트의 요인 목록을 그대로 요약
+    lines = [line.strip() for line in prompt.splitlines() if line.strip().startswith("- ")]
+    return "[로컬 스텁 리포트]\n" + "\n".join(lines)
+
+
+def _gemini_generate_stream(prompt):
+    response = _get_gemini_model().generate_content(
+        prompt, stream=True, request_options={"timeout": config.REPORT_STREAM_TIMEOUT}
+    )
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
+def stub_generate_stream(prompt):
+    # 스텁 리포트를 줄 단위 청크로 흘려보냄
+    yield from stub_generate(prompt).splitlines(keepends=True)
+
+
+def template_summary(data_summary, shap_data):
+    # Gemini 를 쓸 수 없을 때 보여줄 규칙 기반 요약
+    ticker = data_summary.get('ticker', 'Unknown')
+    risk_score = data_summary.get('risk_score', 0)
+    company_name = data_summary.get('company_name', ticker)
+
+    risks = sorted([x for x in shap_data if x['shap'] > 0], key=lambda x: x['shap'], reverse=True)[:3]
+    safes = sorted([x for x in shap_data if x['shap'] < 0], key=lambda x: x['shap'])[:3]
+
+    lines = [f"**{company_name} ({ticker})** 의 AI 부도 위험 점수는 **{risk_score}점** 입니다.", ""]
+    lines.append("🚨 주요 위험 요인")
+    lines += [f"- {x['desc'].split(' / ')[0]} ({x['name']}, SHAP={x['shap']:+.4f})" for x in risks] or ["- 특이한 위험 요인 없음"]
+    lines.append("")
+    lines.append("✅ 주요 안전 요인")
+    lines += [f"- {x['desc'].split(' / ')[0]} ({x['name']}, SHAP={x['shap']:+.4f})" for x in safes] or ["- 뚜렷한 방어 요인 없음"]
+    return "\n".join(lines)
+
+
+def _report_model_name(generate_fn):
+    # 캐시 키에 들어갈 모델 이름 (스트리밍/일반 생성은 같은 키를 써서 캐시를 공유)
+    # 스텁/주입 함수는 이름으로 구분해서 실제 Gemini 리포트와 캐시가 섞이지 않게 함
+    if generate_fn in (_gemini_generate, _gemini_generate_stream):
+        return GEMINI_MODEL_NAME
+    if generate_fn in (stub_generate, stub_generate_stream):
+        return "local-stub"
+    return getattr(generate_fn, "__name__", "custom")
+
+
+def report_generator():
+    # 지금 설정의 리포트 생성 함수와 캐시 키용 모델 이름 -> (함수, 이름), API 키가 없으면 (None, None)
+    # (일괄 생성 report_queue.py 가 대시보드와 같은 캐시 키로 저장하도록)
+    if config.GEMINI_STUB:
+        return stub_generate, _report_model_name(stub_generate)
+    if gemini_api_key():
+        return _gemini_generate, _report_model_name(_gemini_generate)
+    return None, None
+
+
+def _report_job(data_summary, shap_data, generate_fn):
+    # (캐시 키, 생성 함수) - 키는 모델 이름 + 프롬프트(티커/위험 점수/위험·안전 요인) 해시
+    if generate_fn is None:
+        generate_fn = stub_generate if config.GEMINI_STUB else _gemini_generate
+    prompt = build_report_prompt(data_summary, shap_data)
+    tracing.size("report.prompt_bytes", len(prompt.encode()))
+    return report_cache.make_key(_report_model_name(generate_fn), prompt), lambda: generate_fn(prompt)
+
+
+def _has_generator(generate_fn):
+    return generate_fn is not None or config.GEMINI_STUB or bool(gemini_api_key())
+
+
+def get_gemini_rag_analysis(data_summary, shap_data, generate_fn=None):
+    # 1. API 키 확인
+    if not _has_generator(generate_fn):
+        return "⚠️ API 키가 설정되지 않았습니다."
+
+    # 2. 캐시 확인 후 없으면 생성 (실패한 결과는 캐시하지 않음)
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-flash-latest')
-        
-        prompt = f"""
-        당신은 기업 구조조정 및 부도 예측 전문가 AI입니다. 
-        사용자가 제공한 데이터를 바탕으로 투자자를 위한 정밀 분석 보고서를 작성하세요.
-
-        [분석 대상 기업]
-        - 기업명: {company_name} ({ticker})
-        - AI 종합 부도 위험 점수: {risk_score}점 (0점: 매우 안전 ~ 100점: 부도 위험 심각)
-
-        [데이터 분석 결과]
-        
-        1. 🚨 주요 위험 요인 (Risk Factors) - 부도 가능성을 높이는 요인들:
-        {risk_text}
-        
-        2. ✅ 주요 안전 요인 (Strength Factors) - 부도 가능성을 낮추는 방어 기제:
-        {safe_text}
-
-        [작성 가이드]
-        1. **종합 의견**: 위험 점수와 위 요인들을 종합하여 이 기업의 현재 상황을 2~3문장으로 요약하세요.
-        2. **위험 요인 분석**: 위 '주요 위험 요인' 목록에 있는 항목들이 왜 위험한지, 이것이 기업에 어떤 악영향을 줄 수 있는지 구체적으로 설명하세요. (목록이 없다면 안전하다고 칭찬하세요.)
-        3. **긍정 요인 분석**: 위 '주요 안전 요인' 목록을 바탕으로 이 기업의 재무적 강점이 무엇인지 설명하세요.
-        4. **제언**: 투자 관점에서 유의해야 할 점이나 모니터링해야 할 지표를 제시하세요.
-
-        (주의: SHAP 값이 양수(+)면 위험, 음수(-)면 안전입니다. 이 규칙을 절대 혼동하지 마세요.)
-        """
-
-        response = model.generate_content(prompt)
-        return response.text
+        key, generate = _report_job(data_summary, shap_data, generate_fn)
+        return report_cache.get_or_generate(_report_cache, key, generate)
+    except Exception as e:
+        return f"분석 생성 실패: {str(e)}"
+
+
+def request_gemini_rag_analysis(data_summary, shap_data, generate_fn=None):
+    # 백그라운드 생성 요청 -> Future (캐시에 있으면 이미 완료된 Future)
+    # 결과는 wait_gemini_rag_analysis 로 꺼냅니다.
+    if not _has_generator(generate_fn):
+        future = Future()
+        future.set_result("⚠️ API 키가 설정되지 않았습니다.")
+        return future
 
+    key, generate = _report_job(data_summary, shap_data, generate_fn)
+    return report_cache.submit(_report_cache, key, generate)
+
+
+def wait_gemini_rag_analysis(future, timeout=None):
+    try:
+        return future.result(timeout=timeout)
     except Exception as e:
-        return f"분석 생성 실패: {str(e)}"
\ No newline at end of file
+        return f"분석 생성 실패: {str(e)}"
+
+
+def stream_gemini_rag_analysis(data_summary, shap_data, generate_stream_fn=None, timeout=None):
+    # 리포트를 청크 단위로 흘려보내는 제너레이터 (st.write_stream 용)
+    #  - 캐시에 있으면 기록된 청크를 그대로 재생
+    #  - timeout(초) 초과/에러 시 캐시된 리포트 또는 요약 템플릿으로 대체
+    if not _has_generator(generate_stream_fn):
+        yield "⚠️ API 키가 설정되지 않았습니다.\n\n" + template_summary(data_summary, shap_data)
+        return
+
+    if generate_stream_fn is None:
+        generate_stream_fn = stub_generate_stream if config.GEMINI_STUB else _gemini_generate_stream
+    prompt = build_report_prompt(data_summary, shap_data)
+    tracing.size("report.prompt_bytes", len(prompt.encode()))
+    key = report_cache.make_key(_report_model_name(generate_stream_fn), prompt)
+
+    def fallback(error, partial):
+        cached = _report_cache.get(key)
+        if cached is not None and not partial:
+            return cached
+        return f"\n\n⚠️ 리포트 생성이 완료되지 않아 요약으로 대체합니다. ({error})\n\n" + template_summary(data_summary, shap_data)
+
+    with tracing.span("report.stream"):
+        yield from report_cache.stream(
+            _report_cache, key, lambda: generate_stream_fn(prompt),
+            config.REPORT_STREAM_TIMEOUT if timeout is None else timeout, fallback,
+        )
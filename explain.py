@@ -0,0 +1,50 @@
+# explain.py
+# 모델 설명(SHAP 값) 백엔드
+#  - native: XGBoost 부스터의 pred_contribs 출력 (TreeSHAP 과 같은 값, shap import 불필요)
+#  - shap:   shap.TreeExplainer (기존 방식)
+# 두 백엔드 모두 explainer.shap_values(X) -> (행 수, 피처 수) 배열을 돌려줍니다.
+import numpy as np
+
+BACKENDS = ("native", "shap")
+
+
+class NativeExplainer:
+    # XGBoost 내장 기여도 계산 (마지막 열은 bias 이므로 제외)
+
+    def __init__(self, model):
+        self.model = model
+        self.booster = model.get_booster()
+        self.missing = getattr(model, "missing", np.nan)
+
+    def contributions(self, X):
+        # (행 수, 피처 수 + 1) - 마지막 열 bias 포함, 행 합계 = 모델 마진 출력
+        import xgboost as xgb
+        return self.booster.predict(xgb.DMatrix(X, missing=self.missing), pred_contribs=True)
+
+    def shap_values(self, X):
+        return self.contributions(X)[:, :-1]
+
+    def expected_value(self, X):
+        return self.contributions(X)[:, -1]
+
+
+def make_explainer(model, backend="native"):
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 설명 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+
+    # XGBoost 모델이 아니면 native 를 쓸 수 없으므로 shap 으로 대체
+    if backend == "native" and hasattr(model, "get_booster"):
+        return NativeExplainer(model)
+
+    import shap
+    return shap.TreeExplainer(model)
+
+
+def check_parity(model, X, atol=1e-4):
+    # native 와 shap 백엔드의 SHAP 값 비교 -> (최대 절대 오차, 허용 오차 이내 여부)
+    # (tests/test_explain.py 에서 저장소의 모든 모델로 확인)
+    native_vals = np.asarray(make_explainer(model, "native").shap_values(X), dtype=float)
+    shap_vals = np.asarray(make_explainer(model, "shap").shap_values(X), dtype=float)
+    max_diff = float(np.max(np.abs(native_vals - shap_vals))) if native_vals.size else 0.0
+    return max_diff, max_diff <= atol
+
@@ -0,0 +1,244 @@
+# feature_store.py
+# 스냅샷마다 한 번, Sheet1 의 49개 피처를 float32 컬럼 파일로 변환해 두는 저장소
+#  - features.npy  : (피처 수, 행 수) float32 - 피처(컬럼)별로 연속 저장, 숫자 변환 실패는 NaN
+#                    (시트에 없는 피처 컬럼은 기존 대시보드처럼 0으로 채움)
+#  - sorted.npy    : 피처별로 정렬한 유효값(NaN 제외)을 이어 붙인 배열 (백분위 인덱스용)
+#  - row_hashes.npy: 행별 피처 값 해시 (변경 감지용)
+#  - base_positions.npy: 이전 스냅샷 저장소에서 내용이 같은 행의 위치 (바뀐/새 행은 -1)
+#  - meta.json     : 스냅샷 ID, 피처 이름, 시트에 없던 피처, 피처별 개수, 비교 기준 스냅샷과 분포가 바뀐 피처,
+#                    행 순서대로 종목 코드/기업명/섹터
+# 모든 세션/워커 프로세스가 같은 파일을 읽기 전용 memmap 으로 열어서
+# 프로세스마다 피처 행렬을 따로 들고 있지 않고, 요청마다 pd.to_numeric 변환을 반복하지 않습니다.
+#
+# 시트가 일부만 바뀐 경우: 가장 최근 저장소와 행 해시(종목 코드 기준)를 비교해서
+# 분포가 바뀐 피처만 다시 정렬하고, 결과 테이블도 바뀐 행만 다시 계산합니다. (batch_scoring.py)
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import config
+import scoring
+import tracing
+from company_index import SECTOR_COLUMNS, normalize_code, normalize_sector
+from features import FEATURE_NAMES
+
+
+def store_dir():
+    return config.cache_path("features")
+
+
+FORMAT_VERSION = 3
+MATRIX_FILE = "features.npy"
+SORTED_FILE = "sorted.npy"
+HASHES_FILE = "row_hashes.npy"
+BASE_POSITIONS_FILE = "base_positions.npy"
+META_FILE = "meta.json"
+
+
+def _store_path(snapshot_id):
+    return os.path.join(store_dir(), snapshot_id)
+
+
+def row_keys(codes):
+    # 같은 종목 코드가 여러 줄(기간)이면 순번을 붙여 구분 (005930#0, 005930#1, ...)
+    seen = {}
+    keys = []
+    for code in codes:
+        n = seen.get(code, 0)
+        seen[code] = n + 1
+        keys.append(f"{code}#{n}")
+    return keys
+
+
+def row_hashes(columns):
+    # (피처 수, 행 수) -> 행별 64비트 해시 (피처 값이 하나라도 바뀌면 달라짐)
+    return pd.util.hash_pandas_object(pd.DataFrame(np.asarray(columns).T), index=False).to_numpy()
+
+
+def _diff(keys, hashes, columns, base):
+    # 이전 저장소(base)와 비교 -> (행별 base 위치 또는 -1, 분포가 바뀐 피처 마스크)
+    base_pos_by_key = {key: pos for pos, key in enumerate(row_keys(base.codes))}
+    matched = np.array([base_pos_by_key.get(key, -1) for key in keys], dtype=np.int64)
+    found = matched >= 0
+    same = found.copy()
+    same[found] = base.row_hashes[matched[found]] == hashes[found]
+    base_positions = np.where(same, matched, -1)
+
+    # 피처 분포가 바뀌는 경우: 값이 바뀐 행, 새로 생긴 행/없어진 행의 유효값(NaN 이 아닌 값)
+    modified = found & ~same
+    new_values = columns[:, modified]
+    old_values = np.asarray(base.columns[:, matched[modified]])
+    changed = (~((new_values == old_values) | (np.isnan(new_values) & np.isnan(old_values)))).any(axis=1)
+    changed |= ~np.isnan(columns[:, ~found]).all(axis=1)
+
+    removed = np.ones(len(base), dtype=bool)
+    removed[matched[found]] = False
+    if removed.any():
+        changed |= ~np.isnan(np.asarray(base.columns[:, removed])).all(axis=1)
+    return base_positions, changed
+
+
+def build_feature_store(snapshot, base=None):
+    # 스냅샷 -> 저장소 폴더 (임시 폴더에 다 쓴 뒤 이름을 바꿔서, 읽는 쪽이 반쯤 쓴 파일을 보지 않도록)
+    # base: 비교할 이전 저장소 (있으면 분포가 같은 피처는 정렬 결과를 그대로 복사)
+    df_company = snapshot.company
+    path = _store_path(snapshot.snapshot_id)
+
+    features = scoring.to_feature_matrix(scoring.fill_missing_features(df_company))
+    columns = np.ascontiguousarray(features.astype(np.float32).T)
+    codes = df_company['stock_code'].map(normalize_code).tolist()
+    hashes = row_hashes(columns)
+
+    if base is not None:
+        base_positions, changed = _diff(row_keys(codes), hashes, columns, base)
+    else:
+        base_positions, changed = np.full(len(codes), -1, dtype=np.int64), np.ones(len(FEATURE_NAMES), dtype=bool)
+
+    sorted_values = []
+    for j, name in enumerate(FEATURE_NAMES):
+        if changed[j]:
+            values = columns[j]
+            sorted_values.append(np.sort(values[~np.isnan(values)]))
+        else:
+            sorted_values.append(np.asarray(base.sorted_values(name)))
+
+    sector_col = next((col for col in SECTOR_COLUMNS if col in df_company.columns), None)
+    meta = {
+        "format": FORMAT_VERSION,
+        "snapshot_id": snapshot.snapshot_id,
+        "rows": len(df_company),
+        "feature_names": FEATURE_NAMES,
+        "missing_features": [name for name in FEATURE_NAMES if name not in df_company.columns],
+        "sorted_counts": [len(v) for v in sorted_values],
+        "base_snapshot_id": base.snapshot_id if base is not None else None,
+        "changed_features": [name for j, name in enumerate(FEATURE_NAMES) if changed[j]],
+        "codes": codes,
+        "names": (df_company['Company_Name'] if 'Company_Name' in df_company.columns
+                  else df_company['stock_code']).astype(str).tolist(),
+        "sectors": (df_company[sector_col].map(normalize_sector).tolist() if sector_col
+                    else ["Unknown"] * len(df_company)),
+    }
+
+    os.makedirs(store_dir(), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+    np.save(os.path.join(tmp_path, MATRIX_FILE), columns)
+    np.save(os.path.join(tmp_path, SORTED_FILE), np.concatenate(sorted_values).astype(np.float32))
+    np.save(os.path.join(tmp_path, HASHES_FILE), hashes)
+    np.save(os.path.join(tmp_path, BASE_POSITIONS_FILE), base_positions)
+    with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    if os.path.exists(path) and _read_meta(path).get("format") != FORMAT_VERSION:
+        # 예전 형식으로 만들어진 저장소는 지우고 교체
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # 다른 프로세스가 먼저 만들었으면 그쪽 것을 사용
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    tracing.size("feature_store.bytes", columns.nbytes)
+    return path
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class FeatureStore:
+    # 읽기 전용 memmap 으로 연 피처 저장소
+
+    def __init__(self, path):
+        meta = _read_meta(path)
+        self.path = path
+        self.snapshot_id = meta["snapshot_id"]
+        self.feature_names = meta["feature_names"]
+        self.missing_features = set(meta["missing_features"])
+        self.base_snapshot_id = meta["base_snapshot_id"]
+        self.changed_features = meta["changed_features"]
+        self.codes = meta["codes"]
+        self.names = meta["names"]
+        self.sectors = meta["sectors"]
+        self.columns = np.load(os.path.join(path, MATRIX_FILE), mmap_mode="r")
+        self.row_hashes = np.load(os.path.join(path, HASHES_FILE), mmap_mode="r")
+        self.base_positions = np.load(os.path.join(path, BASE_POSITIONS_FILE), mmap_mode="r")
+        self._sorted = np.load(os.path.join(path, SORTED_FILE), mmap_mode="r")
+        counts = meta["sorted_counts"]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+        self._sorted_ranges = {name: (offsets[j], offsets[j + 1]) for j, name in enumerate(self.feature_names)}
+        self._feature_pos = {name: j for j, name in enumerate(self.feature_names)}
+        self._positions = {}
+        for pos, code in enumerate(self.codes):
+            self._positions.setdefault(code, pos)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, name):
+        # 시트에 실제로 있던 피처인지
+        return name in self._feature_pos and name not in self.missing_features
+
+    def column(self, name):
+        # 피처 한 개의 전체 값 (float32 memmap, 복사 없음)
+        return self.columns[self._feature_pos[name]]
+
+    def sorted_values(self, name):
+        # 피처 한 개의 유효값 정렬 결과 (float32 memmap, 복사 없음)
+        start, end = self._sorted_ranges[name]
+        return self._sorted[start:end]
+
+    def matrix(self, positions=None):
+        # (행 수, 피처 수) float 배열 - scoring.to_feature_matrix 와 같은 모양 (결측치 NaN)
+        columns = self.columns if positions is None else self.columns[:, positions]
+        return np.asarray(columns, dtype=float).T
+
+    def first_position(self, code):
+        return self._positions.get(code)
+
+
+def open_feature_store(snapshot_id):
+    # 이미 만들어진 저장소만 엽니다 (없거나 예전 형식이면 None) - 배치 워커처럼 스냅샷 없이 여는 경우
+    path = _store_path(snapshot_id)
+    if _read_meta(path).get("format") != FORMAT_VERSION:
+        return None
+    return FeatureStore(path)
+
+
+def latest_feature_store(exclude=None):
+    # 가장 최근에 만든 저장소 (시트가 바뀌었을 때 비교 기준)
+    try:
+        entries = [e for e in os.scandir(store_dir()) if e.is_dir() and not e.name.endswith(".tmp")]
+    except OSError:
+        return None
+    entries = [e for e in entries if e.name != exclude and os.path.exists(os.path.join(e.path, META_FILE))]
+    for entry in sorted(entries, key=lambda e: os.path.getmtime(os.path.join(e.path, META_FILE)), reverse=True):
+        store = open_feature_store(entry.name)
+        if store is not None:
+            return store
+    return None
+
+
+def load_feature_store(snapshot):
+    # 디스크에 있으면 열고, 없으면 가장 최근 저장소와 비교해서 만들고 엽니다.
+    store = open_feature_store(snapshot.snapshot_id)
+    if store is not None:
+        tracing.count("feature_store.disk_hit")
+        return store
+
+    tracing.count("feature_store.miss")
+    base = latest_feature_store(exclude=snapshot.snapshot_id)
+    with tracing.span("feature_store.build", rows=len(snapshot.company), incremental=base is not None):
+        path = build_feature_store(snapshot, base)
+    return FeatureStore(path)
+
+
+def get_feature_store(snapshot):
+    # 스냅샷당 한 번만 열도록 스냅샷에 보관
+    return snapshot.memo("feature_store", load_feature_store)
@@ -0,0 +1,93 @@
+# features.py
+# 모델 입력 피처 정의 (dashboard / scoring 등 여러 모듈에서 공통 사용)
+
+FEATURE_NAMES = [
+'F1_Equity_Growth', 'F1_Retained_Earnings_Ratio', 'F1_ROA', 'F1_Debt_Ratio', 'F1_Current_Ratio', 'F1_ROE', 'F1_Interest_Coverage',
+'F2_KMV_DD', 'F3_Z_Score','F4_M_Score', 'M_Short_Term_Rate', 'M_Long_Term_Rate', 'M_Rate_Spread', 'M_Nominal_GDP_Growth',
+'M_Real_GDP_Growth', 'M_Inflation', 'M_Exchange_Rate', 'F1_Equity_Growth_change', 'F1_Equity_Growth_pct_change',
+'F1_Equity_Growth_improving', 'F1_Retained_Earnings_Ratio_change', 'F1_Retained_Earnings_Ratio_pct_change', 'F1_Retained_Earnings_Ratio_improving',
+'F1_ROA_change', 'F1_ROA_pct_change', 'F1_ROA_improving', 'F1_Debt_Ratio_change', 'F1_Debt_Ratio_pct_change', 'F1_Debt_Ratio_improving',
+'F1_Current_Ratio_change', 'F1_Current_Ratio_pct_change', 'F1_Current_Ratio_improving', 'F1_ROE_change', 'F1_ROE_pct_change', 'F1_ROE_improving',
+'F1_Interest_Coverage_change', 'F1_Interest_Coverage_pct_change', 'F1_Interest_Coverage_improving',
+'audit_prob', 'etc_prob', 'mda_prob', 'lex_sent_mean', 'lex_sent_sum', 'lex_pos_tf', 'lex_neg_tf', 'lex_pos_cnt', 'lex_neg_cnt', 'lex_abs_mean', 'lex_covered_tf' ]
+
+FEATURE_MAP = {
+'F1_Equity_Growth':'자기자본 증가율 / 자기자본 대비 순이익의 비율로 높을수록 주주 자본을 효율적으로 활용하는 것',
+'F1_Retained_Earnings_Ratio':'이익잉여금 비율 / 자본 중 이익잉여금이 차지하는 비중',
+'F1_ROA':'총자산이익률 / 기업이 보유한 자산으로 얼마나 효율적으로 이익을 창출하는지',
+'F1_Debt_Ratio':'부채비율 / 자기자본 대비 부채 수준으로 직관적인 파산 위험의 지표',
+'F1_Current_Ratio':'유동비율 / 단기적인 채무 상환의 능력을 의미',
+'F1_ROE':'자기자본이익률 / 자기자본 대비 순이익의 비율로 높을수록 주주 자본을 효율적으로 활용하는 것',
+'F1_Interest_Coverage':'이자보상배율 / 영업이익이 이자비용의 몇 배인지를 나타내면 1 미만이면 이자조차 감당할 수 없음을 의미',
+'F2_KMV_DD':'Distance to Default / 자산가치가 부채 임계치로부터 얼마나 떨어져 있는지를 나타내며 거리가 낮을수록 부도 가능성이 증가',
+'F3_Z_Score':'Altman Z-score / 여러 재무 비율을 종합한 파산 예측 점수로 낮을수록 파산 가능성이 증가',
+'F4_M_Score':'Beneish M-score / 회계 조작 가능성을 나타내는 점수로 높을 수록 이익을 조정했을 가능성이 증가',
+'M_Short_Term_Rate':'단기금리 / 단기적인 차입 비용으로 단기금리가 상승하면 재무적으로 취약한 기업에 부담으로 가중',
+'M_Long_Term_Rate':'장기금리 / 장기적인 자본 조달을 위한 비용으로 상승하면 투자가 위축되고, 재무구조가 약한 기업에 불리',
+'M_Rate_Spread':'금리 스프레드 / 장기, 단기 금리의 차이로 경기가 침체되는 신호를 나타냄',
+'M_Nominal_GDP_Growth':'명목 GDP 성장률 / 경기 규모의 성장을 나타내며 낮을수록 매출 성장이 둔화',
+'M_Real_GDP_Growth':'실질 GDP 성장률 / 물가 효과를 제거한 실질적인 경기 성장을 반영',
+'M_Inflation':'물가상승률 / 전반적인 물가 수준의 변화를 의미하며 급등하면 비용으로 압박이 작용',
+'M_Exchange_Rate':'환율 / 원화 대비 외화의 가치를 의미하며 수입 및 외화부채가 많은 기업에 위험 신호로 작용',
+'F1_Equity_Growth_change':'자기자본 증가율 변동폭',
+'F1_Equity_Growth_pct_change':'자기자본 증가율 증감률(%)',
+'F1_Equity_Growth_improving':'자기자본 증가율 개선 여부',
+'F1_Retained_Earnings_Ratio_change':'이익잉여금 비율 변동폭',
+'F1_Retained_Earnings_Ratio_pct_change':'이익잉여금 비율 증감률(%)',
+'F1_Retained_Earnings_Ratio_improving':'이익잉여금 비율 개선 여부',
+'F1_ROA_change':'ROA 변동폭',
+'F1_ROA_pct_change':'ROA 증감률(%)',
+'F1_ROA_improving':'ROA 개선 여부',
+'F1_Debt_Ratio_change':'부채비율 변동폭',
+'F1_Debt_Ratio_pct_change':'부채비율 증감률(%)',
+'F1_Debt_Ratio_improving':'부채비율 개선 여부',
+'F1_Current_Ratio_change':'유동비율 변동폭',
+'F1_Current_Ratio_pct_change':'유동비율 증감률(%)',
+'F1_Current_Ratio_improving':'유동비율 개선 여부',
+'F1_ROE_change':'ROE 변동폭',
+'F1_ROE_pct_change':'ROE 증감률(%)',
+'F1_ROE_improving':'ROE 개선 여부',
+'F1_Interest_Coverage_change':'이자보상배율 변동폭',
+'F1_Interest_Coverage_pct_change':'이자보상배율 증감률(%)',
+'F1_Interest_Coverage_improving':'이자보상배율 개선 여부',
+'audit_prob':'감사의견 텍스트 기반 부도 위험도',
+'etc_prob':'기타 공시 텍스트 기반 부도 위험도',
+'mda_prob':'MD&A 텍스트 기반 부도 위험도',
+'lex_sent_mean':'문서 전반의 평균적인 감성 점수로 낮을수록 부정적인 톤이 증가',
+'lex_sent_sum':'전체 문성의 감성 누적 정도로 부정 감성의 누적은 리스크가 커지는 것을 의미',
+'lex_pos_tf':'긍정 단어의 빈도를 의미',
+'lex_neg_tf':'부정 단어의 빈도를 의미',
+'lex_pos_cnt':'긍정 단어가 등장하는 문장의 수를 의미',
+'lex_neg_cnt':'부정 단어가 등장하는 문장의 수를 의미',
+'lex_abs_mean':'감성 강도의 절댓값의 평균으로 높을수록 표현의 강도가 크며 불확실성이 증가한다는 것을 의미',
+'lex_covered_tf':'감성 사전이 커버한 단어의 수를 의미하며 텍스트 분석 신뢰도 지표'
+}
+
+# 낮을수록 좋은 지표 (백분위 점수를 뒤집어서 사용)
+LOWER_IS_BETTER = [
+    # 1. 재무 비율 (부채는 적을수록 좋음)
+    "F1_Debt_Ratio", 
+
+    # 2. 재무 변화량 (부채비율이 늘어나는 건 나쁨)
+    "F1_Debt_Ratio_change", 
+    "F1_Debt_Ratio_pct_change",
+
+    # 3. 리스크 모델 (M-Score는 높으면 회계부정 의심 -> 낮아야 좋음)
+    "F4_M_Score", 
+
+    # 4. 거시경제 (금리/물가/환율은 오르면 기업 부담 -> 낮아야 좋음)
+    "M_Short_Term_Rate", 
+    "M_Long_Term_Rate",   # [추가됨] 설명: "상승하면... 불리"
+    "M_Inflation",        # 설명: "급등하면 비용 압박"
+    "M_Exchange_Rate",    # 설명: "위험 신호로 작용"
+
+    # 5. AI 부도 확률 예측 (당연히 확률이 낮아야 안전)
+    "audit_prob", 
+    "etc_prob", 
+    "mda_prob",
+
+    # 6. 텍스트 감성 분석 (부정적 단어/불확실성은 적을수록 좋음)
+    "lex_neg_cnt",       # 부정 문장 수
+    "lex_neg_tf",        # 부정 단어 빈도
+    "lex_abs_mean"       # [추가됨] 설명: "높을수록... 불확실성 증가"
+]
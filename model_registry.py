@@ -0,0 +1,198 @@
+# model_registry.py
+# 저장소에 들어 있는 XGBoost 모델(model_*.pkl) 목록과 로드 관리
+#  - 처음 한 번 pickle 을 XGBoost 기본 바이너리 형식(.ubj)으로 변환해 캐시 폴더에 저장
+#    이후에는 unpickle 없이 .ubj 를 바로 읽음 (더 빠르고, 임의 코드 실행 위험 없음)
+#  - 모델 버전 태그 = 파일 이름 + pkl 내용 해시 앞 8자리 (예: model_xgb_new_23-1a2b3c4d)
+#    결과 테이블 등 캐시 키에 이 태그를 쓰므로 같은 이름의 파일을 교체해도 이전 결과를 재사용하지 않음
+#  - 활성 모델은 재시작 없이 바꿀 수 있고(set_active), 여러 버전을 동시에 올려 A/B 비교 가능
+#
+# 사용 예)
+#   python model_registry.py            # 모든 모델을 .ubj 로 미리 변환 (배포 시 1회)
+import glob
+import hashlib
+import os
+import threading
+
+import config
+import explain
+import tracing
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def native_dir():
+    return config.cache_path("models")
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class LoadedModel:
+    # 로드된 모델 하나 (모델 + 버전 태그 + 백엔드별 explainer)
+
+    def __init__(self, name, version, model, source):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.source = source  # native / convert / pickle
+        self._explainers = {}
+        self._lock = threading.Lock()
+
+    def explainer(self, backend=config.EXPLAIN_BACKEND):
+        # explainer 도 모델과 함께 한 번만 생성
+        with self._lock:
+            if backend not in self._explainers:
+                self._explainers[backend] = explain.make_explainer(self.model, backend)
+            return self._explainers[backend]
+
+
+class ModelRegistry:
+
+    def __init__(self, model_dir=MODEL_DIR, active=None):
+        self.paths = {
+            os.path.splitext(os.path.basename(path))[0]: path
+            for path in sorted(glob.glob(os.path.join(model_dir, "model_*.pkl")))
+        }
+        self._active = active or config.MODEL_NAME
+        self._loaded = {}
+        self._versions = {}
+        self._load_locks = {}
+        self._preloading = set()
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.paths)
+
+    @property
+    def active(self):
+        return self._active
+
+    def set_active(self, name):
+        # 활성 모델 교체 (새 모델을 먼저 다 올린 뒤 바꾸므로 요청이 로드를 기다리지 않음)
+        self.get(name)
+        self._active = name
+        tracing.count("model.set_active")
+
+    def get(self, name=None):
+        # name 이 없으면 활성 모델 (프로세스당 모델별로 한 번만 로드)
+        name = name or self._active
+        if name not in self.paths:
+            raise ValueError(f"알 수 없는 모델: {name} (가능: {', '.join(self.paths)})")
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        # 모델별 잠금 - 다른 버전을 올리는 동안에도 이미 올라간 모델은 바로 사용
+        with load_lock:
+            if name not in self._loaded:
+                loaded = self._load(name)
+                with self._lock:
+                    self._loaded[name] = loaded
+            return self._loaded[name]
+
+    def version(self, name=None):
+        # 버전 태그 (파일 이름 + 내용 해시) - 모델을 올리지 않고 파일 해시만 계산 (파일이 바뀌지 않았으면 다시 읽지 않음)
+        name = name or self._active
+        if name not in self.paths:
+            raise ValueError(f"알 수 없는 모델: {name} (가능: {', '.join(self.paths)})")
+        path = self.paths[name]
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._versions.get(name)
+        if cached is None or cached[0] != signature:
+            cached = (signature, f"{name}-{_file_digest(path)[:8]}")
+            with self._lock:
+                self._versions[name] = cached
+        return cached[1]
+
+    def preload(self, name=None):
+        # 앱 시작 시 활성 모델을 백그라운드에서 미리 로드 (첫 요청이 기다리지 않도록)
+        name = name or self._active
+        with self._lock:
+            if name in self._loaded or name in self._preloading:
+                return
+            self._preloading.add(name)
+        threading.Thread(target=self._preload, args=(name,), name="model-preload", daemon=True).start()
+
+    def _preload(self, name):
+        try:
+            self.get(name)
+        except Exception as e:
+            print(f"⚠️ 모델 미리 로드 실패: {e}")
+
+    def _load(self, name):
+        path = self.paths[name]
+        version = self.version(name)
+        native_path = os.path.join(native_dir(), f"{version}.ubj")
+
+        with tracing.span("model.load", model=version) as span:
+            if os.path.exists(native_path):
+                try:
+                    model = load_native(native_path)
+                    span.set(source="native")
+                    tracing.count("model.native_hit")
+                    return LoadedModel(name, version, model, "native")
+                except Exception as e:
+                    print(f"⚠️ 모델 바이너리 읽기 실패, pickle 로 다시 변환: {e}")
+
+            import joblib
+            model = joblib.load(path)
+            source = "pickle"
+            if _is_xgb_classifier(model):
+                try:
+                    _save_native(model, native_path)
+                    source = "convert"
+                except Exception as e:
+                    print(f"⚠️ 모델 바이너리 변환 실패: {e}")
+            span.set(source=source)
+            tracing.count(f"model.{source}")
+            return LoadedModel(name, version, model, source)
+
+
+def _is_xgb_classifier(model):
+    try:
+        import xgboost as xgb
+    except ImportError:
+        return False
+    return type(model) is xgb.XGBClassifier
+
+
+def load_native(path):
+    import xgboost as xgb
+    model = xgb.XGBClassifier()
+    model.load_model(path)
+    return model
+
+
+def _save_native(model, path):
+    # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.ubj"
+    model.save_model(tmp_path)
+    os.replace(tmp_path, path)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    # 프로세스당 하나 (Streamlit 세션/배치 워커 공통)
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+if __name__ == "__main__":
+    registry = get_registry()
+    for name in registry.names():
+        entry = registry.get(name)
+        print(f"{entry.version}: {entry.source}")
@@ -0,0 +1,178 @@
+# prices.py
+# 현재 주가 조회 서비스
+#  - 1년치 OHLCV 대신 최근 며칠치만 조회
+#  - 종목별 최근 가격 메모리 캐시 + 시장 전체 종가(벌크) 캐시 (둘 다 가장 최근 것만 보관 - 오래 떠 있는 프로세스에서도 늘어나지 않음)
+#  - KRX 호출에 타임아웃을 걸어 느린 응답이 페이지를 막지 않도록 함
+#  - 조회 실패 시 0 대신 마지막으로 알던 가격과 '오래된 가격' 표시를 반환
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pandas as pd
+
+import config
+
+# 주말/연휴를 넘어 최근 거래일이 포함되도록 달력 기준 며칠 전부터 조회
+LOOKBACK_DAYS = 10
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="krx")
+_lock = threading.Lock()
+_quotes = {}   # code -> {"day": 조회일, "price", "as_of", "fetched_at"}  (종목마다 가장 최근 조회 하나)
+_closes = {}   # 조회일 -> (거래일, {code: 종가})  (벌크 조회 결과, 가장 최근 조회일 하나만)
+_warming = threading.Event()
+
+
+def price_dir():
+    return config.cache_path("prices")
+
+
+def _today():
+    return pd.Timestamp.now().strftime("%Y%m%d")
+
+
+def _quote(price, as_of, stale, source):
+    # price: 원 단위 종가 (모르면 None), as_of: 가격 기준 거래일 (YYYYMMDD)
+    return {"price": price, "as_of": as_of, "stale": stale, "source": source}
+
+
+def unknown_quote():
+    return _quote(None, None, True, "none")
+
+
+# === 종목 단위 조회 ===
+def _fetch_latest_close(code):
+    from pykrx import stock
+
+    end = pd.Timestamp.now()
+    start = end - pd.DateOffset(days=LOOKBACK_DAYS)
+    hist = stock.get_market_ohlcv(start.strftime("%Y%m%d"), end.strftime("%Y%m%d"), code)
+    if hist.empty:
+        return None
+    return float(hist['종가'].iloc[-1]), hist.index[-1].strftime("%Y%m%d")
+
+
+def _remember_quote(code, day, future):
+    # 타임아웃 뒤에 늦게 끝난 조회도 캐시에 넣어 다음 요청에서 쓰도록 함
+    try:
+        result = future.result()
+    except Exception:
+        return
+    if result is None:
+        return
+    price, as_of = result
+    with _lock:
+        _quotes[code] = {"day": day, "price": price, "as_of": as_of, "fetched_at": time.time()}
+
+
+def _last_known(code):
+    # 메모리/벌크/디스크에 남아 있는 가장 최근 가격
+    with _lock:
+        quote = _quotes.get(code)
+        candidates = [(quote["as_of"], quote["price"])] if quote else []
+        candidates += [(trade_date, closes[code]) for trade_date, closes in _closes.values() if code in closes]
+    if not candidates:
+        disk = _load_closes_from_disk()
+        if disk is not None and code in disk[1]:
+            candidates.append((disk[0], disk[1][code]))
+    if not candidates:
+        return None
+    return max(candidates)
+
+
+def get_price(code, timeout=None):
+    timeout = config.PRICE_TIMEOUT if timeout is None else timeout
+    day = _today()
+
+    # 1. 오늘 이미 조회했고 TTL 안쪽이면 캐시 사용
+    with _lock:
+        cached = _quotes.get(code)
+        bulk = _closes.get(day)
+    if cached and cached["day"] == day and time.time() - cached["fetched_at"] < config.PRICE_TTL_SECONDS:
+        return _quote(cached["price"], cached["as_of"], False, "cache")
+
+    # 2. 오늘자 시장 전체 종가가 이미 로드되어 있으면 사용
+    if bulk and code in bulk[1]:
+        return _quote(bulk[1][code], bulk[0], False, "bulk")
+
+    # 3. 최근 며칠치만 조회 (타임아웃)
+    future = _executor.submit(_fetch_latest_close, code)
+    future.add_done_callback(lambda f: _remember_quote(code, day, f))
+    try:
+        result = future.result(timeout=timeout)
+        if result is not None:
+            return _quote(result[0], result[1], False, "krx")
+    except FutureTimeout:
+        print(f"⚠️ 주가 조회 시간 초과: {code} ({timeout}초)")
+    except Exception as e:
+        print(f"⚠️ 주가 조회 실패: {code} ({e})")
+
+    # 4. 실패 -> 마지막으로 알던 가격 (오래된 가격 표시)
+    last = _last_known(code)
+    if last is not None:
+        return _quote(last[1], last[0], True, "stale")
+    return unknown_quote()
+
+
+# === 시장 전체 종가 (벌크) ===
+def _closes_path(day):
+    return os.path.join(price_dir(), f"{day}.json")
+
+
+def _save_closes_to_disk(day, closes):
+    os.makedirs(price_dir(), exist_ok=True)
+    tmp_path = f"{_closes_path(day)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(closes, f)
+    os.replace(tmp_path, _closes_path(day))
+
+
+def _load_closes_from_disk():
+    # 디스크에 저장된 가장 최근 거래일 종가 -> (거래일, {code: 종가})
+    try:
+        days = sorted(name[:-5] for name in os.listdir(price_dir()) if name.endswith(".json"))
+    except OSError:
+        return None
+    if not days:
+        return None
+    try:
+        with open(_closes_path(days[-1]), encoding="utf-8") as f:
+            return days[-1], json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_market_closes(max_back_days=LOOKBACK_DAYS):
+    # 가장 최근 거래일의 전 종목 종가를 한 번에 조회 -> (거래일, {code: 종가})
+    from pykrx import stock
+
+    day = pd.Timestamp.now()
+    for _ in range(max_back_days):
+        date = day.strftime("%Y%m%d")
+        df = stock.get_market_ohlcv(date, market="ALL")
+        if not df.empty and df['종가'].sum() > 0:
+            closes = {str(code): float(close) for code, close in df['종가'].items()}
+            with _lock:
+                _closes.clear()
+                _closes[_today()] = (date, closes)
+            _save_closes_to_disk(date, closes)
+            return date, closes
+        day -= pd.DateOffset(days=1)
+    return None
+
+
+def warm_in_background():
+    # 프로세스당 한 번, 시장 전체 종가를 백그라운드로 미리 로드
+    if _warming.is_set():
+        return
+    _warming.set()
+
+    def run():
+        try:
+            load_market_closes()
+        except Exception as e:
+            print(f"⚠️ 시장 전체 종가 로드 실패: {e}")
+
+    threading.Thread(target=run, name="price-warm", daemon=True).start()
@@ -0,0 +1,205 @@
+# report_cache.py
+# Gemini 리포트 캐시 + 백그라운드 생성
+#  - 키: 모델 이름 + 프롬프트 입력(티커, 위험 점수, 위험/안전 요인)의 해시
+#  - 메모리(LRU, 개수 제한) + 디스크(총 용량 제한, 오래 안 쓴 파일부터 삭제) 2단 캐시
+#  - 같은 키의 생성 요청은 하나로 합쳐서 백그라운드 스레드에서 한 번만 실행
+#  - 스트리밍 생성은 청크 단위로 기록해 두었다가 다음 요청에서 그대로 재생
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import config
+import tracing
+
+
+def report_dir():
+    return config.cache_path("reports")
+
+
+def make_key(model_name, *inputs):
+    h = hashlib.sha256(model_name.encode())
+    for value in inputs:
+        h.update(b"\x00")
+        h.update(str(value).encode())
+    return h.hexdigest()
+
+
+class ReportCache:
+
+    def __init__(self, directory=None, max_entries=config.REPORT_CACHE_MAX_ENTRIES,
+                 max_bytes=config.REPORT_CACHE_MAX_BYTES):
+        # directory 가 없으면 쓸 때의 캐시 폴더 아래 reports/ (대시보드가 import 시점에 만드는 캐시도 --cache-dir 를 따름)
+        self._directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return self._directory or report_dir()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get_chunks(self, key):
+        # 저장된 리포트를 생성 당시의 청크 목록으로 반환 (없으면 None)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                tracing.count("report_cache.memory_hit")
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                chunks = json.load(f)["chunks"]
+            os.utime(path)  # 최근 사용 시각 갱신 (디스크 LRU 기준)
+        except (OSError, ValueError, KeyError):
+            tracing.count("report_cache.miss")
+            return None
+
+        tracing.count("report_cache.disk_hit")
+        self._remember(key, chunks)
+        return chunks
+
+    def get(self, key):
+        chunks = self.get_chunks(key)
+        return None if chunks is None else "".join(chunks)
+
+    def put_chunks(self, key, chunks):
+        chunks = list(chunks)
+        self._remember(key, chunks)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"chunks": chunks}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def put(self, key, text):
+        self.put_chunks(key, [text])
+
+    def _remember(self, key, chunks):
+        with self._lock:
+            self._memory[key] = chunks
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # 총 용량이 넘으면 가장 오래 안 쓴 파일부터 삭제
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+# === 백그라운드 생성 ===
+_executor = ThreadPoolExecutor(max_workers=config.REPORT_WORKERS, thread_name_prefix="report")
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def get_or_generate(cache, key, generate):
+    # 캐시에 있으면 바로, 없으면 generate() 실행 후 저장 (동기)
+    text = cache.get(key)
+    if text is None:
+        with tracing.span("report.generate"):
+            text = generate()
+        tracing.size("report.bytes", len(text.encode()))
+        cache.put(key, text)
+    return text
+
+
+def submit(cache, key, generate):
+    # 캐시 히트면 완료된 Future, 아니면 백그라운드 생성 Future (같은 키는 하나로 합침)
+    text = cache.get(key)
+    if text is not None:
+        done = Future()
+        done.set_result(text)
+        return done
+
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(tracing.bind(get_or_generate), cache, key, generate)
+            _pending[key] = future
+            future.add_done_callback(lambda _: _forget(key))
+        return future
+
+
+def _forget(key):
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+# === 스트리밍 생성 ===
+_DONE = object()
+
+
+def stream(cache, key, start_stream, timeout, fallback):
+    # 캐시에 있으면 기록된 청크를 그대로 재생하고,
+    # 없으면 start_stream() 이 주는 청크를 받는 대로 넘겨주면서 기록합니다.
+    # timeout(초) 안에 끝나지 않거나 에러가 나면 fallback(error, partial) 텍스트로 마무리합니다.
+    cached = cache.get_chunks(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    # 생성은 별도 스레드에서 돌리고 큐로 받아야 느린 청크에서도 타임아웃을 걸 수 있음
+    chunk_queue = queue.Queue()
+
+    def produce():
+        try:
+            for chunk in start_stream():
+                chunk_queue.put(chunk)
+            chunk_queue.put(_DONE)
+        except Exception as e:
+            chunk_queue.put(e)
+
+    threading.Thread(target=produce, name="report-stream", daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    chunks = []
+    while True:
+        try:
+            item = chunk_queue.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            item = TimeoutError(f"{timeout}초 안에 리포트 생성이 끝나지 않았습니다.")
+
+        if item is _DONE:
+            tracing.size("report.bytes", sum(len(chunk.encode()) for chunk in chunks))
+            cache.put_chunks(key, chunks)
+            return
+        if isinstance(item, Exception):
+            yield fallback(item, bool(chunks))
+            return
+
+        chunks.append(item)
+        yield item
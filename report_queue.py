@@ -0,0 +1,394 @@
+# report_queue.py
+# 여러 종목 AI 리포트 일괄 생성 (포트폴리오 단위)
+#  - asyncio 워커 풀: 동시 생성 요청 수 제한 (config.BULK_REPORT_CONCURRENCY)
+#  - 토큰 버킷: 초당 요청 수 / 한 번에 몰리는 요청 수 제한 (API 호출 한도를 넘지 않도록)
+#  - 실패하면 지수 백오프(+지터)로 재시도, 서버가 429 + Retry-After 를 주면 최소 그만큼 기다림
+#  - 같은 프롬프트(같은 캐시 키)는 한 번만 생성, 이미 만든 리포트는 리포트 캐시(report_cache.py, 디스크)에서 바로 사용
+#    -> 중간에 끊겨도 다시 실행하면 남은 것만 생성, 대시보드도 같은 캐시를 그대로 읽음
+#  - 처리량(리포트/초), 요청 지연 p50/p95, 재시도/실패 수 요약
+#  - 테스트용 로컬 스텁 모델 서버 (응답 지연 / 429 실패율 / 동시 요청 한도 흉내)
+#
+# 사용 예)
+#   python report_queue.py 005930 000660 --data-dir ./data --output reports.jsonl         # Gemini (GEMINI_API_KEY)
+#   python report_queue.py all --data-dir ./data --output reports.jsonl --stub-server --stub-failure-rate 0.2
+#   python report_queue.py --tickers-file watch.txt --data-dir ./data --output r.jsonl --stub-url http://127.0.0.1:8700
+import argparse
+import asyncio
+import inspect
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+import tracing
+
+
+class RateLimited(Exception):
+    # 모델 서버가 요청 한도 초과(429)를 알려 줄 때 - retry_after 초 뒤 재시도
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    # 초당 rate 개씩 채워지고 최대 burst 개까지 쌓이는 토큰 (요청 하나에 토큰 하나, rate <= 0 이면 제한 없음)
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class BulkReportRunner:
+    # generate: 프롬프트 -> 리포트 (일반 함수는 스레드에서, async 함수는 그대로 실행)
+    # model_name: 캐시 키에 들어갈 모델 이름 (대시보드와 같은 이름이면 같은 캐시를 공유)
+    # cache: report_cache.ReportCache
+
+    def __init__(self, generate, model_name, cache, concurrency=None, rate=None, burst=None,
+                 retries=None, backoff=None, progress=None):
+        self.generate = generate
+        self.model_name = model_name
+        self.cache = cache
+        self.concurrency = max(1, concurrency or config.BULK_REPORT_CONCURRENCY)
+        self.rate = config.BULK_REPORT_RATE if rate is None else rate
+        self.burst = burst or config.BULK_REPORT_BURST
+        self.retries = config.BULK_REPORT_RETRIES if retries is None else retries
+        self.backoff = config.BULK_REPORT_BACKOFF if backoff is None else backoff
+        self.progress = progress  # progress(끝난 수, 전체 수) - 생성이 하나 끝날 때마다
+        self.stats = {"requested": 0, "unique": 0, "cached": 0, "generated": 0, "failed": 0,
+                      "retries": 0, "rate_limited": 0}
+        self.latencies = []
+        self.elapsed = 0.0
+
+    async def _call(self, prompt):
+        if inspect.iscoroutinefunction(self.generate):
+            return await self.generate(prompt)
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def _generate_one(self, prompt):
+        # -> (리포트, 시도 횟수) / 재시도를 다 써도 실패하면 마지막 예외
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                with tracing.span("report_queue.generate", attempt=attempt):
+                    text = await self._call(prompt)
+                self.latencies.append((time.perf_counter() - started) * 1000)
+                return text, attempt + 1
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random() * 0.5)
+                if isinstance(e, RateLimited):
+                    self.stats["rate_limited"] += 1
+                    delay = max(delay, e.retry_after or 0)
+                self.stats["retries"] += 1
+                tracing.count("report_queue.retry")
+                await asyncio.sleep(delay)
+
+    async def _worker(self, queue, results, total):
+        while True:
+            try:
+                key, prompt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                text, attempts = await self._generate_one(prompt)
+                # 성공한 리포트만 캐시에 저장 (실패는 다음 실행에서 다시 시도)
+                self.cache.put(key, text)
+                results[key] = {"status": "generated", "attempts": attempts, "report": text}
+                self.stats["generated"] += 1
+            except Exception as e:
+                results[key] = {"status": "failed", "attempts": self.retries + 1, "error": str(e)}
+                self.stats["failed"] += 1
+            if self.progress:
+                self.progress(self.stats["generated"] + self.stats["failed"], total)
+
+    async def run_async(self, prompts):
+        # prompts: {이름(종목 코드): 프롬프트} -> {이름: {key, status, attempts, report 또는 error}}
+        import report_cache
+
+        self.bucket = TokenBucket(self.rate, self.burst)
+        keys = {name: report_cache.make_key(self.model_name, prompt) for name, prompt in prompts.items()}
+        unique = {}
+        for name, key in keys.items():
+            unique.setdefault(key, prompts[name])
+        self.stats["requested"] += len(prompts)
+        self.stats["unique"] += len(unique)
+
+        results = {}
+        queue = asyncio.Queue()
+        for key, prompt in unique.items():
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = {"status": "cached", "attempts": 0, "report": cached}
+                self.stats["cached"] += 1
+            else:
+                queue.put_nowait((key, prompt))
+
+        started = time.perf_counter()
+        total = queue.qsize()
+        with tracing.span("report_queue.run", jobs=total, workers=self.concurrency):
+            await asyncio.gather(*[
+                self._worker(queue, results, total) for _ in range(min(self.concurrency, total))
+            ])
+        self.elapsed += time.perf_counter() - started
+        return {name: {"key": key, **results[key]} for name, key in keys.items()}
+
+    def run(self, prompts):
+        return asyncio.run(self.run_async(prompts))
+
+    def summary(self):
+        p50, p95 = _percentile(self.latencies, 0.5), _percentile(self.latencies, 0.95)
+        return {
+            **self.stats,
+            "deduplicated": self.stats["requested"] - self.stats["unique"],
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_per_s": round(self.stats["generated"] / self.elapsed, 3) if self.elapsed else None,
+            "latency_p50_ms": round(p50, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95, 1) if p95 is not None else None,
+        }
+
+
+# === 로컬 스텁 모델 서버 (테스트용) ===
+class StubModelServer:
+    # POST /generate {"prompt": ...} -> {"text": ...} (dashboard.stub_generate 와 같은 내용)
+    #  - latency 초 뒤에 응답, failure_rate 확률로 429 + Retry-After
+    #  - max_concurrent 를 넘는 동시 요청도 429 (워커 풀의 동시 요청 제한 확인용)
+
+    def __init__(self, latency=0.2, failure_rate=0.0, max_concurrent=None, retry_after=0.1,
+                 seed=0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.stats = {"calls": 0, "rejected": 0, "active": 0, "peak_concurrent": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = "http://%s:%d" % self._server.server_address[:2]
+
+    def _admit(self):
+        # -> 요청을 받을지 (동시 요청 수 / 실패율)
+        with self._lock:
+            self.stats["calls"] += 1
+            over = self.max_concurrent is not None and self.stats["active"] >= self.max_concurrent
+            if over or self._random.random() < self.failure_rate:
+                self.stats["rejected"] += 1
+                return False
+            self.stats["active"] += 1
+            self.stats["peak_concurrent"] = max(self.stats["peak_concurrent"], self.stats["active"])
+            return True
+
+    def _release(self):
+        with self._lock:
+            self.stats["active"] -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                prompt = json.loads(self.rfile.read(length) or b"{}").get("prompt", "")
+                if not server._admit():
+                    self._send(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+                    return
+                try:
+                    import dashboard as db
+                    time.sleep(server.latency)
+                    text = db.stub_generate(prompt)
+                finally:
+                    # 응답을 보내기 전에 반납 (응답을 받은 클라이언트의 다음 요청이 한도에 걸리지 않도록)
+                    server._release()
+                self._send(200, {"text": text})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="stub-model-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def http_generate(url, timeout=30):
+    # 스텁 모델 서버(또는 같은 형식의 서버)에 프롬프트를 보내는 생성 함수
+    def generate(prompt):
+        request = urllib.request.Request(
+            f"{url}/generate", data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimited("요청 한도 초과 (429)", float(e.headers.get("Retry-After") or 0) or None)
+            raise
+    return generate
+
+
+# === CLI ===
+def build_prompts(snapshot, model, codes):
+    # 종목 코드 -> (결과 dict, 프롬프트) - 결과 테이블에서 꺼내므로 predict/SHAP 은 스냅샷당 한 번
+    import dashboard as db
+
+    entries, missing = {}, []
+    for code in codes:
+        data = db.build_company_result(snapshot, model, code)
+        if data is None:
+            missing.append(code)
+            continue
+        entries[code] = (data, db.build_report_prompt(data, data['shap_data']))
+    return entries, missing
+
+
+def _configure(data_dir, cache_dir):
+    if data_dir:
+        config.DATA_DIR = data_dir
+    if cache_dir:
+        # 리포트/스냅샷 캐시 경로는 쓸 때 계산되므로 이미 import 된 모듈(대시보드 리포트 캐시 등)에도 적용됨
+        config.set_cache_dir(cache_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 종목 AI 리포트 일괄 생성")
+    parser.add_argument("tickers", nargs="*", help="종목 코드 목록 또는 all (전체)")
+    parser.add_argument("--tickers-file", help="종목 코드가 한 줄에 하나씩 있는 파일")
+    parser.add_argument("--data-dir", help="sheet1.csv / sheet2.csv / sheet3.csv 가 있는 폴더 (기본: DASHBOARD_DATA_DIR 또는 Google 시트)")
+    parser.add_argument("--cache-dir", help="캐시 폴더 (기본: DASHBOARD_CACHE_DIR 또는 .cache)")
+    parser.add_argument("--output", required=True, help="종목별 결과 파일 (.jsonl)")
+    parser.add_argument("--model", default=None, help="스코어링 모델 이름 (기본: DASHBOARD_MODEL 또는 model_xgb_new_23)")
+    parser.add_argument("--concurrency", type=int, default=None, help="동시 생성 요청 수")
+    parser.add_argument("--rate", type=float, default=None, help="초당 생성 요청 수 (0 이면 제한 없음)")
+    parser.add_argument("--burst", type=int, default=None, help="한 번에 몰아서 보낼 수 있는 요청 수")
+    parser.add_argument("--retries", type=int, default=None, help="실패 시 재시도 횟수")
+    parser.add_argument("--stub-server", action="store_true", help="로컬 스텁 모델 서버를 띄워서 사용 (네트워크/API 키 불필요)")
+    parser.add_argument("--stub-url", help="이미 떠 있는 스텁 모델 서버 주소")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="스텁 서버 응답 지연 (초)")
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0, help="스텁 서버 429 응답 비율 (0~1)")
+    args = parser.parse_args(argv)
+
+    _configure(args.data_dir, args.cache_dir)
+
+    import company_index
+    import dashboard as db
+    import report_cache
+    import sheets
+
+    requested = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file, encoding="utf-8") as f:
+            requested += [line.strip() for line in f if line.strip()]
+    if not requested:
+        parser.error("종목 코드 또는 all 을 지정하세요.")
+
+    # 1. 생성 함수 (스텁 서버 / DASHBOARD_GEMINI_STUB 스텁 / Gemini)
+    stub = None
+    if args.stub_server:
+        stub = StubModelServer(latency=args.stub_latency, failure_rate=args.stub_failure_rate).start()
+        generate, model_name = http_generate(stub.url), "stub-server"
+    elif args.stub_url:
+        generate, model_name = http_generate(args.stub_url.rstrip("/")), "stub-server"
+    else:
+        # 대시보드와 같은 생성 함수 / 캐시 키 -> 여기서 만든 리포트를 대시보드가 그대로 사용
+        generate, model_name = db.report_generator()
+        if generate is None:
+            parser.error("GEMINI_API_KEY 가 없습니다. (--stub-server 또는 DASHBOARD_GEMINI_STUB=1 로 로컬 실행)")
+
+    # 2. 종목별 결과 + 프롬프트 (결과 테이블에서 조회)
+    started = time.time()
+    snapshot = sheets.refresh_snapshot()
+    try:
+        model = db.get_model(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(t.lower() == "all" for t in requested):
+        codes = db.get_company_index(snapshot).codes
+    else:
+        codes = list(dict.fromkeys(company_index.normalize_code(t) for t in requested))
+    entries, missing = build_prompts(snapshot, model, codes)
+    if missing:
+        print(f"⚠️ 시트에 없는 종목 {len(missing)}개 제외: {', '.join(missing[:20])}", file=sys.stderr)
+    if not entries:
+        print("리포트를 만들 종목이 없습니다.", file=sys.stderr)
+        return 1
+    print(f"✅ 프롬프트 {len(entries)}개 준비 ({time.time() - started:.1f}초)")
+
+    # 3. 워커 풀로 생성
+    def progress(done, total):
+        if done == total or done % 20 == 0:
+            print(f"  {done}/{total}")
+
+    runner = BulkReportRunner(generate, model_name, report_cache.ReportCache(),
+                              concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+                              retries=args.retries, progress=progress)
+    results = runner.run({code: prompt for code, (_, prompt) in entries.items()})
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for code, result in results.items():
+            data = entries[code][0]
+            f.write(json.dumps({
+                "ticker": code, "company_name": data['company_name'], "risk_score": data['risk_score'],
+                "model_version": model.version, "snapshot_id": snapshot.snapshot_id, **result,
+            }, ensure_ascii=False) + "\n")
+
+    s = runner.summary()
+    print(f"✅ 리포트 {s['requested']}개 (생성 {s['generated']}, 캐시 {s['cached']}, 중복 {s['deduplicated']}, "
+          f"실패 {s['failed']}, 재시도 {s['retries']}) -> {args.output}")
+    print(f"   처리량 {s['throughput_per_s'] or 0:.2f}개/초 ({s['elapsed_s']:.1f}초), "
+          f"요청 지연 p50 {s['latency_p50_ms'] or 0:.0f} ms / p95 {s['latency_p95_ms'] or 0:.0f} ms")
+    if stub is not None:
+        print(f"   스텁 서버: 호출 {stub.stats['calls']}회, 429 {stub.stats['rejected']}회, "
+              f"최대 동시 요청 {stub.stats['peak_concurrent']}")
+        stub.stop()
+    return 1 if s['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
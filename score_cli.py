@@ -0,0 +1,175 @@
+# score_cli.py
+# 브라우저 없이 종목 리스트를 스코어링하는 배치용 CLI
+#
+# 사용 예)
+#   python score_cli.py all --data-dir ./data --output risk_report.parquet
+#   python score_cli.py 005930 000660 --data-dir ./data --output risk.csv --workers 4
+#   python score_cli.py --tickers-file watch.txt --data-dir ./data --output risk.csv
+#   python score_cli.py all --data-dir ./data --output risk_b.csv --model model_xgb_new   # 다른 모델 버전으로 A/B
+#
+# --data-dir 폴더에는 sheet1.csv(기업별), sheet2.csv(산업 평균), sheet3.csv(정상/부도 평균)가 있어야 합니다.
+# secrets.toml 이나 네트워크 없이 동작합니다. (주가 조회/Gemini 리포트는 하지 않음)
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
+
+import config
+
+# 각 워커 프로세스가 한 번만 만드는 상태 (피처 저장소, 모델, 인덱스)
+_worker = {}
+
+
+def _configure(data_dir, cache_dir):
+    config.DATA_DIR = data_dir
+    if cache_dir:
+        # 캐시 경로는 쓸 때 config 에서 다시 계산하므로 이미 import 된 모듈에도 적용됨
+        config.set_cache_dir(cache_dir)
+
+
+def _init_worker(data_dir, cache_dir, snapshot_id, model_name):
+    _configure(data_dir, cache_dir)
+
+    import dashboard as db
+    import feature_store
+    import scoring
+
+    # 부모 프로세스가 만들어 둔 피처 저장소를 읽기 전용 memmap 으로 공유
+    # (워커마다 시트 스냅샷을 다시 읽거나 숫자 변환하지 않음)
+    store = feature_store.open_feature_store(snapshot_id)
+    _worker["store"] = store
+    model = db.get_model(model_name)
+    _worker["model"] = model.model
+    _worker["explainer"] = model.explainer()
+    _worker["model_version"] = model.version
+    _worker["percentile_index"] = scoring.PercentileIndex.from_store(store)
+
+
+def _score_chunk(codes, with_details):
+    import batch_scoring
+    from features import FEATURE_NAMES
+
+    store = _worker["store"]
+    positions = [store.first_position(code) for code in codes]
+
+    # 청크 단위로 predict / SHAP / 백분위 / 신호등을 한 번에 계산
+    probs, shap_matrix, scores, lights = batch_scoring.score_matrix(
+        store.matrix(positions), _worker["model"], _worker["explainer"], _worker["percentile_index"]
+    )
+
+    out = pd.DataFrame({
+        "stock_code": codes,
+        "company_name": [store.names[pos] for pos in positions],
+        "sector": [store.sectors[pos] for pos in positions],
+        "prob": probs,
+        "risk_score": (probs * 100).astype(int),
+        "model_version": _worker["model_version"],
+        "snapshot_id": store.snapshot_id,
+    })
+    for group, colors in lights.items():
+        out[f"light_{group}"] = colors
+
+    # 위험을 가장 많이 높인 요인 3개 (SHAP 양수 상위)
+    top = (-shap_matrix).argsort(axis=1)[:, :3]
+    out["top_risk_factors"] = [
+        ", ".join(FEATURE_NAMES[j] for j in row if shap_matrix[i, j] > 0) for i, row in enumerate(top)
+    ]
+
+    if with_details:
+        out = pd.concat([
+            out,
+            pd.DataFrame(shap_matrix, columns=batch_scoring.SHAP_COLUMNS),
+            pd.DataFrame(scores, columns=batch_scoring.SCORE_COLUMNS),
+        ], axis=1)
+    return out
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def write_output(df, path):
+    # 확장자로 형식 결정 (.parquet / .csv)
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="종목 리스트 부도 위험 배치 스코어링")
+    parser.add_argument("tickers", nargs="*", help="종목 코드 목록 또는 all (전체)")
+    parser.add_argument("--tickers-file", help="종목 코드가 한 줄에 하나씩 있는 파일")
+    parser.add_argument("--data-dir", required=True, help="sheet1.csv / sheet2.csv / sheet3.csv 가 있는 폴더")
+    parser.add_argument("--cache-dir", help="캐시 폴더 (기본: DASHBOARD_CACHE_DIR 또는 .cache)")
+    parser.add_argument("--output", required=True, help="결과 파일 (.parquet 또는 .csv)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="워커 프로세스 수")
+    parser.add_argument("--chunk-size", type=int, default=500, help="워커 1회 처리 종목 수")
+    parser.add_argument("--model", default=None,
+                        help="모델 이름 (예: model_xgb_new, 기본: DASHBOARD_MODEL 또는 model_xgb_new_23)")
+    parser.add_argument("--details", action="store_true", help="49개 피처별 SHAP/백분위 점수 컬럼 포함")
+    args = parser.parse_args(argv)
+
+    _configure(args.data_dir, args.cache_dir)
+
+    import company_index
+    import feature_store
+    import model_registry
+    import sheets
+
+    started = time.time()
+
+    # 모델 이름 확인 + pickle -> XGBoost 바이너리 변환을 부모에서 한 번 (워커는 변환된 파일만 읽음)
+    try:
+        model_registry.get_registry().get(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # 1. 로컬 CSV 로 스냅샷을 새로 만들고 피처 저장소로 변환 (워커들은 이 저장소를 memmap 으로 읽음)
+    snapshot = sheets.refresh_snapshot()
+    feature_store.get_feature_store(snapshot)
+    companies = company_index.CompanyIndex(snapshot)
+
+    # 2. 대상 종목 정리
+    requested = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file, encoding="utf-8") as f:
+            requested += [line.strip() for line in f if line.strip()]
+    if not requested:
+        parser.error("종목 코드 또는 all 을 지정하세요.")
+
+    if any(t.lower() == "all" for t in requested):
+        codes = companies.codes
+    else:
+        codes = list(dict.fromkeys(company_index.normalize_code(t) for t in requested))
+        missing = [code for code in codes if code not in companies]
+        if missing:
+            print(f"⚠️ 시트에 없는 종목 {len(missing)}개 제외: {', '.join(missing[:20])}", file=sys.stderr)
+        codes = [code for code in codes if code in companies]
+
+    if not codes:
+        print("스코어링할 종목이 없습니다.", file=sys.stderr)
+        return 1
+
+    # 3. 프로세스 풀에서 청크 단위로 스코어링
+    workers = max(1, min(args.workers, (len(codes) + args.chunk_size - 1) // args.chunk_size))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config.DATA_DIR, args.cache_dir, snapshot.snapshot_id, args.model)) as pool:
+        parts = list(pool.map(_score_chunk, _chunks(codes, args.chunk_size),
+                              repeat(args.details)))
+
+    result = pd.concat(parts, ignore_index=True).sort_values("risk_score", ascending=False)
+    write_output(result, args.output)
+
+    elapsed = time.time() - started
+    print(f"✅ {len(result)}개 종목 스코어링 완료 ({workers}개 프로세스, {elapsed:.1f}초) -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
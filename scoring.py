@@ -0,0 +1,191 @@
+# scoring.py
+# 백분위(Rank) 기반 건전성 점수 계산
+# 기존에는 피처마다 전체 컬럼을 다시 읽어 (all_values < val).mean() 을 계산했지만,
+# 스냅샷마다 한 번 정렬해 둔 배열에 searchsorted 로 질의하도록 바꿨습니다.
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_NAMES, LOWER_IS_BETTER
+
+NEUTRAL_SCORE = 50.0  # 결측치/데이터 없음일 때 중립 점수
+
+
+def _complex_keys(feature_ids, values):
+    # (피처 번호, 값) -> 복소수 키
+    # (1j * inf 는 실수부가 NaN 이 되므로 곱셈 대신 실수부/허수부를 직접 채웁니다)
+    keys = np.empty(np.shape(values), dtype=complex)
+    keys.real = feature_ids
+    keys.imag = values
+    return keys
+
+
+def fill_missing_features(df, feature_names=FEATURE_NAMES):
+    # 시트에 없는 피처 컬럼은 0으로 채운 복사본 (기존 load_data_and_model 의 "49개 피처 누락 방지"와 같은 규칙)
+    # 스냅샷 프레임은 여러 요청이 공유하므로 원본은 건드리지 않고, 누락 컬럼이 없으면 그대로 반환
+    missing = [name for name in feature_names if name not in df.columns]
+    if not missing:
+        return df
+    return df.assign(**{name: 0.0 for name in missing})
+
+
+def to_feature_matrix(rows, feature_names=FEATURE_NAMES):
+    # Series 한 줄 / Series 목록 / DataFrame 을 (행 수, 피처 수) float 배열로 변환
+    # 숫자로 바꿀 수 없는 값과 없는 컬럼은 NaN
+    if isinstance(rows, pd.Series):
+        rows = [rows]
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame([row.reindex(feature_names).values for row in rows], columns=feature_names)
+    frame = rows.reindex(columns=feature_names)
+    return frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+
+class PercentileIndex:
+    # 피처별 유효값(NaN 제외)을 정렬해 둔 인덱스
+
+    def __init__(self, df_company, feature_names=FEATURE_NAMES):
+        columns = {
+            name: pd.to_numeric(df_company[name], errors="coerce").to_numpy(dtype=float)
+            for name in feature_names if name in df_company.columns
+        }
+        self._build(columns, len(df_company), feature_names)
+
+    @classmethod
+    def from_store(cls, store, feature_names=FEATURE_NAMES):
+        # feature_store.FeatureStore 에 피처별로 정렬해 둔 float32 값을 그대로 사용 (다시 정렬하지 않음)
+        # 질의 값도 float32 로 맞춰서 비교해야 회사 자신의 값과 순위가 어긋나지 않음
+        index = cls.__new__(cls)
+        sorted_values = [
+            np.asarray(store.sorted_values(name), dtype=float) if name in store else np.zeros(len(store))
+            for name in feature_names
+        ]
+        index._set_sorted(sorted_values, feature_names, query_dtype=np.float32)
+        return index
+
+    def _build(self, columns, n_rows, feature_names):
+        sorted_values = []
+        for name in feature_names:
+            if name in columns:
+                values = columns[name]
+                values = values[~np.isnan(values)]
+            else:
+                # 누락된 피처는 0으로 채워진 것으로 간주 (load_data_and_model 과 동일)
+                values = np.zeros(n_rows)
+            sorted_values.append(np.sort(values))
+        self._set_sorted(sorted_values, feature_names)
+
+    def _set_sorted(self, sorted_values, feature_names, query_dtype=None):
+        self.feature_names = list(feature_names)
+        self.query_dtype = query_dtype
+        self.counts = np.array([len(v) for v in sorted_values])
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.lower_is_better = np.array([name in LOWER_IS_BETTER for name in self.feature_names])
+
+        # 모든 피처를 한 배열에 담아 searchsorted 한 번으로 질의하기 위해
+        # (피처 번호, 값)을 복소수 (실수부=피처 번호, 허수부=값)로 묶습니다.
+        # numpy 는 복소수를 실수부 -> 허수부 순의 사전식으로 정렬하므로
+        # 피처 j 구간 안에서 값 순서가 그대로 유지됩니다.
+        feature_ids = np.repeat(np.arange(len(self.feature_names)), self.counts)
+        self._keys = _complex_keys(feature_ids, np.concatenate(sorted_values))
+
+    def percentiles(self, X, columns=None):
+        # X: (행 수, 피처 수) -> 각 값보다 작은 데이터의 비율 (0.0 ~ 1.0), 질의 불가면 NaN
+        # columns: X 의 각 열이 몇 번째 피처인지 (일부 피처만 질의할 때, 기본은 전체 피처 순서)
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if self.query_dtype is not None:
+            X = X.astype(self.query_dtype).astype(float)
+        columns = np.arange(X.shape[1]) if columns is None else np.asarray(columns)
+        counts = self.counts[columns]
+        invalid = np.isnan(X) | (counts == 0)
+
+        feature_ids = np.broadcast_to(columns, X.shape)
+        queries = _complex_keys(feature_ids, np.where(invalid, 0.0, X))
+        positions = np.searchsorted(self._keys, queries.ravel(), side="left").reshape(X.shape)
+
+        pct = (positions - self.offsets[columns]) / np.maximum(counts, 1)
+        pct[invalid] = np.nan
+        return pct
+
+    def scores(self, X, columns=None):
+        # 0~100점 건전성 점수 (낮을수록 좋은 지표는 뒤집기, 결측치는 50점)
+        columns = np.arange(np.shape(np.atleast_2d(X))[1]) if columns is None else np.asarray(columns)
+        scores = self.percentiles(X, columns) * 100
+        scores = np.where(self.lower_is_better[columns], 100 - scores, scores)
+        scores = np.clip(scores, 0, 100)
+        return np.where(np.isnan(scores), NEUTRAL_SCORE, scores)
+
+
+# === 5대 리스크 신호등 ===
+LIGHT_GROUPS = ["f1", "macro", "model", "fraud", "text"]
+
+# =========================================================================
+# [핵심 수정] 섹터별 임계값(Threshold) 차별화 설정
+# =========================================================================
+# red: 이 점수를 넘으면 '위험(빨강)'
+# yellow: 이 점수를 넘으면 '주의(노랑)'
+LIGHT_THRESHOLDS = {
+    # 1. 재무비율 (현대차 등 대기업 부채 고려하여 0.3으로 넉넉하게)
+    "f1":    {"red": 0.40, "yellow": 0.10},
+
+    # 2. 거시경제 (점수 변동폭이 작으므로)
+    "macro": {"red": 0.08, "yellow": 0.03},
+
+    # 3. 부도모델 (가장 결정적이나 수치가 크게 튀므로 높게 설정)
+    "model": {"red": 3.00, "yellow": 2.00},
+
+    # 4. 부정징후 (M-score는 0.2 정도면 꽤 높은 편)
+    "fraud": {"red": 0.20, "yellow": 0.10},
+
+    # 5. 텍스트 (노이즈가 많으므로 재무 수준인 0.3 적용)
+    "text":  {"red": 0.30, "yellow": 0.10}
+}
+
+
+def light_group(name):
+    # 피처 이름 -> 신호등 그룹
+    if name.startswith('F1'): return "f1"        # 재무비율
+    if name.startswith('M_'): return "macro"     # 시장지표
+    if name.startswith('F2') or name.startswith('F3'): return "model"  # 부도모델
+    if name.startswith('F4'): return "fraud"     # 부정징후
+    return "text"                                # 텍스트 (prob/lex 및 기타)
+
+
+def traffic_lights(shap_matrix, feature_names=FEATURE_NAMES):
+    # (행 수, 피처 수) SHAP 행렬 -> {그룹: 행별 색상 리스트}
+    # 그룹별 SHAP 합계(NaN 제외)가 red/yellow 임계값을 넘는지로 색을 정합니다.
+    shap_matrix = np.atleast_2d(np.asarray(shap_matrix, dtype=float))
+    groups = np.array([light_group(name) for name in feature_names])
+
+    lights = {}
+    for group in LIGHT_GROUPS:
+        t = LIGHT_THRESHOLDS[group]
+        impact = np.nansum(shap_matrix[:, groups == group], axis=1)
+        lights[group] = np.select([impact > t["red"], impact > t["yellow"]], ["red", "yellow"], "green").tolist()
+    return lights
+
+
+# === 7대 건전성 분야 (단일 화면 / 비교 화면 / 비교 기준 테이블 공통) ===
+CATEGORIES = ['💰 수익성', '🛡️ 재무안정성', '📈 성장성', '🔎 탐지모델', '🌍 거시환경', '📝 NLP분석', '❤️ 감성분석']
+
+def get_category(name):
+    name = name.lower()
+    if any(x in name for x in ['roa', 'roe', 'interest_coverage']): return '💰 수익성'
+    if any(x in name for x in ['debt', 'current_ratio', 'retained']): return '🛡️ 재무안정성'
+    if any(x in name for x in ['equity_growth']): return '📈 성장성'
+    if any(x in name for x in ['kmv', 'z_score', 'm_score']): return '🔎 탐지모델'
+    if name.startswith('m_'): return '🌍 거시환경'
+    if 'prob' in name: return '📝 NLP분석'
+    if 'lex' in name: return '❤️ 감성분석'
+    return '기타'
+
+# 피처 x 분야 소속 행렬 (49 x 7) - 분야별 평균을 행렬 곱 한 번으로 계산
+_CATEGORY_MATRIX = np.array(
+    [[get_category(name) == cat for cat in CATEGORIES] for name in FEATURE_NAMES], dtype=float
+)
+
+def category_scores(scores):
+    # (N, 49) 백분위 점수 -> (N, 7) 분야별 평균 (유효한 점수만 평균, 하나도 없으면 50점)
+    scores = np.atleast_2d(np.asarray(scores, dtype=float))
+    valid = ~np.isnan(scores)
+    totals = np.where(valid, scores, 0.0) @ _CATEGORY_MATRIX
+    counts = valid.astype(float) @ _CATEGORY_MATRIX
+    return np.where(counts > 0, totals / np.maximum(counts, 1), NEUTRAL_SCORE)
@@ -0,0 +1,103 @@
+# screener.py
+# 전체 기업(Sheet1 유니버스) 위험 스크리너
+#  - 배치 결과 테이블(batch_scoring.py)에서 종목당 한 줄(단일 조회와 같은 첫 줄)만 골라
+#    컬럼별 numpy 배열로 보관 (스냅샷 + 모델 버전마다 한 번)
+#  - 섹터 / 5대 신호등 / 피처 백분위 점수 조건은 불리언 마스크로, 정렬은 컬럼별로 한 번 계산해 둔 순서로 처리
+#  - 조건에 맞는 전체 개수와 요청한 페이지 구간만 DataFrame 으로 만들어 돌려줌
+# 수천 개 기업이어도 조회 한 번은 수 밀리초 수준 (predict/SHAP 없음)
+import threading
+
+import numpy as np
+import pandas as pd
+
+import scoring
+import tracing
+from batch_scoring import SCORE_COLUMNS
+from features import FEATURE_NAMES
+
+LIGHT_LEVELS = {"green": 0, "yellow": 1, "red": 2}
+BASE_COLUMNS = ["stock_code", "company_name", "sector", "risk_score", "prob"]
+LIGHT_COLUMNS = [f"light_{group}" for group in scoring.LIGHT_GROUPS]
+SORT_COLUMNS = BASE_COLUMNS + LIGHT_COLUMNS + SCORE_COLUMNS
+
+
+class Screener:
+
+    def __init__(self, results, company_index):
+        positions = [company_index.first_position(code) for code in company_index.codes]
+        table = results.iloc[positions]
+
+        self.columns = {
+            "stock_code": table['stock_code'].astype(str).to_numpy(),
+            "company_name": table['company_name'].astype(str).to_numpy(),
+            "sector": table['sector'].astype(str).to_numpy(),
+            "risk_score": table['risk_score'].to_numpy(dtype=int),
+            "prob": table['prob'].to_numpy(dtype=float),
+        }
+        for col in LIGHT_COLUMNS:
+            self.columns[col] = table[col].astype(str).to_numpy()
+        # 피처 백분위 점수 (49, 종목 수) - 필터는 피처 하나씩 읽으므로 피처별로 연속 저장
+        self.scores = np.ascontiguousarray(table[SCORE_COLUMNS].to_numpy(dtype=np.float32).T)
+
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.columns["stock_code"])
+
+    def sectors(self):
+        return sorted(set(self.columns["sector"]))
+
+    def column(self, name):
+        if name in self.columns:
+            return self.columns[name]
+        return self.scores[SCORE_COLUMNS.index(name)]
+
+    def _sort_key(self, name):
+        # 신호등은 초록 < 노랑 < 빨강 순서로 정렬
+        values = self.column(name)
+        if name in LIGHT_COLUMNS:
+            return np.array([LIGHT_LEVELS.get(v, 0) for v in values])
+        return values
+
+    def order(self, name):
+        # 컬럼별 오름차순 순서 (처음 정렬할 때 한 번만 계산)
+        if name not in SORT_COLUMNS:
+            raise ValueError(f"정렬할 수 없는 컬럼: {name}")
+        with self._lock:
+            if name not in self._orders:
+                self._orders[name] = np.argsort(self._sort_key(name), kind="stable")
+            return self._orders[name]
+
+    def mask(self, sectors=None, lights=None, percentiles=None):
+        # sectors: 섹터 목록 / lights: {그룹: 허용 색 목록} / percentiles: {피처: (최소, 최대)} 백분위 점수
+        # 비어 있는 조건은 무시
+        keep = np.ones(len(self), dtype=bool)
+        if sectors:
+            keep &= np.isin(self.columns["sector"], list(sectors))
+        for group, colors in (lights or {}).items():
+            if colors:
+                keep &= np.isin(self.columns[f"light_{group}"], list(colors))
+        for name, (low, high) in (percentiles or {}).items():
+            values = self.scores[FEATURE_NAMES.index(name)]
+            keep &= (values >= low) & (values <= high)
+        return keep
+
+    def query(self, sectors=None, lights=None, percentiles=None,
+              sort_by="risk_score", ascending=False, offset=0, limit=50):
+        # -> (페이지 DataFrame, 조건에 맞는 전체 종목 수)
+        with tracing.span("screener.query", rows=len(self)) as span:
+            keep = self.mask(sectors, lights, percentiles)
+            order = self.order(sort_by)
+            if not ascending:
+                order = order[::-1]
+            selected = order[keep[order]]
+            page = selected[offset:offset + limit]
+            span.set(matched=len(selected))
+
+        extra = [f"score_{name}" for name in (percentiles or {})]
+        if sort_by in SCORE_COLUMNS and sort_by not in extra:
+            extra.append(sort_by)
+        frame = pd.DataFrame({col: self.column(col)[page] for col in BASE_COLUMNS + LIGHT_COLUMNS + extra})
+        frame.insert(0, "rank", np.arange(offset + 1, offset + len(page) + 1))
+        return frame, len(selected)
@@ -0,0 +1,246 @@
+# sheets.py
+# 구글 시트 3개(Sheet1~3)를 로컬 스냅샷으로 캐싱하는 레이어
+#  - TTL 안쪽: 로컬 스냅샷 그대로 사용 (네트워크 X)
+#  - TTL 경과 ~ MAX_STALE: 이전 스냅샷을 바로 반환하고 백그라운드에서 갱신 (stale-while-revalidate)
+#  - 오프라인 모드 / 다운로드 실패: 마지막 정상 스냅샷 사용
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+import tracing
+
+SHEET_NAMES = ("company", "industry", "stat")
+
+
+def snapshot_dir():
+    return config.cache_path("sheets")
+
+
+# config.DATA_DIR 를 쓸 때의 로컬 파일 이름
+SHEET_FILES = {"company": "sheet1.csv", "industry": "sheet2.csv", "stat": "sheet3.csv"}
+
+
+# CSV 변환 URL 생성 함수
+def get_csv_url(sheet_id, gid):
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+
+SHEET_GIDS = {
+    "company": config.GID_SHEET1,
+    "industry": config.GID_SHEET2,
+    "stat": config.GID_SHEET3,
+}
+
+
+def _sheet_source(name):
+    # 로컬 CSV 폴더가 지정되어 있으면 파일, 아니면 구글 시트 CSV 주소
+    if config.DATA_DIR:
+        return os.path.join(config.DATA_DIR, SHEET_FILES[name])
+    return get_csv_url(config.SHEET_ID, SHEET_GIDS[name])
+
+
+def _snapshot_path():
+    # 구글 시트와 로컬 CSV 폴더의 스냅샷이 서로 덮어쓰지 않도록 출처별로 파일을 나눔
+    if config.DATA_DIR:
+        source_id = hashlib.sha1(os.path.abspath(config.DATA_DIR).encode()).hexdigest()[:8]
+        return os.path.join(snapshot_dir(), f"snapshot_local_{source_id}.pkl")
+    return os.path.join(snapshot_dir(), "snapshot.pkl")
+
+
+def fetch_sheets():
+    # 시트 3개를 새로 받아옵니다. (3개를 동시에 다운로드)
+    with tracing.span("sheets.fetch", source="local" if config.DATA_DIR else "google"):
+        with ThreadPoolExecutor(max_workers=len(SHEET_GIDS), thread_name_prefix="sheet") as pool:
+            futures = {name: pool.submit(pd.read_csv, _sheet_source(name)) for name in SHEET_GIDS}
+            frames = {name: future.result() for name, future in futures.items()}
+    if tracing.enabled():
+        tracing.size("sheets.frame_bytes", sum(df.memory_usage(index=False).sum() for df in frames.values()))
+    return frames
+
+
+def _content_hash(frames):
+    # 시트 내용이 같으면 같은 ID가 나오도록 내용 기반 해시 사용
+    h = hashlib.sha1()
+    for name in SHEET_NAMES:
+        df = frames[name]
+        h.update(name.encode())
+        h.update(",".join(map(str, df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+class SheetSnapshot:
+    # 한 시점의 시트 3개 + 그 스냅샷에서 파생된 데이터(인덱스 등)를 함께 보관
+    # 프레임은 여러 요청이 공유하므로 절대 in-place로 수정하지 않습니다.
+
+    def __init__(self, frames, fetched_at, snapshot_id=None):
+        self.company = frames["company"]
+        self.industry = frames["industry"]
+        self.stat = frames["stat"]
+        self.fetched_at = fetched_at
+        self.snapshot_id = snapshot_id or _content_hash(frames)
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+        # 이름별 생성 락 - 한 이름을 만드는 동안에도 다른 이름의 조회/생성은 기다리지 않음
+        # (파생 데이터끼리 서로를 필요로 할 수 있어서(결과 테이블 -> 백분위 인덱스 -> 피처 저장소) 재진입 가능한 락)
+        self._build_locks = {}
+
+    @property
+    def frames(self):
+        return {"company": self.company, "industry": self.industry, "stat": self.stat}
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def memo(self, name, builder):
+        # 스냅샷 단위로 한 번만 계산하면 되는 값(인덱스, 결과 테이블 등)을 보관
+        # 같은 이름을 동시에 요청하면 하나만 만들고 나머지는 그 결과를 기다림
+        with self._derived_lock:
+            if name in self._derived:
+                tracing.count(f"memo.{name}.hit")
+                return self._derived[name]
+            build_lock = self._build_locks.setdefault(name, threading.RLock())
+
+        with build_lock:
+            with self._derived_lock:
+                if name in self._derived:
+                    tracing.count(f"memo.{name}.hit")
+                    return self._derived[name]
+            tracing.count(f"memo.{name}.miss")
+            with tracing.span(f"memo.{name}.build"):
+                value = builder(self)
+            with self._derived_lock:
+                self._derived[name] = value
+            return value
+
+
+# === 로컬 디스크 스냅샷 ===
+def _save_to_disk(snapshot):
+    path = _snapshot_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "frames": snapshot.frames,
+        "fetched_at": snapshot.fetched_at,
+        "snapshot_id": snapshot.snapshot_id,
+    }
+    # 쓰다가 죽어도 기존 스냅샷이 깨지지 않도록 임시 파일에 쓰고 교체
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle(payload, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _load_from_disk(newer_than=0):
+    # newer_than 보다 나중에 저장된 파일만 읽습니다 (매 요청마다 pickle을 다시 읽지 않도록)
+    path = _snapshot_path()
+    if not os.path.exists(path) or os.path.getmtime(path) <= newer_than:
+        return None
+    try:
+        payload = pd.read_pickle(path)
+        return SheetSnapshot(payload["frames"], payload["fetched_at"], payload["snapshot_id"])
+    except Exception as e:
+        print(f"⚠️ 시트 스냅샷 읽기 실패: {e}")
+        return None
+
+
+# === 메모리 스냅샷 (프로세스 단위) ===
+_current = None
+_lock = threading.Lock()
+_refreshing = threading.Event()
+
+
+def _set_current(snapshot):
+    global _current
+    # 내용이 그대로면 기존 객체(와 파생 데이터)를 유지하고 시간만 갱신
+    if _current is not None and _current.snapshot_id == snapshot.snapshot_id:
+        _current.fetched_at = snapshot.fetched_at
+        return _current
+    _current = snapshot
+    return _current
+
+
+def refresh_snapshot():
+    # 네트워크에서 새로 받아 메모리/디스크 스냅샷을 교체합니다.
+    snapshot = SheetSnapshot(fetch_sheets(), time.time())
+    with _lock:
+        snapshot = _set_current(snapshot)
+    _save_to_disk(snapshot)
+    return snapshot
+
+
+def _refresh_in_background():
+    with _lock:
+        if _refreshing.is_set():
+            return
+        _refreshing.set()
+
+    def run():
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"⚠️ 시트 백그라운드 갱신 실패: {e}")
+        finally:
+            _refreshing.clear()
+
+    threading.Thread(target=run, name="sheet-refresh", daemon=True).start()
+
+
+def _latest_known():
+    # 메모리 스냅샷과 디스크 스냅샷 중 더 최신 것 (다른 프로세스가 갱신했을 수 있음)
+    with _lock:
+        snapshot = _current
+        if snapshot is None or snapshot.age >= config.SHEET_TTL_SECONDS:
+            disk = _load_from_disk(newer_than=snapshot.fetched_at if snapshot else 0)
+            if disk is not None and (snapshot is None or disk.fetched_at > snapshot.fetched_at):
+                snapshot = _set_current(disk)
+        return snapshot
+
+
+def current_snapshot_id(offline=None):
+    # 지금 load_snapshot() 이 돌려줄 스냅샷 ID - 메모리에 신선한 스냅샷이 있을 때만 (네트워크/디스크를 읽지 않음)
+    # 모르면 None (화면 캐시 키처럼 시트를 올리기 전에 싸게 알아야 하는 경우)
+    offline = config.OFFLINE if offline is None else offline
+    with _lock:
+        snapshot = _current
+    if snapshot is None or (not offline and snapshot.age >= config.SHEET_TTL_SECONDS):
+        return None
+    return snapshot.snapshot_id
+
+
+def load_snapshot(offline=None):
+    offline = config.OFFLINE if offline is None else offline
+    snapshot = _latest_known()
+
+    # 1. 오프라인 모드: 마지막 정상 스냅샷만 사용
+    if offline:
+        if snapshot is None:
+            raise RuntimeError("오프라인 모드인데 저장된 시트 스냅샷이 없습니다.")
+        tracing.count("sheets.offline")
+        return snapshot
+
+    # 2. 신선한 스냅샷
+    if snapshot is not None and snapshot.age < config.SHEET_TTL_SECONDS:
+        tracing.count("sheets.fresh")
+        return snapshot
+
+    # 3. 조금 오래된 스냅샷: 일단 반환하고 뒤에서 갱신
+    if snapshot is not None and snapshot.age < config.SHEET_MAX_STALE_SECONDS:
+        tracing.count("sheets.stale")
+        _refresh_in_background()
+        return snapshot
+
+    # 4. 스냅샷이 없거나 너무 오래됨: 동기 갱신, 실패하면 있는 것이라도 사용
+    try:
+        tracing.count("sheets.refresh")
+        return refresh_snapshot()
+    except Exception:
+        if snapshot is not None:
+            print("⚠️ 시트 다운로드 실패 - 마지막 정상 스냅샷을 사용합니다.")
+            tracing.count("sheets.fallback")
+            return snapshot
+        raise
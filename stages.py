@@ -0,0 +1,52 @@
+# stages.py
+# 서로 독립적인 I/O 단계(시트 로드, 주가 조회, 모델 로드)를 제한된 스레드 풀에서 동시에 실행
+# 전체 시간이 단계별 시간의 합이 아니라 가장 느린 단계 시간에 가깝도록 합니다.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import tracing
+
+_executor = ThreadPoolExecutor(max_workers=config.STAGE_WORKERS, thread_name_prefix="stage")
+
+
+def _script_run_ctx():
+    # Streamlit 세션 안에서 호출됐다면 그 컨텍스트를 작업 스레드에도 넘겨줌
+    # (st.cache_resource 등이 경고 없이 동작하도록; CLI 에서는 None)
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+
+
+def _run_with_ctx(ctx, name, fn, args):
+    if ctx is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    with tracing.span(f"stage.{name}"):
+        return fn(*args)
+
+
+class StageRun:
+    # stages: {단계 이름: (함수, 인자...)} -> 모두 바로 제출하고 결과는 이름으로 꺼냄
+
+    def __init__(self, stages):
+        ctx = _script_run_ctx()
+        self.started = time.monotonic()
+        self.futures = {
+            name: _executor.submit(tracing.bind(_run_with_ctx), ctx, name, spec[0], spec[1:])
+            for name, spec in stages.items()
+        }
+
+    def result(self, name, timeout):
+        # 제한 시간은 단계 제출 시각 기준 (동시에 기다리므로 누적되지 않음)
+        # 시간 초과 시 concurrent.futures.TimeoutError, 단계 에러는 그대로 전달
+        remaining = self.started + timeout - time.monotonic()
+        return self.futures[name].result(timeout=max(remaining, 0))
+
+    def cancel(self):
+        # 아직 시작하지 않은 단계는 취소 (이미 실행 중인 스레드는 끝까지 돌고 결과만 버림)
+        for future in self.futures.values():
+            future.cancel()
@@ -0,0 +1,55 @@
+# tests/conftest.py
+# 테스트 공통 설정
+#  - 저장소 최상위 모듈(dashboard, batch_scoring, ...)을 바로 import 할 수 있도록 경로 추가
+#  - 캐시 폴더는 임시 폴더로 (하위 프로세스도 같은 폴더를 쓰도록 환경변수로 지정)
+#  - 네트워크 없이: 시트는 로컬 CSV 폴더(config.DATA_DIR), 리포트는 로컬 스텁
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["DASHBOARD_CACHE_DIR"] = tempfile.mkdtemp(prefix="dashboard-test-cache-")
+os.environ["DASHBOARD_GEMINI_STUB"] = "1"
+
+
+class SyntheticSheets:
+    # benchmark.write_synthetic_sheets 로 만든 로컬 시트 폴더
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, df_company=None, n_companies=200, seed=0):
+        # df_company 가 없으면 시트 3개를 새로 만들고, 있으면 sheet1.csv 만 바꿔 씀 -> Sheet1 프레임
+        import benchmark
+
+        if df_company is None:
+            return benchmark.write_synthetic_sheets(self.directory, n_companies, seed)
+        df_company.to_csv(os.path.join(self.directory, "sheet1.csv"), index=False)
+        return df_company
+
+    def snapshot(self):
+        # CSV 를 다시 읽어 현재 스냅샷으로 교체
+        import sheets
+
+        return sheets.refresh_snapshot()
+
+
+@pytest.fixture
+def sheets_dir(tmp_path, monkeypatch):
+    import config
+
+    directory = str(tmp_path / "sheets")
+    monkeypatch.setattr(config, "DATA_DIR", directory)
+    return SyntheticSheets(directory)
+
+
+@pytest.fixture(scope="session")
+def model():
+    # 저장소에 있는 활성 모델 (model_registry.LoadedModel)
+    import dashboard
+
+    return dashboard.get_model()
@@ -0,0 +1,211 @@
+# tests/test_api_server.py
+# JSON 스코어링 API (api_server.py) - 합성 시트로 빈 포트에 ThreadingHTTPServer 를 띄워서
+#  - 경로별 응답 (health / 단일 종목 / 여러 종목 GET·POST / 리포트 / metrics)
+#  - ETag: 같은 요청에 If-None-Match 를 보내면 304, 모델이 다르면 다른 ETag
+#  - 여러 종목 최대 개수 (config.API_MAX_BATCH)
+#  - 오류는 상태 코드 + {"error": ...} JSON
+#  - CLI 설정(_configure)은 모듈이 이미 import 된 뒤에도 적용됨
+import http.client
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import api_server
+import config
+import dashboard
+import model_registry
+import sheets
+
+
+@pytest.fixture
+def api(sheets_dir, model):
+    sheets_dir.write(n_companies=60)
+    snapshot = sheets_dir.snapshot()
+    service = api_server.ScoringService(reports=True)
+    server = api_server.make_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield Client(server.server_address[1]), snapshot
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class Client:
+
+    def __init__(self, port):
+        self.port = port
+
+    def request(self, method, path, body=None, headers=None):
+        # -> (상태 코드, 응답 헤더, JSON 본문 또는 None)
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body)
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            raw = response.read()
+            return response.status, response.headers, json.loads(raw) if raw else None
+        finally:
+            conn.close()
+
+    def get(self, path, **headers):
+        return self.request("GET", path, headers=headers)
+
+    def metrics(self, route, count):
+        # 지연 시간은 응답을 보낸 뒤 기록되므로 route 의 요청 수가 count 가 될 때까지 잠깐 기다림
+        deadline = time.monotonic() + 5
+        while True:
+            metrics = self.get("/metrics")[2]
+            if metrics["routes"].get(route, {}).get("count") == count or time.monotonic() > deadline:
+                return metrics
+            time.sleep(0.01)
+
+
+def test_health_and_metrics(api, model):
+    client, snapshot = api
+    status, _, body = client.get("/health")
+    assert status == 200
+    assert (body["status"], body["snapshot_id"], body["model_version"]) == ("ok", snapshot.snapshot_id, model.version)
+    assert body["models"] == dashboard.models.names()
+
+    client.get("/v1/score/000101")
+    metrics = client.metrics("score", 1)
+    assert metrics["routes"]["health"]["count"] == 1
+    assert metrics["routes"]["score"]["count"] == 1
+    assert metrics["counts"]["score.200"] == 1
+
+
+def test_score_matches_dashboard(api, model):
+    client, snapshot = api
+    status, headers, body = client.get("/v1/score/101")
+    assert status == 200
+    assert headers["Content-Type"].startswith("application/json")
+
+    expected = dashboard.build_company_result(snapshot, model, "000101")
+    assert body["snapshot_id"] == snapshot.snapshot_id
+    assert (body["ticker"], body["risk_score"], body["model_version"]) == ("000101", expected["risk_score"],
+                                                                            model.version)
+    assert body["indicators"] == expected["indicators"]
+    assert [item["name"] for item in body["shap_data"]] == [item["name"] for item in expected["shap_data"]]
+    assert body["price"] is None
+
+
+def test_etag_not_modified(api):
+    client, _ = api
+    status, headers, first = client.get("/v1/score/000101")
+    etag = headers["ETag"]
+    assert status == 200 and etag
+
+    # 같은 ETag -> 본문 없이 304, 여러 ETag 중 하나만 맞아도 304
+    status, headers, body = client.get("/v1/score/000101", **{"If-None-Match": etag})
+    assert (status, headers["ETag"], body) == (304, etag, None)
+    status, _, _ = client.get("/v1/score/000101", **{"If-None-Match": f'"other", {etag}'})
+    assert status == 304
+
+    # 다른 ETag 면 다시 200 (본문은 메모리 캐시에서)
+    status, _, again = client.get("/v1/score/000101", **{"If-None-Match": '"stale"'})
+    assert (status, again) == (200, first)
+    assert client.metrics("score", 4)["counts"]["cache.hit"] == 1
+
+
+def test_etag_changes_with_model(api):
+    client, _ = api
+    first, second = dashboard.models.names()[:2]
+    _, headers_a, body_a = client.get(f"/v1/score/000101?model={first}")
+    _, headers_b, body_b = client.get(f"/v1/score/000101?model={second}")
+    assert headers_a["ETag"] != headers_b["ETag"]
+    assert body_a["model_version"] == dashboard.models.version(first)
+    assert body_b["model_version"] == dashboard.models.version(second)
+
+    # 다른 모델의 ETag 로는 304 가 나오지 않음
+    status, _, _ = client.get(f"/v1/score/000101?model={second}", **{"If-None-Match": headers_a["ETag"]})
+    assert status == 200
+
+
+def test_batch_get_and_post(api, model):
+    client, snapshot = api
+    status, headers, by_get = client.get("/v1/score?tickers=000101,102,999999,000101")
+    assert status == 200 and headers["ETag"]
+    status, _, by_post = client.request("POST", "/v1/score", {"tickers": ["000101", "102", "999999"]})
+    assert status == 200
+    assert by_get == by_post
+
+    results = dashboard.get_results(snapshot, model)
+    assert [item["ticker"] for item in by_get["results"]] == ["000101", "000102"]
+    assert by_get["missing"] == ["999999"]
+    for item in by_get["results"]:
+        row = results.get(item["ticker"])
+        assert item["risk_score"] == int(row["risk_score"])
+        assert item["lights"] == results.lights(row)
+        assert "shap" not in item
+
+    _, _, detailed = client.request("POST", "/v1/score", {"tickers": ["000101"], "details": True})
+    assert len(detailed["results"][0]["shap"]) == len(detailed["results"][0]["scores"]) == 49
+
+
+def test_batch_size_limit(api, monkeypatch):
+    client, _ = api
+    monkeypatch.setattr(config, "API_MAX_BATCH", 3)
+    tickers = ["000101", "000102", "000103", "000104"]
+
+    status, _, body = client.request("POST", "/v1/score", {"tickers": tickers})
+    assert status == 400 and "최대 3개" in body["error"]
+    status, _, body = client.get("/v1/score?tickers=" + ",".join(tickers))
+    assert status == 400 and "최대 3개" in body["error"]
+
+    # 중복을 뺀 개수로 판단
+    status, _, body = client.request("POST", "/v1/score", {"tickers": tickers[:3] + ["101"]})
+    assert status == 200 and body["count"] == 3
+
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("GET", "/v1/score/999999", None, 404),
+    ("GET", "/v1/score/000101?model=model_missing", None, 400),
+    ("GET", "/v2/score/000101", None, 404),
+    ("DELETE", "/v1/score/000101", None, 501),
+    ("GET", "/v1/score", None, 400),
+    ("POST", "/v1/score", "{not json", 400),
+    ("POST", "/v1/score", [1, 2], 400),
+    ("POST", "/v1/score", {"tickers": "000101"}, 400),
+    ("POST", "/v1/score", {"tickers": [" ", ""]}, 400),
+])
+def test_errors_are_json(api, method, path, body, status):
+    client, _ = api
+    got, headers, payload = client.request(method, path, body)
+    assert got == status
+    # http.server 가 직접 응답하는 지원하지 않는 메서드(501)도 같은 JSON 형식
+    assert headers["Content-Type"].startswith("application/json")
+    assert isinstance(payload["error"], str) and payload["error"]
+
+
+def test_report_uses_stub(api, model):
+    client, snapshot = api
+    status, _, body = client.get("/v1/report/000101")
+    assert status == 200
+    assert (body["ticker"], body["snapshot_id"], body["model_version"]) == ("000101", snapshot.snapshot_id,
+                                                                             model.version)
+    assert isinstance(body["report"], str) and body["report"]
+
+
+def test_configure_after_import(monkeypatch, tmp_path):
+    registry = model_registry.get_registry()
+    monkeypatch.setattr(registry, "_active", registry.active)
+    monkeypatch.setattr(config, "CACHE_DIR", config.CACHE_DIR)
+    monkeypatch.setattr(config, "DATA_DIR", config.DATA_DIR)
+    monkeypatch.setenv("DASHBOARD_CACHE_DIR", config.CACHE_DIR)
+    other = next(name for name in registry.names() if name != registry.active)
+
+    api_server._configure(str(tmp_path / "data"), str(tmp_path / "cache"), other)
+    assert sheets.snapshot_dir() == os.path.join(str(tmp_path / "cache"), "sheets")
+    assert os.environ["DASHBOARD_CACHE_DIR"] == str(tmp_path / "cache")
+    assert dashboard.models.active == other
+    assert dashboard.get_model().name == other
+
+    with pytest.raises(ValueError):
+        api_server._configure(None, None, "model_missing")
@@ -0,0 +1,76 @@
+# tests/test_batch_scoring.py
+# 배치 결과 테이블의 백분위 점수가 기존 행 단위 calculate_score 와 같은지 확인
+# (특히 Sheet1 에 없는 피처 - 기존 대시보드는 0으로 채운 뒤 점수를 계산했으므로 0 또는 100점이어야 함)
+import numpy as np
+import pandas as pd
+
+import batch_scoring
+import benchmark
+import dashboard
+import scoring
+from features import FEATURE_NAMES, LOWER_IS_BETTER
+
+MISSING = "lex_covered_tf"
+
+
+def legacy_scores(df_company, row):
+    # 기존 load_data_and_model: 누락 컬럼을 0으로 채운 프레임에서 피처마다 calculate_score
+    df_company = df_company.copy()
+    for col in FEATURE_NAMES:
+        if col not in df_company.columns:
+            df_company[col] = 0.0
+    company_row = df_company.loc[row]
+    return np.array([
+        benchmark.legacy_calculate_score(df_company, company_row[name], name) for name in FEATURE_NAMES
+    ], dtype=float)
+
+
+def assert_matches_legacy(snapshot, model, rows):
+    results = dashboard.get_results(snapshot, model)
+    for row in rows:
+        code = results.company_index.codes[row]
+        expected = legacy_scores(snapshot.company, row)
+        np.testing.assert_allclose(results.scores(results.get(code)), expected, atol=1e-9, err_msg=code)
+
+
+def test_missing_feature_scores_match_legacy(sheets_dir, model):
+    df = sheets_dir.write(n_companies=150, seed=3).drop(columns=[MISSING])
+    sheets_dir.write(df)
+    snapshot = sheets_dir.snapshot()
+
+    assert_matches_legacy(snapshot, model, range(0, 150, 7))
+
+    # 누락 피처는 모든 기업이 0 -> 중립 50점이 아니라 0점 (낮을수록 좋은 피처면 100점)
+    j = FEATURE_NAMES.index(MISSING)
+    scores = dashboard.get_results(snapshot, model).results[batch_scoring.SCORE_COLUMNS[j]]
+    expected = 100.0 if MISSING in LOWER_IS_BETTER else 0.0
+    assert (scores == expected).all()
+
+    # 화면에 보이는 값(val)과 점수가 같은 기준 (0.0 / 0점)
+    code = dashboard.get_company_index(snapshot).codes[0]
+    result = dashboard.build_company_result(snapshot, model, code)
+    item = next(item for item in result["shap_data"] if item["name"] == MISSING)
+    assert item["val"] == "0.0"
+    assert item["score"] == expected
+
+
+def test_incremental_update_matches_legacy(sheets_dir, model):
+    df = sheets_dir.write(n_companies=150, seed=4).drop(columns=[MISSING])
+    sheets_dir.write(df)
+    dashboard.get_results(sheets_dir.snapshot(), model)
+
+    # 몇 줄만 바꾼 시트 -> 결과 테이블은 이전 스냅샷 결과에서 바뀐 행/피처만 다시 계산
+    df.loc[[2, 40], "F1_Debt_Ratio"] = [9.5, -9.5]
+    sheets_dir.write(df)
+    snapshot = sheets_dir.snapshot()
+
+    assert_matches_legacy(snapshot, model, [0, 2, 40, 77, 149])
+
+
+def test_score_frame_fills_missing_features(sheets_dir, model):
+    df = sheets_dir.write(n_companies=80, seed=5).drop(columns=[MISSING])
+    index = scoring.PercentileIndex(df)
+    _, _, scores, _ = batch_scoring.score_frame(df.head(10), model.model, model.explainer(), index)
+    legacy = np.array([legacy_scores(df, row) for row in range(10)])
+    np.testing.assert_allclose(scores, legacy, atol=1e-9)
+    assert not pd.isna(scores).any()
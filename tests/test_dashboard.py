@@ -0,0 +1,56 @@
+# tests/test_dashboard.py
+# 대시보드 한 종목 파이프라인 (dashboard.py)
+#  - load_data_and_model / load_history: 시트/모델 로드 실패(LOAD_FAILED)와 없는 종목(None)을 구분
+#    (화면은 "종목 없음" 안내를 없는 종목에만 표시)
+import pytest
+
+import dashboard
+import sheets
+
+
+@pytest.fixture
+def errors(sheets_dir, monkeypatch):
+    # _show_error 로 표시한 메시지 (Streamlit 없이)
+    sheets_dir.write(n_companies=30)
+    sheets_dir.snapshot()
+    shown = []
+    monkeypatch.setattr(dashboard, "_show_error", shown.append)
+    return shown
+
+
+def fail_snapshot():
+    raise OSError("네트워크 없음")
+
+
+def test_company_result(errors, model):
+    data = dashboard.load_data_and_model("000101", model.name)
+    assert (data["ticker"], data["model_version"]) == ("000101", model.version)
+    assert errors == []
+
+
+def test_unknown_ticker_is_none(errors, model):
+    assert dashboard.load_data_and_model("999999", model.name) is None
+    assert errors == []
+
+
+def test_snapshot_failure_is_load_failed(errors, model, monkeypatch):
+    monkeypatch.setattr(sheets, "load_snapshot", fail_snapshot)
+    assert dashboard.load_data_and_model("000101", model.name) is dashboard.LOAD_FAILED
+    assert len(errors) == 1 and "구글 시트" in errors[0]
+
+
+def test_model_failure_is_load_failed(errors):
+    assert dashboard.load_data_and_model("000101", "model_missing") is dashboard.LOAD_FAILED
+    assert len(errors) == 1 and "모델" in errors[0]
+
+
+def test_history_distinguishes_load_failure(errors, model, monkeypatch):
+    history = dashboard.load_history("101", model.name)
+    assert history["ticker"] == "000101" and len(history["periods"]) >= 1
+    assert dashboard.load_history("999999", model.name) is None
+    assert errors == []
+
+    assert dashboard.load_history("000101", "model_missing") is dashboard.LOAD_FAILED
+    monkeypatch.setattr(sheets, "load_snapshot", fail_snapshot)
+    assert dashboard.load_history("000101", model.name) is dashboard.LOAD_FAILED
+    assert len(errors) == 2
@@ -0,0 +1,34 @@
+# tests/test_explain.py
+# native(pred_contribs) explainer 가 shap.TreeExplainer 와 같은 SHAP 값을 내는지 확인
+# (저장소에 있는 모든 모델, 결측치/0 채움이 섞인 합성 시트 행)
+import numpy as np
+import pytest
+
+import batch_scoring
+import benchmark
+import dashboard
+import explain
+
+N_ROWS = 60
+
+
+@pytest.fixture(scope="module")
+def inputs(tmp_path_factory):
+    df = benchmark.write_synthetic_sheets(str(tmp_path_factory.mktemp("sheets")), N_ROWS, seed=11)
+    return batch_scoring.model_inputs(df)
+
+
+@pytest.mark.parametrize("name", dashboard.models.names())
+def test_native_matches_shap(name, inputs):
+    model = dashboard.models.get(name).model
+    max_diff, ok = explain.check_parity(model, inputs)
+    assert ok, f"{name}: native / shap SHAP 값 최대 오차 {max_diff:.2e}"
+
+
+@pytest.mark.parametrize("name", dashboard.models.names())
+def test_contributions_sum_to_margin(name, inputs):
+    # 행 합계(SHAP + bias) = 모델 마진 출력 -> 시그모이드 = predict_proba (whatif.py 빠른 경로의 전제)
+    model = dashboard.models.get(name).model
+    contribs = explain.make_explainer(model, "native").contributions(inputs)
+    probs = 1 / (1 + np.exp(-contribs.sum(axis=1, dtype=float)))
+    np.testing.assert_allclose(probs, model.predict_proba(inputs)[:, 1], atol=1e-5)
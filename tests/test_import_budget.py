@@ -0,0 +1,17 @@
+# tests/test_import_budget.py
+# 시작(import) 시간 예산 - 새 프로세스에서 모듈을 import 해서
+#  - 예산(benchmark.DEFAULT_IMPORT_BUDGET_MS)을 넘거나
+#  - 무거운 라이브러리(streamlit, xgboost, shap, ...)가 import 시점에 함께 불러와지면 실패
+# (측정 방법은 benchmark.py --imports-only 와 같음)
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize("module", benchmark.IMPORT_TARGETS)
+def test_import_time_budget(module):
+    ms, eager = benchmark.measure_import(module, repeat=3)
+    assert not eager, f"{module}: import 시점에 불러옴 - {', '.join(eager)}"
+    assert ms <= benchmark.DEFAULT_IMPORT_BUDGET_MS, (
+        f"{module}: {ms:.0f} ms > 예산 {benchmark.DEFAULT_IMPORT_BUDGET_MS:.0f} ms"
+    )
@@ -0,0 +1,63 @@
+# tests/test_model_registry.py
+# 모델 레지스트리 (model_registry.py)
+#  - 처음 로드는 pickle -> XGBoost 바이너리 변환, 다음 로드(새 프로세스)는 바이너리에서 바로 - 예측은 같음
+#  - set_active 로 활성 모델을 바꾸면 version() 과 화면 캐시 키(view_key)도 바뀜
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import dashboard
+import model_registry
+import tracing
+from features import FEATURE_NAMES
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(size=(64, len(FEATURE_NAMES))).astype(np.float32), columns=FEATURE_NAMES)
+
+
+def test_reload_uses_native_binary(monkeypatch, tmp_path, features):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+    name = model_registry.ModelRegistry().active
+
+    trace = tracing.Trace("model-load")
+    with tracing.activate(trace):
+        converted = model_registry.ModelRegistry().get(name)
+        first = model_registry.ModelRegistry().get(name)
+        second = model_registry.ModelRegistry().get(name)
+    assert converted.source == "convert"
+    assert (first.source, second.source) == ("native", "native")
+    assert first.version == second.version == converted.version
+    assert trace.counters == {"model.convert": 1, "model.native_hit": 2}
+
+    expected = converted.model.predict_proba(features)
+    np.testing.assert_array_equal(first.model.predict_proba(features), expected)
+    np.testing.assert_array_equal(second.model.predict_proba(features), expected)
+
+
+def test_set_active_changes_version_and_view_key(sheets_dir, monkeypatch):
+    sheets_dir.write(n_companies=30)
+    snapshot = sheets_dir.snapshot()
+    registry = model_registry.ModelRegistry()
+    monkeypatch.setattr(dashboard, "models", registry)
+    before = registry.active
+    other = next(name for name in registry.names() if name != before)
+    key = dashboard.view_key("000100")
+    assert key == ("000100", snapshot.snapshot_id, registry.version(before))
+
+    trace = tracing.Trace("set-active")
+    with tracing.activate(trace):
+        registry.set_active(other)
+    assert trace.counters["model.set_active"] == 1
+    assert registry.active == other
+    assert registry.version() == registry.version(other) != registry.version(before)
+    assert dashboard.view_key("000100") == ("000100", snapshot.snapshot_id, registry.version(other))
+    assert dashboard.get_model().name == other
+
+    # 없는 모델은 거절하고 활성 모델은 그대로
+    with pytest.raises(ValueError):
+        registry.set_active("model_missing")
+    assert registry.active == other
@@ -0,0 +1,102 @@
+# tests/test_prices.py
+# 현재 주가 조회 (prices.py) - pykrx 대신 가짜 모듈
+#  - 새로 조회 -> TTL 안쪽은 캐시, 시간 초과면 마지막으로 알던 가격(오래된 가격 표시), 모르는 종목
+#  - 메모리 캐시는 종목마다 하나만 (날짜가 바뀌어도 늘어나지 않음)
+import sys
+import time
+import types
+
+import pandas as pd
+import pytest
+
+import config
+import prices
+
+
+class FakeKrx:
+    # pykrx.stock.get_market_ohlcv 흉내 - 종목별 종가, delay 초 뒤 응답
+
+    def __init__(self, closes):
+        self.closes = closes
+        self.delay = 0.0
+        self.calls = 0
+
+    def get_market_ohlcv(self, start, end=None, code=None, market=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if code not in self.closes:
+            return pd.DataFrame({"종가": []}, index=pd.DatetimeIndex([]))
+        return pd.DataFrame({"종가": [self.closes[code] - 100, self.closes[code]]},
+                            index=pd.to_datetime(["2026-10-15", "2026-10-16"]))
+
+
+@pytest.fixture
+def krx(monkeypatch, tmp_path):
+    fake = FakeKrx({"005930": 70000.0})
+    monkeypatch.setitem(sys.modules, "pykrx", types.SimpleNamespace(stock=fake))
+    monkeypatch.setattr(prices, "_quotes", {})
+    monkeypatch.setattr(prices, "_closes", {})
+    monkeypatch.setattr(prices, "price_dir", lambda: str(tmp_path / "prices"))
+    monkeypatch.setattr(config, "PRICE_TTL_SECONDS", 300)
+    return fake
+
+
+def wait_remembered(code):
+    # 조회 결과는 Future 완료 콜백에서 캐시에 들어감
+    deadline = time.monotonic() + 5
+    while code not in prices._quotes and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_then_cached(krx):
+    quote = prices.get_price("005930", timeout=2)
+    assert (quote["price"], quote["as_of"], quote["stale"], quote["source"]) == (70000.0, "20261016", False, "krx")
+    wait_remembered("005930")
+
+    assert prices.get_price("005930", timeout=2)["source"] == "cache"
+    assert krx.calls == 1
+
+
+def test_timeout_falls_back_to_stale(krx, monkeypatch):
+    prices.get_price("005930", timeout=2)
+    wait_remembered("005930")
+
+    # TTL 이 지났고 KRX 가 느림 -> 기다리지 않고 마지막으로 알던 가격
+    monkeypatch.setattr(config, "PRICE_TTL_SECONDS", 0)
+    krx.delay = 1.0
+    started = time.monotonic()
+    quote = prices.get_price("005930", timeout=0.1)
+    assert time.monotonic() - started < 0.8
+    assert (quote["price"], quote["stale"], quote["source"]) == (70000.0, True, "stale")
+
+
+def test_unknown_code(krx):
+    quote = prices.get_price("999999", timeout=2)
+    assert quote == prices.unknown_quote()
+
+
+def test_quote_cache_keeps_one_entry_per_code(krx, monkeypatch):
+    for day in ("20261014", "20261015", "20261016"):
+        monkeypatch.setattr(prices, "_today", lambda day=day: day)
+        prices.get_price("005930", timeout=2)
+        deadline = time.monotonic() + 5
+        while prices._quotes.get("005930", {}).get("day") != day and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert list(prices._quotes) == ["005930"]
+    assert prices._quotes["005930"]["day"] == "20261016"
+    # 날짜가 바뀌면 TTL 안쪽이어도 다시 조회
+    assert krx.calls == 3
+
+
+def test_bulk_closes_keep_latest_day(krx, monkeypatch):
+    krx.closes = {}
+
+    def market_ohlcv(date, market=None):
+        return pd.DataFrame({"종가": [70000.0]}, index=["005930"])
+
+    monkeypatch.setattr(krx, "get_market_ohlcv", market_ohlcv)
+    for day in ("20261015", "20261016"):
+        monkeypatch.setattr(prices, "_today", lambda day=day: day)
+        prices.load_market_closes()
+    assert list(prices._closes) == ["20261016"]
+    assert prices.get_price("005930")["source"] == "bulk"
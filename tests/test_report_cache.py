@@ -0,0 +1,131 @@
+# tests/test_report_cache.py
+# AI 리포트 캐시 (report_cache.py + dashboard 리포트 함수) - Gemini 대신 dashboard.stub_generate 사용
+#  - 캐시 히트/미스, 디스크 캐시 재사용, 같은 키 요청 합치기
+#  - 메모리 개수 제한 / 디스크 용량 제한 (오래 안 쓴 것부터 삭제)
+#  - 스트리밍 생성 청크 기록 -> 다음 요청에서 그대로 재생, 시간 초과 시 요약으로 대체 (캐시하지 않음)
+import os
+import threading
+import time
+
+import pytest
+
+import dashboard
+import report_cache
+
+SHAP_DATA = [
+    {"name": "F1_Debt_Ratio", "desc": "부채비율", "shap": 0.8, "val": "210.5"},
+    {"name": "F4_M_Score", "desc": "M-Score", "shap": 0.3, "val": "-1.2"},
+    {"name": "M_Inflation", "desc": "물가상승률", "shap": -0.4, "val": "2.1"},
+]
+
+
+def summary(risk_score=70):
+    return {"ticker": "000100", "company_name": "기업000000", "risk_score": risk_score}
+
+
+class Counting:
+    # stub_generate(_stream) 을 감싸 호출 횟수를 셈 (캐시 키 모델 이름은 함수 이름)
+
+    def __init__(self, fn, delay=0.0):
+        self.fn = fn
+        self.delay = delay
+        self.calls = 0
+        self.__name__ = f"counting_{fn.__name__}"
+
+    def __call__(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.fn(prompt)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = report_cache.ReportCache(str(tmp_path / "reports"), max_entries=8, max_bytes=1024 * 1024)
+    monkeypatch.setattr(dashboard, "_report_cache", cache)
+    return cache
+
+
+def test_cache_hit_and_miss(cache):
+    generate = Counting(dashboard.stub_generate)
+    first = dashboard.get_gemini_rag_analysis(summary(), SHAP_DATA, generate)
+    assert first.startswith("[로컬 스텁 리포트]")
+    assert dashboard.get_gemini_rag_analysis(summary(), SHAP_DATA, generate) == first
+    assert generate.calls == 1
+
+    # 프롬프트 입력(위험 점수)이 바뀌면 미스
+    dashboard.get_gemini_rag_analysis(summary(risk_score=71), SHAP_DATA, generate)
+    assert generate.calls == 2
+
+    # 새 프로세스(메모리 캐시 없음)도 디스크 캐시에서 바로 읽음
+    reopened = report_cache.ReportCache(cache.directory)
+    key, _ = dashboard._report_job(summary(), SHAP_DATA, generate)
+    assert reopened.get(key) == first
+
+
+def test_background_requests_are_coalesced(cache):
+    generate = Counting(dashboard.stub_generate, delay=0.2)
+    futures = [dashboard.request_gemini_rag_analysis(summary(), SHAP_DATA, generate) for _ in range(5)]
+    texts = {dashboard.wait_gemini_rag_analysis(f, timeout=5) for f in futures}
+    assert generate.calls == 1
+    assert texts == {dashboard.stub_generate(dashboard.build_report_prompt(summary(), SHAP_DATA))}
+    # 끝난 뒤 요청은 캐시에서 완료된 Future
+    assert dashboard.request_gemini_rag_analysis(summary(), SHAP_DATA, generate).done()
+
+
+def test_memory_entry_cap(tmp_path):
+    cache = report_cache.ReportCache(str(tmp_path), max_entries=2, max_bytes=1024 * 1024)
+    for key in ("a", "b", "c"):
+        cache.put(key, f"report {key}")
+    assert list(cache._memory) == ["b", "c"]
+    # 메모리에서 밀려난 키도 디스크에 있으면 히트 (다시 메모리로)
+    assert cache.get("a") == "report a"
+    assert list(cache._memory) == ["c", "a"]
+
+
+def test_disk_size_cap_evicts_least_recently_used(tmp_path):
+    text = "x" * 400
+    cache = report_cache.ReportCache(str(tmp_path), max_entries=8, max_bytes=1000)
+    now = time.time()
+    for i, key in enumerate(("a", "b")):
+        cache.put(key, text)
+        os.utime(cache._path(key), (now - 100 + i, now - 100 + i))
+    # a 를 읽으면 최근 사용 시각이 갱신되어 b 가 가장 오래 안 쓴 파일이 됨
+    assert report_cache.ReportCache(str(tmp_path)).get("a") == text
+    cache.put("c", text)
+
+    remaining = sorted(name[:-len(".json")] for name in os.listdir(tmp_path))
+    assert remaining == ["a", "c"]
+    assert sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path)) <= 1000
+
+
+def test_stream_records_and_replays_chunks(cache):
+    generate_stream = Counting(dashboard.stub_generate_stream)
+    prompt = dashboard.build_report_prompt(summary(), SHAP_DATA)
+    expected = dashboard.stub_generate(prompt).splitlines(keepends=True)
+
+    first = list(dashboard.stream_gemini_rag_analysis(summary(), SHAP_DATA, generate_stream, timeout=5))
+    assert first == expected
+
+    # 두 번째는 생성 없이 기록된 청크를 그대로 재생
+    second = list(dashboard.stream_gemini_rag_analysis(summary(), SHAP_DATA, generate_stream, timeout=5))
+    assert second == expected
+    assert generate_stream.calls == 1
+    key = report_cache.make_key(generate_stream.__name__, prompt)
+    assert cache.get_chunks(key) == expected
+
+
+def test_stream_timeout_falls_back_without_caching(cache):
+    release = threading.Event()
+
+    def slow_stream(prompt):
+        release.wait(5)
+        yield from dashboard.stub_generate_stream(prompt)
+
+    chunks = list(dashboard.stream_gemini_rag_analysis(summary(), SHAP_DATA, slow_stream, timeout=0.2))
+    release.set()
+    text = "".join(chunks)
+    assert "요약으로 대체" in text
+    assert "주요 위험 요인" in text
+
+    key = report_cache.make_key("slow_stream", dashboard.build_report_prompt(summary(), SHAP_DATA))
+    assert cache.get(key) is None
@@ -0,0 +1,147 @@
+# tests/test_report_queue.py
+# 리포트 일괄 생성 큐 (report_queue.py) - 로컬 스텁 모델 서버를 상대로
+#  - 토큰 버킷: 요청 시작 시각이 burst + rate * 구간 길이를 넘지 않음
+#  - 같은 프롬프트 / 같은 종목은 한 번만 생성, 다시 실행하면 캐시에서
+#  - 429 는 재시도해서 성공, 재시도를 다 쓰면 실패로 보고 (캐시하지 않음)
+#  - 워커 수가 서버 동시 요청 한도를 넘지 않음
+#  - CLI 의 --cache-dir 는 모듈이 이미 import 된 뒤에도 적용됨
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import config
+import report_cache
+import report_queue
+import sheets
+
+
+def recording(generate, started):
+    # async 생성 함수 - 토큰 버킷을 통과한 시각을 기록하고 실제 요청은 스레드에서
+    # (스레드 풀 대기 시간이 섞이지 않도록 이벤트 루프에서 바로 기록)
+    async def record(prompt):
+        started.append(time.monotonic())
+        return await asyncio.to_thread(generate, prompt)
+    return record
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("latency", 0.01)
+        servers.append(report_queue.StubModelServer(**kwargs).start())
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return report_cache.ReportCache(str(tmp_path / "reports"))
+
+
+def prompts(n, prefix="종목"):
+    return {f"{i:06d}": f"{prefix} {i}\n- 위험 요인 {i}" for i in range(n)}
+
+
+def test_token_bucket_pacing(stub, cache):
+    server = stub()
+    started = []
+    generate = recording(report_queue.http_generate(server.url), started)
+    rate, burst, n = 20.0, 2, 16
+    runner = report_queue.BulkReportRunner(generate, "stub-server", cache, concurrency=8, rate=rate, burst=burst,
+                                           retries=0, backoff=0.01)
+    results = runner.run(prompts(n))
+
+    assert all(r["status"] == "generated" for r in results.values())
+    assert server.stats["calls"] == n
+    starts = sorted(started)
+    # 어느 구간이든 burst + rate * 길이 를 넘지 않음 (타이머 오차만큼 여유)
+    for i, t0 in enumerate(starts):
+        for j in range(i, len(starts)):
+            assert j - i + 1 <= burst + rate * (starts[j] - t0 + 0.01)
+    assert starts[-1] - starts[0] >= (n - burst) / rate * 0.9
+    assert runner.summary()["throughput_per_s"] <= rate * 1.2
+
+
+def test_duplicates_are_collapsed_and_cached(stub, cache):
+    server = stub()
+    generate = report_queue.http_generate(server.url)
+    jobs = prompts(6)
+    jobs["dup-a"] = jobs["000001"]
+    jobs["dup-b"] = jobs["000002"]
+
+    runner = report_queue.BulkReportRunner(generate, "stub-server", cache, concurrency=4, rate=0, retries=0)
+    results = runner.run(jobs)
+    assert server.stats["calls"] == 6
+    assert results["dup-a"]["key"] == results["000001"]["key"]
+    assert results["dup-a"]["report"] == results["000001"]["report"]
+    summary = runner.summary()
+    assert (summary["requested"], summary["unique"], summary["deduplicated"], summary["generated"]) == (8, 6, 2, 6)
+
+    # 다시 실행하면 전부 캐시 (서버 호출 없음)
+    again = report_queue.BulkReportRunner(generate, "stub-server", cache, concurrency=4, rate=0, retries=0)
+    assert all(r["status"] == "cached" for r in again.run(jobs).values())
+    assert server.stats["calls"] == 6
+
+
+def test_rate_limited_jobs_are_retried(stub, cache):
+    server = stub(failure_rate=0.3, retry_after=0.01, seed=1)
+    runner = report_queue.BulkReportRunner(report_queue.http_generate(server.url), "stub-server", cache,
+                                           concurrency=4, rate=0, retries=8, backoff=0.005)
+    results = runner.run(prompts(30))
+
+    summary = runner.summary()
+    assert summary["failed"] == 0 and summary["generated"] == 30
+    assert summary["retries"] == server.stats["rejected"] > 0
+    assert summary["rate_limited"] == summary["retries"]
+    assert sum(r["attempts"] for r in results.values()) == server.stats["calls"]
+    assert any(r["attempts"] > 1 for r in results.values())
+
+
+def test_exhausted_retries_are_reported_and_not_cached(stub, cache):
+    server = stub(failure_rate=1.0, retry_after=0.01)
+    runner = report_queue.BulkReportRunner(report_queue.http_generate(server.url), "stub-server", cache,
+                                           concurrency=2, rate=0, retries=2, backoff=0.005)
+    results = runner.run(prompts(3))
+
+    assert all(r["status"] == "failed" and r["attempts"] == 3 and "429" in r["error"] for r in results.values())
+    assert runner.summary()["failed"] == 3
+    assert server.stats["calls"] == 9
+    assert all(cache.get(r["key"]) is None for r in results.values())
+
+
+def test_concurrency_stays_within_server_limit(stub, cache):
+    server = stub(latency=0.05, max_concurrent=3)
+    runner = report_queue.BulkReportRunner(report_queue.http_generate(server.url), "stub-server", cache,
+                                           concurrency=3, rate=0, retries=0)
+    runner.run(prompts(12))
+    assert server.stats["rejected"] == 0
+    assert server.stats["peak_concurrent"] <= 3
+
+
+def test_cli_with_duplicate_tickers(sheets_dir, stub, tmp_path, monkeypatch):
+    sheets_dir.write(n_companies=40)
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(config, "CACHE_DIR", config.CACHE_DIR)
+    monkeypatch.setenv("DASHBOARD_CACHE_DIR", config.CACHE_DIR)
+    cache_dir = str(tmp_path / "cli-cache")
+    server = stub()
+    output = tmp_path / "reports.jsonl"
+    code = report_queue.main(["100", "000100", "101", "--output", str(output), "--stub-url", server.url,
+                              "--rate", "0", "--retries", "0", "--cache-dir", cache_dir])
+
+    assert code == 0
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [line["ticker"] for line in lines] == ["000100", "000101"]
+    assert all(line["status"] == "generated" and line["report"] for line in lines)
+    assert server.stats["calls"] == 2
+    # 리포트와 시트 스냅샷이 지정한 캐시 폴더 아래
+    assert len(os.listdir(os.path.join(cache_dir, "reports"))) == 2
+    assert os.listdir(os.path.join(cache_dir, "sheets"))
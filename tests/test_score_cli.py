@@ -0,0 +1,36 @@
+# tests/test_score_cli.py
+# 배치 스코어링 CLI (score_cli.py)
+#  - --cache-dir 는 다른 모듈이 이미 import 된 뒤에도 적용됨 (스냅샷/피처 저장소/결과가 그 폴더 아래)
+#  - CLI 결과가 대시보드 결과 테이블과 같음
+import os
+
+import pandas as pd
+
+import config
+import dashboard
+import feature_store
+import score_cli
+import sheets
+
+
+def test_cache_dir_applies_after_import(sheets_dir, model, monkeypatch, tmp_path):
+    # 새 CLI 프로세스처럼 메모리 스냅샷 없이 (같은 시트로 다른 캐시 폴더에 만든 파생 데이터를 재사용하지 않도록)
+    monkeypatch.setattr(sheets, "_current", None)
+    sheets_dir.write(n_companies=40)
+    cache_dir = str(tmp_path / "cli-cache")
+    monkeypatch.setattr(config, "CACHE_DIR", config.CACHE_DIR)
+    monkeypatch.setenv("DASHBOARD_CACHE_DIR", config.CACHE_DIR)
+    output = str(tmp_path / "risk.csv")
+
+    code = score_cli.main(["all", "--data-dir", config.DATA_DIR, "--cache-dir", cache_dir, "--output", output,
+                           "--workers", "2", "--chunk-size", "15", "--model", model.name])
+    assert code == 0
+    assert sheets.snapshot_dir() == os.path.join(cache_dir, "sheets")
+    assert os.listdir(os.path.join(cache_dir, "sheets"))
+    assert os.listdir(feature_store.store_dir())
+
+    result = pd.read_csv(output, dtype={"stock_code": str})
+    expected = dashboard.get_results(sheets.load_snapshot(), model)
+    assert len(result) == 40
+    for row in result.itertuples():
+        assert row.risk_score == int(expected.get(row.stock_code)["risk_score"])
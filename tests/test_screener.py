@@ -0,0 +1,153 @@
+# tests/test_screener.py
+# 위험 스크리너 (screener.py) - 합성 시트의 배치 결과 테이블을 pandas 로 직접 거른 결과와 비교
+#  - 섹터 / 신호등 / 백분위 점수 조건 마스크
+#  - 정렬 순서 (오름차순은 안정 정렬, 내림차순은 그 역순), 페이지 나누기
+#  - 종목당 한 줄 (여러 기간이 있으면 첫 줄), 스냅샷 + 모델 버전마다 한 번 생성
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard
+import screener
+import sheets
+from features import FEATURE_NAMES
+
+FEATURE_A, FEATURE_B = FEATURE_NAMES[0], FEATURE_NAMES[5]
+
+
+@pytest.fixture
+def universe(sheets_dir, model):
+    # 앞 10개 종목은 두 번째 기간 행을 추가 (스크리너는 첫 줄만 사용)
+    df = sheets_dir.write(n_companies=150, seed=3)
+    later = df.iloc[:10].copy()
+    later[FEATURE_A] = later[FEATURE_A] + 50
+    sheets_dir.write(pd.concat([df, later], ignore_index=True))
+    snapshot = sheets_dir.snapshot()
+
+    table = dashboard.get_results(snapshot, model).results
+    reference = table[~table['stock_code'].duplicated()].reset_index(drop=True)
+    return dashboard.load_screener(model.name), reference
+
+
+def codes(frame):
+    return frame['stock_code'].tolist()
+
+
+def reference_sort(frame, column, ascending):
+    # Screener.order 와 같은 규칙 - 안정 정렬 오름차순, 내림차순은 그 역순 (신호등은 초록 < 노랑 < 빨강)
+    key = frame[column].map(screener.LIGHT_LEVELS) if column in screener.LIGHT_COLUMNS else frame[column]
+    ordered = frame.iloc[np.argsort(key.to_numpy(), kind="stable")]
+    return ordered if ascending else ordered.iloc[::-1]
+
+
+def test_one_row_per_company(universe, model):
+    scr, reference = universe
+    assert len(scr) == len(reference) == 150
+    everything, total = scr.query(limit=len(scr))
+    assert total == 150
+    assert sorted(codes(everything)) == sorted(codes(reference))
+    assert scr.sectors() == sorted(reference['sector'].unique())
+
+    # 두 기간이 있는 종목은 첫 기간 값 (두 번째 기간은 FEATURE_A 를 바꿔 둠)
+    table = dashboard.get_results(sheets.load_snapshot(), model).results
+    code = reference['stock_code'][0]
+    first, later = table[table['stock_code'] == code][f"score_{FEATURE_A}"]
+    assert first != later
+    position = list(scr.column("stock_code")).index(code)
+    assert scr.column(f"score_{FEATURE_A}")[position] == np.float32(first)
+
+
+@pytest.mark.parametrize("conditions", [
+    {},
+    {"sectors": ["화학"]},
+    {"lights": {"f1": ["red", "yellow"]}},
+    {"percentiles": {FEATURE_A: (40, 80)}},
+    {"sectors": ["화학", "금융"], "lights": {"f1": ["green", "yellow"], "model": []},
+     "percentiles": {FEATURE_A: (10, 90), FEATURE_B: (0, 60)}},
+])
+def test_mask_matches_pandas(universe, conditions):
+    scr, reference = universe
+    keep = pd.Series(True, index=reference.index)
+    if conditions.get("sectors"):
+        keep &= reference['sector'].isin(conditions["sectors"])
+    for group, colors in conditions.get("lights", {}).items():
+        if colors:
+            keep &= reference[f"light_{group}"].isin(colors)
+    for name, (low, high) in conditions.get("percentiles", {}).items():
+        values = reference[f"score_{name}"].astype(np.float32)
+        keep &= values.between(low, high)
+    expected = reference[keep]
+
+    # 합성 데이터에서 조건이 일부 종목만 남기는지 (전부 또는 하나도 안 남으면 비교 의미가 없음)
+    if conditions:
+        assert 0 < len(expected) < len(reference)
+
+    frame, total = scr.query(**conditions, limit=len(scr))
+    assert total == len(expected)
+    assert sorted(codes(frame)) == sorted(codes(expected))
+    assert set(frame.columns) >= {f"score_{name}" for name in conditions.get("percentiles", {})}
+
+
+@pytest.mark.parametrize("column", ["risk_score", "prob", "company_name", "light_f1", f"score_{FEATURE_B}"])
+@pytest.mark.parametrize("ascending", [True, False])
+def test_sort_order_matches_pandas(universe, column, ascending):
+    scr, reference = universe
+    frame, _ = scr.query(sort_by=column, ascending=ascending, limit=len(scr))
+    expected = reference_sort(reference, column, ascending)
+    assert codes(frame) == codes(expected)
+    assert frame['rank'].tolist() == list(range(1, len(frame) + 1))
+    if column.startswith("score_"):
+        np.testing.assert_allclose(frame[column], expected[column], rtol=1e-6)
+
+
+def test_filtered_sort_matches_pandas(universe):
+    scr, reference = universe
+    frame, total = scr.query(sectors=["화학"], sort_by="risk_score", ascending=False, limit=len(scr))
+    expected = reference_sort(reference[reference['sector'] == "화학"], "risk_score", ascending=False)
+    assert total == len(expected)
+    assert codes(frame) == codes(expected)
+
+
+def test_paging(universe):
+    scr, _ = universe
+    conditions = {"lights": {"f1": ["red", "yellow"]}, "sort_by": "prob"}
+    everything, total = scr.query(**conditions, limit=len(scr))
+
+    pages, offset = [], 0
+    while offset < total:
+        page, page_total = scr.query(**conditions, offset=offset, limit=17)
+        assert page_total == total
+        assert page['rank'].tolist() == list(range(offset + 1, offset + len(page) + 1))
+        pages.append(page)
+        offset += 17
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), everything)
+
+    past_end, past_total = scr.query(**conditions, offset=total + 5, limit=17)
+    assert past_end.empty and past_total == total
+
+
+def test_unknown_sort_column(universe):
+    scr, _ = universe
+    with pytest.raises(ValueError):
+        scr.query(sort_by="not_a_column")
+
+
+def test_memo_per_model_version(universe, sheets_dir, model):
+    scr, _ = universe
+    first, second = dashboard.models.names()[:2]
+    snapshot = sheets.load_snapshot()
+    assert dashboard.load_screener(model.name) is scr
+    assert dashboard.load_screener(first) is dashboard.load_screener(first)
+    assert dashboard.load_screener(second) is not dashboard.load_screener(first)
+
+    # 모델마다 그 모델의 결과 테이블로 만든 스크리너
+    for name in (first, second):
+        frame, _ = dashboard.load_screener(name).query(sort_by="stock_code", ascending=True, limit=5)
+        results = dashboard.get_results(snapshot, dashboard.get_model(name))
+        assert frame['risk_score'].tolist() == [int(results.get(code)['risk_score']) for code in codes(frame)]
+
+    # 시트가 바뀌면 (새 스냅샷) 다시 생성
+    sheets_dir.write(n_companies=120, seed=4)
+    sheets_dir.snapshot()
+    assert len(dashboard.load_screener(model.name)) == 120
+    assert dashboard.load_screener(model.name) is not scr
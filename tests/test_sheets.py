@@ -0,0 +1,157 @@
+# tests/test_sheets.py
+# 시트 스냅샷 (sheets.py)
+#  - 스냅샷 파생 데이터(memo): 이름별로 한 번만 생성, 다른 이름 생성 중에도 조회가 기다리지 않음
+#  - load_snapshot: TTL 안쪽 재사용, TTL 경과 시 백그라운드 갱신, 너무 오래되면 동기 갱신,
+#    오프라인 모드, 다운로드 실패 시 디스크 스냅샷 사용
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import config
+import sheets
+
+
+def make_snapshot():
+    frames = {name: pd.DataFrame({"a": [1, 2]}) for name in sheets.SHEET_NAMES}
+    return sheets.SheetSnapshot(frames, time.time())
+
+
+def test_memo_builds_once_per_name():
+    snapshot = make_snapshot()
+    calls = []
+
+    def build(snap):
+        calls.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return object()
+
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(snapshot.memo("slow", build))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len({id(v) for v in values}) == 1
+
+
+def test_memo_hit_does_not_wait_for_other_build():
+    snapshot = make_snapshot()
+    snapshot.memo("company_index", lambda snap: "index")
+    started, release = threading.Event(), threading.Event()
+
+    def slow(snap):
+        started.set()
+        release.wait(5)
+        return "results"
+
+    builder = threading.Thread(target=snapshot.memo, args=("results_v1", slow))
+    builder.start()
+    try:
+        assert started.wait(5)
+        t0 = time.monotonic()
+        assert snapshot.memo("company_index", lambda snap: "again") == "index"
+        assert snapshot.memo("other", lambda snap: "built") == "built"
+        assert time.monotonic() - t0 < 1
+    finally:
+        release.set()
+        builder.join()
+    assert snapshot.memo("results_v1", slow) == "results"
+
+
+def test_memo_nested_builders():
+    # 결과 테이블 -> 백분위 인덱스 -> 피처 저장소처럼 생성 중에 다른 이름을 요청
+    snapshot = make_snapshot()
+    value = snapshot.memo("outer", lambda snap: snap.memo("inner", lambda s: 1) + 1)
+    assert value == 2
+    assert snapshot.memo("inner", lambda s: 99) == 1
+
+
+# === load_snapshot: TTL / 백그라운드 갱신 / 오프라인 / 다운로드 실패 ===
+@pytest.fixture
+def snapshots(sheets_dir, monkeypatch):
+    # 합성 시트로 첫 스냅샷을 받아 둔 상태 (이전 테스트의 메모리 스냅샷은 지움)
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(config, "OFFLINE", False)
+    monkeypatch.setattr(config, "SHEET_TTL_SECONDS", 600)
+    monkeypatch.setattr(config, "SHEET_MAX_STALE_SECONDS", 86400)
+    df = sheets_dir.write(n_companies=30)
+    first = sheets_dir.snapshot()
+
+    def change():
+        # sheet1.csv 를 바꿈 -> 다음에 받아오면 다른 스냅샷 ID
+        df.loc[0, "F1_Debt_Ratio"] = 123.0
+        sheets_dir.write(df)
+
+    return first, change
+
+
+def wait_refresh():
+    deadline = time.monotonic() + 10
+    while sheets._refreshing.is_set() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not sheets._refreshing.is_set()
+
+
+def test_fresh_snapshot_is_reused(snapshots):
+    first, change = snapshots
+    change()
+    assert sheets.load_snapshot() is first
+    assert sheets.current_snapshot_id() == first.snapshot_id
+
+
+def test_stale_snapshot_refreshes_in_background(snapshots, monkeypatch):
+    first, change = snapshots
+    change()
+    monkeypatch.setattr(config, "SHEET_TTL_SECONDS", 0)
+
+    # TTL 이 지나면 이전 스냅샷을 바로 돌려주고 뒤에서 갱신
+    assert sheets.load_snapshot() is first
+    assert sheets.current_snapshot_id() is None
+    wait_refresh()
+    refreshed = sheets.load_snapshot()
+    assert refreshed.snapshot_id != first.snapshot_id
+    wait_refresh()
+
+
+def test_expired_snapshot_refreshes_synchronously(snapshots, monkeypatch):
+    first, change = snapshots
+    change()
+    monkeypatch.setattr(config, "SHEET_TTL_SECONDS", 0)
+    monkeypatch.setattr(config, "SHEET_MAX_STALE_SECONDS", 0)
+    assert sheets.load_snapshot().snapshot_id != first.snapshot_id
+
+
+def test_offline_uses_last_snapshot(snapshots, monkeypatch, tmp_path):
+    first, change = snapshots
+    change()
+    monkeypatch.setattr(config, "SHEET_TTL_SECONDS", 0)
+    monkeypatch.setattr(sheets, "fetch_sheets", fail_fetch)
+    assert sheets.load_snapshot(offline=True) is first
+    assert sheets.current_snapshot_id(offline=True) == first.snapshot_id
+
+    # 메모리/디스크 어디에도 스냅샷이 없으면 오류
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path / "never-fetched"))
+    with pytest.raises(RuntimeError):
+        sheets.load_snapshot(offline=True)
+
+
+def test_failed_refresh_falls_back_to_disk_snapshot(snapshots, monkeypatch):
+    first, change = snapshots
+    change()
+    # 새 프로세스처럼 메모리 스냅샷 없이, 디스크 스냅샷은 너무 오래됨 + 다운로드 실패
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(config, "SHEET_TTL_SECONDS", 0)
+    monkeypatch.setattr(config, "SHEET_MAX_STALE_SECONDS", 0)
+    monkeypatch.setattr(sheets, "fetch_sheets", fail_fetch)
+
+    snapshot = sheets.load_snapshot()
+    assert snapshot.snapshot_id == first.snapshot_id
+    assert snapshot.company.equals(first.company)
+
+
+def fail_fetch():
+    raise OSError("네트워크 없음")
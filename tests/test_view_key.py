@@ -0,0 +1,30 @@
+# tests/test_view_key.py
+# 화면 캐시 키는 시트 다운로드 / 모델 로드 없이 만들어야 함
+# (처음 요청은 키 없이 load_data_and_model 에서 시트/모델/주가 단계를 동시에 실행)
+import dashboard
+import model_registry
+import sheets
+
+
+def test_view_key_does_not_load(sheets_dir, monkeypatch):
+    sheets_dir.write(n_companies=50)
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(dashboard, "models", model_registry.ModelRegistry())
+
+    def fail(*args, **kwargs):
+        raise AssertionError("view_key 가 시트/모델을 올리면 안 됨")
+
+    monkeypatch.setattr(sheets, "load_snapshot", fail)
+    monkeypatch.setattr(dashboard.models, "get", fail)
+    assert dashboard.view_key("000100") is None
+
+    # 스냅샷이 메모리에 올라간 뒤에는 (스냅샷 ID, 모델 파일 해시) 키 - 모델은 여전히 올리지 않음
+    snapshot = sheets_dir.snapshot()
+    key = dashboard.view_key(" 000100 ")
+    assert key == ("000100", snapshot.snapshot_id, dashboard.models.version())
+    assert not dashboard.models._loaded
+
+
+def test_view_key_matches_loaded_model(model):
+    # 파일 해시로 만든 버전 = 모델을 올릴 때 붙는 버전 (같은 결과 테이블/화면 캐시를 가리킴)
+    assert dashboard.models.version(model.name) == model.version
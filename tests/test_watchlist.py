@@ -0,0 +1,150 @@
+# tests/test_watchlist.py
+# 관심 종목 감시 (watchlist.py) - 로컬 합성 시트만으로 끝까지
+#  - 스냅샷이 바뀌면 행 해시가 바뀐 관심 종목만 다시 스코어링, 모델 버전이 바뀌면 전체
+#  - 신호등 / 위험 요인 변화 알림이 파일 sink(alerts.jsonl)까지 전달되는지
+#  - CLI 의 --cache-dir 는 모듈이 이미 import 된 뒤에도 적용됨
+import json
+import os
+import time
+
+import pytest
+
+import config
+import dashboard
+import scoring
+import sheets
+import watchlist
+from company_index import normalize_code
+from features import FEATURE_NAMES
+
+WATCHED = ["000101", "000105", "000110", "000120", "000130"]
+
+
+class RecordingWatchlist(watchlist.Watchlist):
+    # 확인할 때마다 다시 스코어링한 종목 코드를 기록
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rescored = []
+
+    def _score(self, snapshot, store, model, affected):
+        self.rescored.append(sorted(code for code, _, _ in affected))
+        return super()._score(snapshot, store, model, affected)
+
+
+class Inputs:
+    # WatchScheduler 의 load - 시트 CSV 를 다시 읽은 스냅샷 + 지정한 모델
+
+    def __init__(self, sheets_dir, model_name):
+        self.sheets_dir = sheets_dir
+        self.model_name = model_name
+
+    def __call__(self):
+        return self.sheets_dir.snapshot(), dashboard.models.get(self.model_name)
+
+
+def pick_source(snapshot, model, code):
+    # code 와 신호등 / 상위 위험 요인이 모두 다른 기업 (그 기업의 피처를 복사하면 두 알림이 모두 나와야 함)
+    results = dashboard.get_results(snapshot, model)
+    target = results.get(code)
+    target_drivers = watchlist.top_drivers(results.shap_values(target))
+    for other in results.company_index.codes:
+        if other in WATCHED:
+            continue
+        row = results.get(other)
+        lights_differ = any(row[f"light_{g}"] != target[f"light_{g}"] for g in scoring.LIGHT_GROUPS)
+        if lights_differ and watchlist.top_drivers(results.shap_values(row)) != target_drivers:
+            return other
+    pytest.skip("신호등/위험 요인이 다른 기업이 합성 시트에 없음")
+
+
+@pytest.fixture
+def watch(sheets_dir, tmp_path):
+    df = sheets_dir.write(n_companies=120, seed=7)
+    wl = RecordingWatchlist(str(tmp_path / "watchlist"))
+    wl.add(WATCHED)
+    return df, wl
+
+
+def test_rescores_only_changed_tickers_and_alerts(sheets_dir, watch, model):
+    df, wl = watch
+    scheduler = watchlist.WatchScheduler(wl, load=Inputs(sheets_dir, model.name))
+
+    # 처음 확인: 모든 관심 종목 계산, 비교 기준이 없으므로 알림 없음
+    assert scheduler.run_once() == []
+    assert wl.rescored == [WATCHED]
+
+    # 같은 스냅샷 + 같은 모델이면 계산하지 않음
+    assert scheduler.run_once() == []
+    assert len(wl.rescored) == 1
+
+    # 관심 종목 하나 + 관심 없는 종목 하나의 행을 바꿈
+    target = WATCHED[2]
+    source = pick_source(sheets_dir.snapshot(), model, target)
+    codes = df['stock_code'].map(normalize_code)
+    df.loc[codes == target, FEATURE_NAMES] = df.loc[codes == source, FEATURE_NAMES].to_numpy()
+    df.loc[codes == "000150", "F1_Debt_Ratio"] = 99.0
+    sheets_dir.write(df)
+
+    alerts = scheduler.run_once()
+    assert wl.rescored[-1] == [target]
+    assert {alert["ticker"] for alert in alerts} == {target}
+    kinds = {alert["kind"] for alert in alerts}
+    assert {"light", "drivers"} <= kinds
+
+    # 파일 sink 에 같은 알림이 기록됨 (최근 알림부터)
+    logged = wl.alerts.read()
+    assert len(logged) == len(alerts)
+    assert {(a["ticker"], a["kind"]) for a in logged} == {(a["ticker"], a["kind"]) for a in alerts}
+    assert all(a["previous_snapshot_id"] != a["snapshot_id"] for a in logged)
+
+    # 다시 계산한 결과는 전체 배치 결과 테이블과 같음
+    expected = dashboard.get_results(sheets_dir.snapshot(), model).get(target)
+    assert wl.state()["tickers"][target]["risk_score"] == int(expected["risk_score"])
+
+
+def test_model_change_rescores_all(sheets_dir, watch):
+    _, wl = watch
+    first, second = dashboard.models.names()[:2]
+    inputs = Inputs(sheets_dir, first)
+    scheduler = watchlist.WatchScheduler(wl, load=inputs)
+    scheduler.run_once()
+
+    inputs.model_name = second
+    alerts = scheduler.run_once()
+    assert wl.rescored == [WATCHED, WATCHED]
+    assert wl.state()["model_version"] == dashboard.models.version(second)
+    assert all(a["previous_model_version"] == dashboard.models.version(first) for a in alerts)
+    assert len(wl.alerts.read()) == len(alerts)
+
+
+def test_scheduler_thread(sheets_dir, watch, model):
+    _, wl = watch
+    scheduler = watchlist.WatchScheduler(wl, interval=0.05, load=Inputs(sheets_dir, model.name)).start()
+    try:
+        deadline = time.monotonic() + 30
+        while wl.state()["snapshot_id"] is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+    assert wl.state()["snapshot_id"] == sheets_dir.snapshot().snapshot_id
+    assert wl.rescored[0] == WATCHED
+
+
+def test_cli_cache_dir(sheets_dir, model, monkeypatch, tmp_path):
+    sheets_dir.write(n_companies=40)
+    monkeypatch.setattr(sheets, "_current", None)
+    monkeypatch.setattr(config, "CACHE_DIR", config.CACHE_DIR)
+    monkeypatch.setenv("DASHBOARD_CACHE_DIR", config.CACHE_DIR)
+    cache_dir = str(tmp_path / "cli-cache")
+    options = ["--data-dir", sheets_dir.directory, "--cache-dir", cache_dir, "--model", model.name]
+
+    assert watchlist.main(["add", "101", "000105", *options]) == 0
+    assert watchlist.main(["check", *options]) == 0
+
+    # 관심 종목 상태와 시트 스냅샷이 모두 지정한 캐시 폴더 아래
+    with open(os.path.join(cache_dir, "watchlist", watchlist.STATE_FILE), encoding="utf-8") as f:
+        state = json.load(f)
+    assert sorted(state["tickers"]) == ["000101", "000105"]
+    assert state["snapshot_id"] == sheets.load_snapshot().snapshot_id
+    assert os.listdir(os.path.join(cache_dir, "sheets"))
@@ -0,0 +1,146 @@
+# tests/test_whatif.py
+# What-if 시뮬레이터 (whatif.py)
+#  - 조정값이 있을 때의 빠른 경로(SHAP 합계 -> 시그모이드)가 결과 테이블 경로(score_matrix)와 같은 위험 점수 / 신호등
+#  - 위험 점수 경계에 걸치면 predict_proba 로 다시 계산
+#  - sweep 의 각 점 = 같은 값으로 evaluate 한 결과, compare 비교표, sweep_range 구간
+import numpy as np
+import pytest
+
+import batch_scoring
+import dashboard
+import tracing
+import whatif
+from features import FEATURE_NAMES
+
+CODE = "000103"
+
+
+@pytest.fixture
+def sim(sheets_dir, model):
+    sheets_dir.write(n_companies=80, seed=5)
+    sheets_dir.snapshot()
+    return dashboard.load_simulator(CODE, model.name)
+
+
+def reference(sim, overrides):
+    row = sim.features(overrides)
+    return batch_scoring.score_matrix(row[None, :], sim.model.model, sim.explainer, sim.percentile_index)
+
+
+def random_overrides(sim, rng, n_features):
+    # 전체 기업 분포 안의 값으로 피처 몇 개를 바꿈
+    names = rng.choice(FEATURE_NAMES, size=n_features, replace=False)
+    overrides = {}
+    for name in names:
+        values = np.asarray(sim.store.sorted_values(name), dtype=float)
+        overrides[str(name)] = float(rng.choice(values)) if len(values) else 0.0
+    return overrides
+
+
+def test_baseline_matches_results_table(sim, sheets_dir, model):
+    row = dashboard.get_results(sheets_dir.snapshot(), model).get(CODE)
+    assert sim.baseline["risk_score"] == int(row["risk_score"])
+    assert sim.evaluate() is sim.baseline
+    assert sim.evaluate({}) is sim.baseline
+
+
+def test_fast_path_matches_score_matrix(sim):
+    assert sim._fast_path()
+    rng = np.random.default_rng(0)
+    for _ in range(60):
+        overrides = random_overrides(sim, rng, int(rng.integers(1, 6)))
+        result = sim.evaluate(overrides)
+        probs, shap_matrix, scores, lights = reference(sim, overrides)
+
+        assert result["risk_score"] == int(probs[0] * 100)
+        assert result["lights"] == {group: colors[0] for group, colors in lights.items()}
+        assert result["prob"] == pytest.approx(float(probs[0]), abs=1e-5)
+        np.testing.assert_allclose(result["shap"], shap_matrix[0], atol=1e-6)
+        np.testing.assert_array_equal(result["scores"], scores[0])
+
+
+def test_boundary_uses_predict_proba(sim, monkeypatch):
+    overrides = {FEATURE_NAMES[0]: sim.value(FEATURE_NAMES[0]) + 1}
+    calls = []
+    predict_proba = sim.model.model.predict_proba
+
+    def counting(X):
+        calls.append(len(X))
+        return predict_proba(X)
+
+    monkeypatch.setattr(sim.model.model, "predict_proba", counting)
+
+    # 경계에서 먼 확률이면 부스터 호출은 SHAP 한 번뿐
+    monkeypatch.setattr(whatif, "BOUNDARY_TOLERANCE", 0.0)
+    sim.evaluate(overrides)
+    assert calls == []
+
+    # 모든 확률을 경계로 보면 predict_proba 값 그대로
+    monkeypatch.setattr(whatif, "BOUNDARY_TOLERANCE", 1.0)
+    trace = tracing.Trace("whatif")
+    with tracing.activate(trace):
+        result = sim.evaluate(overrides)
+    assert calls == [1]
+    assert trace.counters["whatif.boundary_predict"] == 1
+    probs = reference(sim, overrides)[0]
+    assert result["prob"] == float(probs[0])
+    assert result["risk_score"] == int(probs[0] * 100)
+
+
+def test_sweep_matches_evaluate(sim):
+    name = FEATURE_NAMES[1]
+    curve = sim.sweep(name, with_lights=True)
+    assert len(curve) == whatif.SWEEP_POINTS
+    assert (curve["value"].iloc[0], curve["value"].iloc[-1]) == pytest.approx(sim.sweep_range(name))
+    for point in curve.itertuples():
+        result = sim.evaluate({name: point.value})
+        assert result["risk_score"] == point.risk_score
+        assert all(result["lights"][group] == getattr(point, f"light_{group}") for group in result["lights"])
+
+    # 다른 조정값은 그대로 두고 한 피처만 바꿈
+    other = {FEATURE_NAMES[2]: sim.value(FEATURE_NAMES[2]) + 5}
+    values = [sim.value(name) - 1, sim.value(name) + 1]
+    curve = sim.sweep(name, values, overrides=other)
+    assert curve["risk_score"].tolist() == [sim.evaluate({**other, name: v})["risk_score"] for v in values]
+
+
+def test_compare(sim):
+    assert sim.compare(sim.baseline).empty
+
+    name = FEATURE_NAMES[0]
+    table = sim.compare(sim.evaluate({name: sim.value(name) * 3 + 10}))
+    assert name in table["name"].tolist()
+    row = table.set_index("name").loc[name]
+    assert (row["value_before"], row["value_after"]) == (sim.value(name), sim.value(name) * 3 + 10)
+
+    # 값이 그대로인 피처는 SHAP 또는 백분위 점수가 바뀐 경우만, SHAP 변화가 큰 순서
+    same = table[table["name"] != name]
+    assert ((same["shap_delta"].abs() > 1e-6) | (same["score_before"] != same["score_after"])).all()
+    assert (same["value_before"].fillna(0) == same["value_after"].fillna(0)).all()
+    deltas = table["shap_delta"].abs().to_numpy()
+    assert (deltas[:-1] >= deltas[1:]).all()
+
+
+def test_sweep_range(sim, monkeypatch):
+    name = FEATURE_NAMES[3]
+    values = np.asarray(sim.store.sorted_values(name), dtype=float)
+    n = len(values)
+    start, end = sim.sweep_range(name)
+    base = sim.value(name)
+    assert start == min(values[int(0.01 * (n - 1))], base)
+    assert end == max(values[int(0.99 * (n - 1))], base)
+    assert sim.sweep_range(name, 0.0, 1.0) == (min(values[0], base), max(values[-1], base))
+
+    # 원래 값이 분포 밖이면 구간을 넓힘
+    sim.base[whatif.FEATURE_POS[name]] = values[-1] + 100
+    assert sim.sweep_range(name)[1] == values[-1] + 100
+
+    # 분포가 없으면 원래 값 +-1, 원래 값도 없으면 (-1, 1)
+    monkeypatch.setattr(sim.store, "sorted_values", lambda _: np.array([], dtype=np.float32))
+    assert sim.sweep_range(name) == (values[-1] + 99, values[-1] + 101)
+    sim.base[whatif.FEATURE_POS[name]] = np.nan
+    assert sim.sweep_range(name) == (-1.0, 1.0)
+
+    # 값이 모두 같으면 +-1
+    monkeypatch.setattr(sim.store, "sorted_values", lambda _: np.full(10, 2.0, dtype=np.float32))
+    assert sim.sweep_range(name) == (1.0, 3.0)
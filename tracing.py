@@ -0,0 +1,166 @@
+# tracing.py
+# 요청 단계별 소요 시간 / 캐시 적중 횟수 / 데이터 크기 기록
+#  - span(이름): with 블록의 소요 시간 기록
+#  - count(이름): 캐시 적중/실패 등 횟수
+#  - size(이름, 바이트): 다운로드/프롬프트/리포트 등 데이터 크기
+#  - activate(Trace) 블록 안의 기록은 그 Trace 에 모임 (사이드바 진단 패널용)
+#  - DASHBOARD_TRACE=1 이면 모든 기록을 JSON 한 줄 로그로 출력
+#  - 둘 다 꺼져 있으면 아무것도 기록하지 않음 (빈 객체만 돌려주므로 비용 거의 없음)
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import config
+
+_current = contextvars.ContextVar("dashboard_trace", default=None)
+
+
+class Trace:
+    # 한 번의 진단(실행)에서 나온 기록 모음 - 여러 스레드에서 동시에 기록될 수 있음
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.sizes = {}
+        self._lock = threading.Lock()
+
+    def _add_span(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def _count(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _size(self, name, nbytes):
+        with self._lock:
+            self.sizes[name] = self.sizes.get(name, 0) + nbytes
+
+    def summary(self):
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "name": self.name,
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+                "counters": dict(self.counters),
+                "sizes": dict(self.sizes),
+            }
+
+
+def _emit(event, trace, record):
+    # DASHBOARD_TRACE=1 일 때 JSON 한 줄 로그 (stderr)
+    if not config.TRACE:
+        return
+    line = {"event": event, "ts": round(time.time(), 3), "trace_id": trace.trace_id if trace else None, **record}
+    print(json.dumps(line, ensure_ascii=False, default=str), file=sys.stderr, flush=True)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # 블록 안에서 알게 된 값(행 수, 캐시 적중 여부 등)을 span 에 추가
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        origin = self.trace.started if self.trace else self.start
+        record = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "ms": round((end - self.start) * 1000, 3),
+            "thread": threading.current_thread().name,
+            **self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if self.trace is not None:
+            self.trace._add_span(record)
+        _emit("span", self.trace, record)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def enabled():
+    return config.TRACE or _current.get() is not None
+
+
+def span(name, **attrs):
+    trace = _current.get()
+    if trace is None and not config.TRACE:
+        return _NOOP
+    return _Span(trace, name, attrs)
+
+
+def count(name, n=1):
+    trace = _current.get()
+    if trace is None and not config.TRACE:
+        return
+    if trace is not None:
+        trace._count(name, n)
+    _emit("count", trace, {"name": name, "n": n})
+
+
+def size(name, nbytes):
+    trace = _current.get()
+    if trace is None and not config.TRACE:
+        return
+    if trace is not None:
+        trace._size(name, int(nbytes))
+    _emit("size", trace, {"name": name, "bytes": int(nbytes)})
+
+
+@contextmanager
+def activate(trace):
+    # 블록 안의 기록을 trace 에 모음 (trace 가 None 이면 아무 일도 하지 않음)
+    if trace is None:
+        yield None
+        return
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def bind(fn):
+    # 다른 스레드에서 실행할 함수에 현재 Trace 를 붙여 줌 (스레드 풀은 컨텍스트를 넘기지 않으므로)
+    if not enabled():
+        return fn
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
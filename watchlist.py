@@ -0,0 +1,379 @@
+# watchlist.py
+# 관심 종목 감시 - 시트 스냅샷이나 모델 버전이 바뀌면 관심 종목만 다시 스코어링해서 지난 결과와 비교
+#  - 관심 종목 목록 / 지난 확인 결과: 캐시 폴더(watchlist/)의 JSON 파일
+#  - 다시 계산하는 종목: 피처 행 해시(feature_store.py)가 바뀐 종목, 새로 추가한 종목 (모델 버전이 바뀌면 전체)
+#    나머지는 predict/SHAP 없이 지난 결과를 그대로 유지
+#  - 부도 위험 스코어(config.WATCH_RISK_DELTA 이상), 5대 신호등, 상위 위험 요인(SHAP 양수) 변화 -> 알림
+#  - 알림은 sink 로 전달 (기본: alerts.jsonl 에 한 줄씩 추가, write(alerts) 만 있으면 다른 sink 도 추가 가능)
+#  - WatchScheduler: 백그라운드 스레드에서 일정 간격으로 스냅샷 ID / 모델 버전만 확인 (바뀌었을 때만 계산)
+#
+# 사용 예) 로컬 CSV 만으로 동작 (KRX 주가 / Google 시트 / Gemini 호출 없음)
+#   python watchlist.py add 005930 000660 --data-dir ./data
+#   python watchlist.py check --data-dir ./data                 # 한 번 확인
+#   python watchlist.py watch --data-dir ./data --interval 60   # 계속 감시
+#   python watchlist.py alerts --limit 20
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import config
+import scoring
+import tracing
+from company_index import normalize_code
+from features import FEATURE_NAMES
+
+LIGHT_LEVELS = {"green": 0, "yellow": 1, "red": 2}
+TICKERS_FILE = "tickers.json"
+STATE_FILE = "state.json"
+ALERTS_FILE = "alerts.jsonl"
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, payload):
+    # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록 임시 파일에 쓰고 교체
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class FileSink:
+    # 알림을 JSON 한 줄씩 파일에 추가
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, alerts):
+        if not alerts:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+    def read(self, limit=None):
+        # 최근 알림부터
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                alerts = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return []
+        alerts.reverse()
+        return alerts[:limit] if limit else alerts
+
+
+class ConsoleSink:
+    # 알림을 표준 출력으로 (CLI 감시용)
+
+    def write(self, alerts):
+        for alert in alerts:
+            print(f"⚠️ [{alert['ticker']} {alert['company_name']}] {alert['message']}")
+
+
+def top_drivers(shap_values, n=None):
+    # 위험을 가장 많이 높인 요인 (SHAP 양수 상위 n개)
+    n = n or config.WATCH_TOP_DRIVERS
+    order = np.argsort(-shap_values)[:n]
+    return [FEATURE_NAMES[j] for j in order if shap_values[j] > 0]
+
+
+def diff(before, after, risk_delta=None):
+    # 지난 결과 -> 이번 결과 변화 목록 (처음 보는 종목은 비교 기준이 없으므로 알림 없음)
+    risk_delta = config.WATCH_RISK_DELTA if risk_delta is None else risk_delta
+    if before is None:
+        return []
+    if after.get("missing"):
+        if before.get("missing"):
+            return []
+        return [{"kind": "missing", "message": "시트에서 종목을 찾을 수 없습니다."}]
+    if before.get("missing"):
+        return [{"kind": "returned", "message": f"시트에 다시 나타났습니다. (부도 위험 스코어 {after['risk_score']})"}]
+
+    changes = []
+    delta = after["risk_score"] - before["risk_score"]
+    if abs(delta) >= risk_delta:
+        changes.append({
+            "kind": "risk_score", "before": before["risk_score"], "after": after["risk_score"], "delta": delta,
+            "message": f"부도 위험 스코어 {before['risk_score']} → {after['risk_score']} ({delta:+d})",
+        })
+    for group in scoring.LIGHT_GROUPS:
+        old, new = before["lights"].get(group), after["lights"].get(group)
+        if old != new:
+            worse = LIGHT_LEVELS.get(new, 0) > LIGHT_LEVELS.get(old, 0)
+            changes.append({
+                "kind": "light", "group": group, "before": old, "after": new,
+                "direction": "worse" if worse else "better",
+                "message": f"신호등 {group}: {old} → {new} ({'악화' if worse else '개선'})",
+            })
+    added = [name for name in after["drivers"] if name not in before["drivers"]]
+    removed = [name for name in before["drivers"] if name not in after["drivers"]]
+    if added or removed:
+        parts = [f"+{name}" for name in added] + [f"-{name}" for name in removed]
+        changes.append({
+            "kind": "drivers", "added": added, "removed": removed,
+            "message": f"주요 위험 요인 변경: {', '.join(parts)}",
+        })
+    return changes
+
+
+class Watchlist:
+
+    def __init__(self, directory=None, sinks=None):
+        # 기본 폴더는 만들 때의 캐시 폴더 기준 (CLI 에서 --cache-dir 로 바꿀 수 있도록)
+        self.directory = directory or config.cache_path("watchlist")
+        self.alerts = FileSink(os.path.join(self.directory, ALERTS_FILE))
+        self.sinks = [self.alerts] + list(sinks or [])
+        self._lock = threading.RLock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def tickers(self):
+        return _read_json(self._path(TICKERS_FILE), [])
+
+    def add(self, tickers):
+        codes = [normalize_code(t) for t in tickers if str(t).strip()]
+        with self._lock:
+            merged = list(dict.fromkeys(self.tickers() + codes))
+            _write_json(self._path(TICKERS_FILE), merged)
+        return merged
+
+    def remove(self, tickers):
+        codes = {normalize_code(t) for t in tickers}
+        with self._lock:
+            kept = [code for code in self.tickers() if code not in codes]
+            _write_json(self._path(TICKERS_FILE), kept)
+            state = self.state()
+            state["tickers"] = {code: entry for code, entry in state["tickers"].items() if code not in codes}
+            _write_json(self._path(STATE_FILE), state)
+        return kept
+
+    def state(self):
+        # 지난 확인 결과 {snapshot_id, model_version, checked_at, tickers: {종목 코드: 결과}}
+        return _read_json(self._path(STATE_FILE),
+                          {"snapshot_id": None, "model_version": None, "checked_at": None, "tickers": {}})
+
+    def is_current(self, snapshot_id, model_version):
+        # 같은 스냅샷 + 같은 모델로 모든 관심 종목을 이미 확인했는지
+        state = self.state()
+        return (state["snapshot_id"] == snapshot_id and state["model_version"] == model_version
+                and set(self.tickers()) <= set(state["tickers"]))
+
+    def run(self, snapshot, model):
+        # snapshot: sheets.SheetSnapshot / model: model_registry.LoadedModel -> 이번 확인에서 나온 알림 목록
+        import feature_store
+
+        with self._lock:
+            state = self.state()
+            tickers = self.tickers()
+            store = feature_store.get_feature_store(snapshot)
+            same_model = state["model_version"] == model.version
+            previous = state["tickers"]
+
+            entries, affected = {}, []
+            for code in tickers:
+                pos = store.first_position(code)
+                if pos is None:
+                    entries[code] = {"missing": True, "company_name": previous.get(code, {}).get("company_name", code)}
+                    continue
+                row_hash = str(int(store.row_hashes[pos]))
+                before = previous.get(code)
+                if same_model and before and before.get("row_hash") == row_hash:
+                    entries[code] = before
+                else:
+                    affected.append((code, pos, row_hash))
+
+            with tracing.span("watchlist.rescore", tickers=len(tickers), affected=len(affected)):
+                entries.update(self._score(snapshot, store, model, affected))
+
+            alerts = []
+            checked_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            for code in tickers:
+                for change in diff(previous.get(code), entries[code]):
+                    alerts.append({
+                        "time": checked_at, "ticker": code, "company_name": entries[code]["company_name"],
+                        "snapshot_id": snapshot.snapshot_id, "model_version": model.version,
+                        "previous_snapshot_id": state["snapshot_id"], "previous_model_version": state["model_version"],
+                        **change,
+                    })
+
+            _write_json(self._path(STATE_FILE), {
+                "snapshot_id": snapshot.snapshot_id, "model_version": model.version,
+                "checked_at": checked_at, "tickers": entries,
+            })
+
+        tracing.count("watchlist.alerts", len(alerts))
+        for sink in self.sinks:
+            try:
+                sink.write(alerts)
+            except Exception as e:
+                print(f"⚠️ 알림 전달 실패 ({type(sink).__name__}): {e}")
+        return alerts
+
+    def _score(self, snapshot, store, model, affected):
+        # 다시 계산할 종목만 한 번에 predict / SHAP / 신호등
+        if not affected:
+            return {}
+        import batch_scoring
+
+        positions = [pos for _, pos, _ in affected]
+        probs, shap_matrix, _, lights = batch_scoring.score_matrix(
+            store.matrix(positions), model.model, model.explainer(), batch_scoring.get_percentile_index(snapshot)
+        )
+        return {
+            code: {
+                "company_name": store.names[pos],
+                "row_hash": row_hash,
+                "risk_score": int(probs[i] * 100),
+                "prob": float(probs[i]),
+                "lights": {group: colors[i] for group, colors in lights.items()},
+                "drivers": top_drivers(shap_matrix[i]),
+            }
+            for i, (code, pos, row_hash) in enumerate(affected)
+        }
+
+
+def current_inputs(model_name=None, refresh=False):
+    # 지금의 (스냅샷, 모델) - refresh 면 시트(로컬 CSV)를 TTL 과 상관없이 새로 읽음
+    import model_registry
+    import sheets
+
+    snapshot = sheets.refresh_snapshot() if refresh else sheets.load_snapshot()
+    return snapshot, model_registry.get_registry().get(model_name)
+
+
+class WatchScheduler:
+    # 일정 간격으로 스냅샷 ID / 모델 버전을 확인해서 바뀌었을 때만 Watchlist.run
+
+    def __init__(self, watchlist, interval=None, load=None):
+        self.watchlist = watchlist
+        self.interval = interval or config.WATCH_INTERVAL_SECONDS
+        self.load = load or current_inputs
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        snapshot, model = self.load()
+        if self.watchlist.is_current(snapshot.snapshot_id, model.version):
+            tracing.count("watchlist.unchanged")
+            return []
+        return self.watchlist.run(snapshot, model)
+
+    def start(self, delay=0):
+        # delay: 첫 확인까지 기다릴 시간 (앱 시작 직후 요청 처리와 시트 다운로드가 겹치지 않도록)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(delay,), name="watchlist", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, delay):
+        if self._stop.wait(delay):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ 관심 종목 확인 실패: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+_watchlist = None
+_watchlist_lock = threading.Lock()
+
+
+def get_watchlist():
+    # 프로세스당 하나 (Streamlit 세션 / 백그라운드 감시 공통)
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist()
+        return _watchlist
+
+
+def _configure(data_dir, cache_dir):
+    if data_dir:
+        config.DATA_DIR = data_dir
+    if cache_dir:
+        # 스냅샷/결과 캐시 경로는 쓸 때 계산되므로 이미 import 된 모듈에도 적용됨
+        config.set_cache_dir(cache_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="관심 종목 감시 (위험 점수 / 신호등 / 위험 요인 변화 알림)")
+    parser.add_argument("command", choices=["add", "remove", "list", "check", "watch", "alerts"])
+    parser.add_argument("tickers", nargs="*", help="add / remove 할 종목 코드")
+    parser.add_argument("--data-dir", help="sheet1.csv / sheet2.csv / sheet3.csv 가 있는 폴더 (기본: DASHBOARD_DATA_DIR 또는 Google 시트)")
+    parser.add_argument("--cache-dir", help="캐시 폴더 (기본: DASHBOARD_CACHE_DIR 또는 .cache)")
+    parser.add_argument("--model", default=None,
+                        help="모델 이름 (기본: DASHBOARD_MODEL 또는 model_xgb_new_23)")
+    parser.add_argument("--interval", type=int, default=None, help="watch 확인 간격 (초, 기본: DASHBOARD_WATCH_INTERVAL)")
+    parser.add_argument("--limit", type=int, default=20, help="alerts 로 보여줄 최근 알림 수")
+    args = parser.parse_args(argv)
+
+    _configure(args.data_dir, args.cache_dir)
+    watchlist = Watchlist(sinks=[ConsoleSink()])
+
+    if args.command in ("add", "remove"):
+        if not args.tickers:
+            parser.error("종목 코드를 지정하세요.")
+        codes = watchlist.add(args.tickers) if args.command == "add" else watchlist.remove(args.tickers)
+        print(f"✅ 관심 종목 {len(codes)}개: {', '.join(codes)}")
+        return 0
+
+    if args.command == "list":
+        entries = watchlist.state()["tickers"]
+        for code in watchlist.tickers():
+            entry = entries.get(code)
+            if entry is None:
+                print(f"{code}\t(아직 확인 전)")
+            elif entry.get("missing"):
+                print(f"{code}\t{entry['company_name']}\t(시트에 없음)")
+            else:
+                lights = " ".join(f"{group}={color}" for group, color in entry["lights"].items())
+                print(f"{code}\t{entry['company_name']}\t{entry['risk_score']}\t{lights}\t{', '.join(entry['drivers'])}")
+        return 0
+
+    if args.command == "alerts":
+        for alert in watchlist.alerts.read(args.limit):
+            print(f"{alert['time']}\t{alert['ticker']}\t{alert['company_name']}\t{alert['message']}")
+        return 0
+
+    # --data-dir 이면 로컬 CSV 를 매번 새로 읽음 (파일을 바꾸면 다음 확인에서 바로 반영)
+    scheduler = WatchScheduler(watchlist, args.interval,
+                               load=lambda: current_inputs(args.model, refresh=bool(config.DATA_DIR)))
+    if args.command == "check":
+        started = time.time()
+        alerts = scheduler.run_once()
+        print(f"✅ 관심 종목 {len(watchlist.tickers())}개 확인 완료 (알림 {len(alerts)}건, {time.time() - started:.1f}초)")
+        return 0
+
+    print(f"✅ 관심 종목 감시 시작 ({scheduler.interval}초 간격, 중지: Ctrl+C)")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# whatif.py
+# What-if 시뮬레이터 - 한 종목의 피처 값을 바꿔 보고 부도 확률 / SHAP / 백분위 점수 / 5대 신호등을 다시 계산
+#  - 모델(부스터)과 explainer 는 모델 레지스트리에 한 번 올려 둔 것, 백분위 인덱스는 스냅샷마다 만들어 둔 것을 그대로 사용
+#  - 원래 값은 피처 저장소(float32, 결측치 NaN)에서 한 줄만 읽어 둠 (결과 테이블과 같은 입력)
+#  - 민감도 곡선: 한 피처의 여러 값을 한 행렬로 쌓아 predict_proba 한 번 (SHAP/신호등은 필요할 때만)
+# 조정 한 번은 한 줄 SHAP(부스터 호출 한 번) + 백분위 조회라 수십 밀리초 이내
+import numpy as np
+import pandas as pd
+
+import batch_scoring
+import explain
+import feature_store
+import scoring
+import tracing
+from features import FEATURE_NAMES
+
+FEATURE_POS = {name: j for j, name in enumerate(FEATURE_NAMES)}
+SWEEP_POINTS = 41
+# 빠른 경로 확률이 위험 점수 경계(정수 %)에서 이만큼(확률 단위) 안쪽이면 predict_proba 로 다시 계산
+# (SHAP 합계와 부스터의 마진 합계는 더하는 순서가 달라 float32 반올림만큼 차이 - tests/test_explain.py 허용 오차)
+BOUNDARY_TOLERANCE = 1e-5
+
+
+class Simulator:
+
+    def __init__(self, snapshot, model, code):
+        # model: model_registry.LoadedModel / 시트에 없는 종목이면 LookupError
+        self.store = feature_store.get_feature_store(snapshot)
+        pos = self.store.first_position(code)
+        if pos is None:
+            raise LookupError(code)
+        self.code = code
+        self.company_name = self.store.names[pos]
+        self.model = model
+        self.explainer = model.explainer()
+        self.percentile_index = batch_scoring.get_percentile_index(snapshot)
+        self.base = self.store.matrix([pos])[0]
+        self.baseline = self.evaluate()
+
+    def value(self, name):
+        # 원래 값 (결측치면 NaN)
+        return float(self.base[FEATURE_POS[name]])
+
+    def features(self, overrides=None):
+        # overrides: {피처 이름: 바꿀 값} -> (피처 수,) 배열
+        row = self.base.copy()
+        for name, value in (overrides or {}).items():
+            row[FEATURE_POS[name]] = value
+        return row
+
+    def _fast_path(self):
+        # native explainer + 이진 로지스틱 모델이면 SHAP 행 합계(마진)에 시그모이드를 씌워 확률을 바로 계산
+        # (부스터 호출 한 번 - predict_proba 를 따로 돌리지 않음, 차이는 float32 반올림 수준)
+        return (isinstance(self.explainer, explain.NativeExplainer)
+                and self.model.model.get_params().get("objective") == "binary:logistic")
+
+    def _fast_probs(self, X, contribs):
+        # predict_proba 와 같은 float32 로 시그모이드
+        # 위험 점수 경계에 걸친 행만 predict_proba 로 다시 계산 -> risk_score 가 결과 테이블/sweep 과 항상 같음
+        margin = contribs.sum(axis=1, dtype=np.float32)
+        probs = (1 / (1 + np.exp(-margin))).astype(np.float32)
+        percent = probs.astype(float) * 100
+        if np.any(np.abs(percent - np.round(percent)) < BOUNDARY_TOLERANCE * 100):
+            tracing.count("whatif.boundary_predict")
+            probs = self.model.model.predict_proba(X)[:, 1]
+        return probs
+
+    def evaluate(self, overrides=None):
+        # 바꾼 값으로 한 줄 스코어링 -> {features, prob, risk_score, shap, scores, lights}
+        # 조정값이 없으면 결과 테이블과 같은 경로(score_matrix)로 계산한 원래 결과
+        if not overrides and hasattr(self, "baseline"):
+            return self.baseline
+        with tracing.span("whatif.evaluate", changed=len(overrides or {})):
+            row = self.features(overrides)
+            if overrides and self._fast_path():
+                X = batch_scoring.model_frame(row[None, :])
+                contribs = self.explainer.contributions(X)
+                probs = self._fast_probs(X, contribs)
+                shap_matrix = contribs[:, :-1].astype(float)
+                scores = self.percentile_index.scores(row[None, :])
+                lights = scoring.traffic_lights(shap_matrix)
+            else:
+                probs, shap_matrix, scores, lights = batch_scoring.score_matrix(
+                    row[None, :], self.model.model, self.explainer, self.percentile_index
+                )
+        return {
+            "features": row,
+            "prob": float(probs[0]),
+            "risk_score": int(probs[0] * 100),
+            "shap": shap_matrix[0],
+            "scores": scores[0],
+            "lights": {group: colors[0] for group, colors in lights.items()},
+        }
+
+    def compare(self, result):
+        # 원래 결과와 비교표 (값/SHAP/백분위 점수가 바뀐 피처만, SHAP 변화가 큰 순)
+        base = self.baseline
+        frame = pd.DataFrame({
+            "name": FEATURE_NAMES,
+            "value_before": base["features"], "value_after": result["features"],
+            "shap_before": base["shap"], "shap_after": result["shap"],
+            "score_before": base["scores"], "score_after": result["scores"],
+        })
+        frame["shap_delta"] = frame["shap_after"] - frame["shap_before"]
+        changed = ((frame["value_before"] != frame["value_after"])
+                   & ~(frame["value_before"].isna() & frame["value_after"].isna()))
+        changed |= (frame["shap_delta"].abs() > 1e-6) | (frame["score_before"] != frame["score_after"])
+        return frame[changed].sort_values("shap_delta", key=np.abs, ascending=False, ignore_index=True)
+
+    def sweep_range(self, name, low=0.01, high=0.99):
+        # 민감도 곡선 기본 구간: 전체 기업 분포의 1% ~ 99% 분위 (원래 값이 밖에 있으면 포함하도록 넓힘)
+        values = np.asarray(self.store.sorted_values(name), dtype=float)
+        base = self.value(name)
+        if not len(values):
+            return (base - 1, base + 1) if np.isfinite(base) else (-1.0, 1.0)
+        start, end = values[int(low * (len(values) - 1))], values[int(high * (len(values) - 1))]
+        if np.isfinite(base):
+            start, end = min(start, base), max(end, base)
+        if start == end:
+            start, end = start - 1, end + 1
+        return float(start), float(end)
+
+    def sweep(self, name, values=None, overrides=None, with_lights=False):
+        # 피처 하나를 values 로 바꿔 가며 (다른 조정값은 그대로) 한 번에 계산 -> DataFrame
+        if values is None:
+            values = np.linspace(*self.sweep_range(name), SWEEP_POINTS)
+        values = np.asarray(values, dtype=float)
+        features = np.tile(self.features(overrides), (len(values), 1))
+        features[:, FEATURE_POS[name]] = values
+
+        with tracing.span("whatif.sweep", points=len(values), lights=with_lights):
+            X = batch_scoring.model_frame(features)
+            probs = self.model.model.predict_proba(X)[:, 1]
+            out = pd.DataFrame({"value": values, "prob": probs, "risk_score": (probs * 100).astype(int)})
+            if with_lights:
+                shap_matrix = np.asarray(self.explainer.shap_values(X), dtype=float).reshape(len(X), len(FEATURE_NAMES))
+                for group, colors in scoring.traffic_lights(shap_matrix).items():
+                    out[f"light_{group}"] = colors
+        return out